@@ -8,10 +8,13 @@ from collections import Counter
 from collections import deque
 
 import cv2 as cv
-import numpy as np
-import mediapipe as mp
 
-from utils import CvFpsCalc
+from dataset import DatasetWriter
+from utils import StageTimers
+from utils import pre_process_landmark
+from utils import calc_landmark_array, calc_bounding_rect
+from utils import Pipeline, FramePreprocessor
+from utils import Command, run_window, load_hands
 from model import KeyPointClassifier
 from model import PointHistoryClassifier
 
@@ -58,15 +61,10 @@ def main():
     cap.set(cv.CAP_PROP_FRAME_HEIGHT, cap_height)
 
     # Model load #############################################################
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=use_static_image_mode,
-        max_num_hands=2,
-        min_detection_confidence=min_detection_confidence,
-        min_tracking_confidence=min_tracking_confidence,
-    )
+    hands = load_hands(use_static_image_mode, min_detection_confidence, min_tracking_confidence,
+                       warm_up_size=(cap_width, cap_height))
 
-    keypoint_classifier = KeyPointClassifier()
+    keypoint_classifier = KeyPointClassifier().warm_up()
 
     point_history_classifier = PointHistoryClassifier()
 
@@ -85,8 +83,13 @@ def main():
             row[0] for row in point_history_classifier_labels
         ]
 
-    # FPS Measurement ########################################################
-    cvFpsCalc = CvFpsCalc(buffer_len=10)
+    # Dataset writers ########################################################
+    keypoint_writer = DatasetWriter('model/keypoint_classifier/keypoint.csv')
+    point_history_writer = DatasetWriter(
+        'model/point_history_classifier/point_history.csv')
+
+    # FPS / latency measurement ##############################################
+    timers = StageTimers(fps_window=10)
 
     # Coordinate history #################################################################
     history_length = 16
@@ -98,37 +101,35 @@ def main():
     #  ########################################################################
     mode = 0
 
-    while True:
-        fps = cvFpsCalc.get()
+    number = -1
 
-        # Process Key (ESC: end) #################################################
-        key = cv.waitKey(10)
-        if key == 27:  # ESC
-            break
-        number, mode = select_mode(key, mode)
+    preprocessor = FramePreprocessor()
 
-        # Camera capture #####################################################
-        ret, image = cap.read()
-        if not ret:
-            break
-        image = cv.flip(image, 1)  # Mirror display
-        debug_image = copy.deepcopy(image)
+    # Frame processing (runs on the pipeline's processing thread) ##########
+    def process(image):
+        nonlocal number
+        fps = timers.tick('frame')
 
-        # Detection implementation #############################################################
-        image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+        # A number key applies to the next processed frame only
+        frame_number, number = number, -1
 
-        image.flags.writeable = False
-        results = hands.process(image)
-        image.flags.writeable = True
+        # Mirrored in place for display, RGB into a reused buffer
+        with timers.time('preprocess'):
+            debug_image, image = preprocessor.process(image)
+
+        # Detection implementation #############################################################
+        with timers.time('hands'):
+            results = hands.process(image)
 
         #  ####################################################################
         if results.multi_hand_landmarks is not None:
             for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
                                                   results.multi_handedness):
-                # Bounding box calculation
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
                 # Landmark calculation
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
+                landmark_list = calc_landmark_array(debug_image,
+                                                    hand_landmarks.landmark)
+                # Bounding box calculation
+                brect = calc_bounding_rect(landmark_list)
 
                 # Conversion to relative coordinates / normalized coordinates
                 pre_processed_landmark_list = pre_process_landmark(
@@ -136,13 +137,14 @@ def main():
                 pre_processed_point_history_list = pre_process_point_history(
                     debug_image, point_history)
                 # Write to the dataset file
-                logging_csv(number, mode, pre_processed_landmark_list,
-                            pre_processed_point_history_list)
+                logging_csv(frame_number, mode, pre_processed_landmark_list,
+                            pre_processed_point_history_list,
+                            keypoint_writer, point_history_writer)
 
                 # Hand sign classification
                 hand_sign_id = keypoint_classifier(pre_processed_landmark_list)
                 if hand_sign_id == 2:  # Point gesture
-                    point_history.append(landmark_list[8])
+                    point_history.append(landmark_list[8].tolist())
                 else:
                     point_history.append([0, 0])
 
@@ -172,87 +174,43 @@ def main():
             point_history.append([0, 0])
 
         debug_image = draw_point_history(debug_image, point_history)
-        debug_image = draw_info(debug_image, fps, mode, number)
+        debug_image = draw_info(debug_image, fps, mode, frame_number)
+
+        return debug_image
+
+    # Key commands, applied on the processing thread between frames ########
+    def handle(command):
+        nonlocal mode, number
+        if command.name == 'mode':
+            mode = command.value
+        elif command.name == 'number':
+            number = command.value
+
+    # Capture / inference pipeline ###########################################
+    pipeline = Pipeline(cap, process, timers=timers, handle=handle)
+    pipeline.start()
+
+    # Screen reflection: keys become commands for handle() ##################
+    run_window(pipeline, 'Hand Gesture Recognition', key_command, timers=timers)
 
-        # Screen reflection #############################################################
-        cv.imshow('Hand Gesture Recognition', debug_image)
+    pipeline.stop()
 
+    keypoint_writer.close()
+    point_history_writer.close()
     cap.release()
     cv.destroyAllWindows()
 
 
-def select_mode(key, mode):
-    number = -1
+def key_command(key):
     if 48 <= key <= 57:  # 0 ~ 9
-        number = key - 48
+        return Command('number', key - 48)
     if key == 110:  # n
-        mode = 0
+        return Command('mode', 0)
     if key == 107:  # k
-        mode = 1
+        return Command('mode', 1)
     if key == 104:  # h
-        mode = 2
-    return number, mode
-
-
-def calc_bounding_rect(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_array = np.empty((0, 2), int)
-
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-
-        landmark_point = [np.array((landmark_x, landmark_y))]
-
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
-
-    x, y, w, h = cv.boundingRect(landmark_array)
-
-    return [x, y, x + w, y + h]
-
-
-def calc_landmark_list(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
-
-    return landmark_point
-
-
-def pre_process_landmark(landmark_list):
-    temp_landmark_list = copy.deepcopy(landmark_list)
-
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, landmark_point in enumerate(temp_landmark_list):
-        if index == 0:
-            base_x, base_y = landmark_point[0], landmark_point[1]
-
-        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
-        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
-
-    # Convert to a one-dimensional list
-    temp_landmark_list = list(
-        itertools.chain.from_iterable(temp_landmark_list))
-
-    # Normalization
-    max_value = max(list(map(abs, temp_landmark_list)))
-
-    def normalize_(n):
-        return n / max_value
-
-    temp_landmark_list = list(map(normalize_, temp_landmark_list))
-
-    return temp_landmark_list
+        return Command('mode', 2)
+    return None
 
 
 def pre_process_point_history(image, point_history):
@@ -278,19 +236,14 @@ def pre_process_point_history(image, point_history):
     return temp_point_history
 
 
-def logging_csv(number, mode, landmark_list, point_history_list):
+def logging_csv(number, mode, landmark_list, point_history_list,
+                keypoint_writer, point_history_writer):
     if mode == 0:
         pass
     if mode == 1 and (0 <= number <= 9):
-        csv_path = 'model/keypoint_classifier/keypoint.csv'
-        with open(csv_path, 'a', newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([number, *landmark_list])
+        keypoint_writer.write(number, landmark_list)
     if mode == 2 and (0 <= number <= 9):
-        csv_path = 'model/point_history_classifier/point_history.csv'
-        with open(csv_path, 'a', newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([number, *point_history_list])
+        point_history_writer.write(number, point_history_list)
     return
 
 
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Word recognition of the greedy decoders (SignDecoder with either voter)
+# against BeamDecoder, on synthetic sessions of words from the vocabulary.
+# The classifier is simulated: every label has a partner it is confused
+# with, and confusions come in bursts of frames, as they do when a hand
+# passes through an ambiguous pose.
+#
+#   python -m benchmark.beam --sessions 50 --accuracy 0.7
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from benchmark.voting import edit_distance
+from decoder import BeamDecoder, CountVoter, SequentialVoter, SignDecoder, WORD
+from decoder import load_automaton, word_sequences
+
+
+class SimulatedClassifier(object):
+    def __init__(self, rng, num_labels, labels_used, accuracy, burst):
+        self.rng = rng
+        self.num_labels = num_labels
+        self.accuracy = accuracy
+        self.burst = burst
+        self.partner = {label: int(rng.choice([other for other in labels_used if other != label]))
+                        for label in labels_used}
+        self._confused = False
+
+    def frame(self, label):
+        # Stays confused with probability burst, so errors cluster; enters a
+        # confusion so that 1 - accuracy of the frames are confused
+        if self._confused:
+            self._confused = self.rng.random() < self.burst
+        else:
+            enter = (1 - self.accuracy) * (1 - self.burst) / self.accuracy
+            self._confused = self.rng.random() < enter
+
+        distribution = self.rng.dirichlet(np.full(self.num_labels, 0.05))
+        if self._confused:
+            top, second = self.partner[label], label
+        else:
+            top, second = label, self.partner[label]
+        # Mostly confident, as trained classifiers are, even when wrong
+        mass = max(1.0 - self.rng.exponential(0.06), 0.5)
+        runner_up = self.rng.uniform(0.0, 1.0 - mass)
+        distribution *= (1.0 - mass - runner_up)
+        distribution[top] += mass
+        distribution[second] += runner_up
+        return distribution.astype(np.float32)
+
+
+def make_session(rng, classifier, vocabulary, words, hold, gap, gap_probability):
+    # frames: distribution per frame, None without a hand; truth: the words
+    frames = []
+    truth = []
+    for _ in range(words):
+        sequence, word = vocabulary[rng.integers(len(vocabulary))]
+        truth.append(word)
+        # The same sign twice in a row (a, a) is held twice as long, the
+        # hands do not drop in between
+        for label in sequence:
+            frames.extend(classifier.frame(label) for _ in range(int(rng.integers(hold[0], hold[1] + 1))))
+        if rng.random() < gap_probability:
+            frames.extend([None] * int(rng.integers(gap[0], gap[1] + 1)))
+    # Let every decoder finish
+    frames.extend([None] * 40)
+    return frames, truth
+
+
+def run(decoder, frames, score_th):
+    words = []
+    costs = []
+    for distribution in frames:
+        start = time.perf_counter_ns()
+        if distribution is None:
+            events = decoder.idle()
+        else:
+            label_id = int(np.argmax(distribution))
+            confidence = float(distribution[label_id])
+            if confidence <= score_th:
+                label_id = None
+            events = decoder.update(label_id, confidence, probabilities=distribution)
+        costs.append(time.perf_counter_ns() - start)
+        words.extend(event.text for event in events if event.kind == WORD)
+    return words, costs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--words", help='words per session', type=int, default=10)
+    parser.add_argument("--accuracy", help='share of frames classified right', type=float, default=0.75)
+    parser.add_argument("--burst", help='chance a confusion lasts another frame', type=float, default=0.6)
+    parser.add_argument("--hold", help='frames a sign is held (min max)', type=int, nargs=2, default=[20, 45])
+    parser.add_argument("--gap", help='frames without a hand between words (min max)', type=int, nargs=2, default=[6, 12])
+    parser.add_argument("--gap_probability", type=float, default=0.5)
+    parser.add_argument("--score_th", type=float, default=0.9)
+    parser.add_argument("--beam_width", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        automaton = load_automaton()
+    num_labels = len(automaton.labels)
+    vocabulary = word_sequences(automaton)
+    labels_used = sorted({label for sequence, _ in vocabulary for label in sequence})
+
+    rng = np.random.default_rng(args.seed)
+    classifier = SimulatedClassifier(rng, num_labels, labels_used, args.accuracy, args.burst)
+    sessions = [make_session(rng, classifier, vocabulary, args.words, args.hold, args.gap,
+                             args.gap_probability)
+                for _ in range(args.sessions)]
+    signed = sum(len(truth) for _, truth in sessions)
+
+    decoders = [
+        ('greedy count', lambda: SignDecoder(automaton, voter=CountVoter(num_labels))),
+        ('greedy sequential', lambda: SignDecoder(automaton, voter=SequentialVoter(num_labels))),
+        ('beam {}'.format(args.beam_width), lambda: BeamDecoder(automaton, beam_width=args.beam_width)),
+    ]
+
+    print('{} words in {} sessions, simulated frame accuracy {:.0%}'.format(
+        signed, args.sessions, args.accuracy))
+    print('{:<20} {:>8} {:>8} {:>10} {:>10}'.format('decoder', 'correct', 'WER', 'p50 us', 'p99 us'))
+    for name, make_decoder in decoders:
+        correct = 0
+        errors = 0
+        costs = []
+        for frames, truth in sessions:
+            words, session_costs = run(make_decoder(), frames, args.score_th)
+            costs.extend(session_costs)
+            errors += edit_distance(words, truth)
+            # Words recognized in order, i.e. the longest common subsequence
+            correct += (len(words) + len(truth) - edit_distance_indel(words, truth)) // 2
+        costs = np.array(costs) / 1000
+        print('{:<20} {:>7.1%} {:>7.1%} {:>10.1f} {:>10.1f}'.format(
+            name, correct / signed, errors / signed, np.percentile(costs, 50), np.percentile(costs, 99)))
+
+
+def edit_distance_indel(a, b):
+    # Insertions and deletions only: len(a) + len(b) - 2 * LCS
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(previous[j - 1] if x == y else min(previous[j], current[j - 1]) + 1)
+        previous = current
+    return previous[-1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Micro-benchmarks of the per-frame stages of data_collector.py, run without
+# a camera on the rows of t.txt and synthetic MediaPipe results. Reports the
+# time per call and, from tracemalloc, the memory a call allocates.
+#
+#   python -m benchmark.hot_path --output before.json
+#   python -m benchmark.hot_path --output after.json --compare before.json
+import argparse
+import copy
+import csv
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import cv2 as cv
+import numpy as np
+
+from benchmark.synthetic import make_face_results, make_hand_results, make_image
+from utils import calc_frame_landmarks, calc_landmark_array, pre_process_landmark, FRAME_POINTS
+from utils import FACE_SLICE, FramePreprocessor, OverlayRenderer, mirror_hand_results
+from utils.overlay import FINGERTIPS, HAND_CONNECTIONS
+
+LABEL_PATH = 'model/keypoint_classifier/keypoint_classifier_label.csv'
+
+
+def load_rows(path='t.txt'):
+    data = np.loadtxt(path, delimiter=',', dtype='float32', ndmin=2)
+    return data[:, 0].astype(int), data[:, 1:]
+
+
+def synthetic_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(make_hand_results(rng, num_hands=int(rng.integers(1, 3))), make_face_results(rng))
+            for _ in range(count)]
+
+
+def accepted_paths(transition, state, final_states, path=()):
+    # Every input sequence that takes the automaton from state to a final
+    # state, in the order it reads them
+    if state in final_states:
+        yield path
+        return
+    for inp, fin in transition.get(state, {}).items():
+        yield from accepted_paths(transition, fin['state'], final_states, path + (inp,))
+
+
+def legacy_transition_walk(buffer):
+    # The walk in data_collector.py's process(): reads BUFFER from its end
+    from transition import finalState, startState, transition
+
+    try:
+        index = len(buffer) - 1
+        state = startState
+        output = ''
+        while (index > 0 and state not in finalState):
+            inp = buffer[index]
+            fin = transition[state][inp]
+            state = fin['state']
+            output = fin['output']
+            index = index - 1
+        return output
+    except KeyError:
+        return ''
+
+
+# --------------------- Stages --------------------- #
+# Each returns (function, inputs); the function is called once per input.
+
+def stage_calc_frame_landmarks(args):
+    image = make_image()
+    out = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
+
+    def run(frame):
+        return calc_frame_landmarks(image, frame[0], frame[1], out=out)
+    return run, synthetic_frames(args.frames)
+
+
+def stage_calc_landmark_array(args):
+    image = make_image()
+    out = np.zeros((21, 2), dtype=np.int32)
+    hands = [results.multi_hand_landmarks[0].landmark for results, _ in synthetic_frames(args.frames)]
+
+    def run(hand_landmarks):
+        return calc_landmark_array(image, hand_landmarks, out=out)
+    return run, hands
+
+
+def stage_pre_process_landmark(args):
+    image = make_image()
+    frames = [calc_frame_landmarks(image, results, result2)[0]
+              for results, result2 in synthetic_frames(args.frames)]
+    return pre_process_landmark, frames
+
+
+def stage_keypoint_classifier(args):
+    # Imported here so that the other stages run without TensorFlow
+    from model import KeyPointClassifier
+
+    keypoint_classifier = KeyPointClassifier(model_path=args.model)
+    _, features = load_rows(args.rows)
+    keypoint_classifier(features[0])
+    return keypoint_classifier, list(features)
+
+
+def legacy_draw(image, face_rect, face_points, hands, panel_lines, progress):
+    # What process() drew before OverlayRenderer: two cv.line calls per bone
+    # and two cv.circle calls per joint, every text drawn every frame
+    if face_rect is not None:
+        cv.rectangle(image, (face_rect[0], face_rect[1]), (face_rect[2], face_rect[3]), (0, 0, 0), 1)
+        for point in face_points:
+            cv.circle(image, (point[0], point[1]), 3, (255, 255, 255), -1)
+    for points, brect, label in hands:
+        cv.rectangle(image, (brect[0], brect[1]), (brect[2], brect[3]), (0, 0, 0), 1)
+        for start, end in HAND_CONNECTIONS:
+            cv.line(image, tuple(points[start]), tuple(points[end]), (0, 0, 0), 6)
+            cv.line(image, tuple(points[start]), tuple(points[end]), (0, 255, 0), 2)
+        for index, point in enumerate(points):
+            radius = 8 if index in FINGERTIPS else 5
+            cv.circle(image, (point[0], point[1]), radius, (255, 255, 255), -1)
+            cv.circle(image, (point[0], point[1]), radius, (0, 0, 0), 1)
+        cv.rectangle(image, (brect[0], brect[1]), (brect[2], brect[1] - 22), (0, 0, 0), -1)
+        cv.putText(image, label, (brect[0] + 5, brect[1] - 4),
+                   cv.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv.LINE_AA)
+    cv.rectangle(image, (0, 0), (150, 60), (255, 255, 255), -1)
+    for line, y in zip(panel_lines, (20, 50)):
+        cv.putText(image, line, (10, y), cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv.LINE_AA)
+    height, width = image.shape[:2]
+    cv.rectangle(image, (0, height - 20), (int(progress * width), height), (0, 0, 255), -1)
+    return image
+
+
+def overlay_frames(args):
+    # What a collector frame draws: the face, one or two hands, the panel
+    # in logging mode and the progress bar
+    image = make_image()
+    frames = []
+    for index, (results, result2) in enumerate(synthetic_frames(args.frames)):
+        points, face_rect, hands = calc_frame_landmarks(image, results, result2)
+        # Copies, as the frame array is reused by calc_frame_landmarks
+        frames.append((face_rect, points[FACE_SLICE].copy(),
+                       [(hand.copy(), brect, handedness.classification[0].label)
+                        for handedness, hand, brect in hands],
+                       ('Logging Data', 'Counter: ' + str(index // 24)), index % 24 / 24))
+    return image, frames
+
+
+def stage_draw_legacy(args):
+    image, frames = overlay_frames(args)
+
+    def run(frame):
+        return legacy_draw(image, *frame)
+    return run, frames
+
+
+def stage_draw(args):
+    image, frames = overlay_frames(args)
+    renderer = OverlayRenderer()
+
+    def run(frame):
+        face_rect, face_points, hands, panel_lines, progress = frame
+        if face_rect is not None:
+            renderer.add_face(face_rect, face_points)
+        for points, brect, label in hands:
+            renderer.add_hand(points, brect, label)
+        return renderer.render(image, panel_lines, progress)
+    return run, frames
+
+
+def legacy_preprocess(frame):
+    # What the loops did before FramePreprocessor: three new frames
+    image = cv.flip(frame, 1)
+    debug_image = copy.deepcopy(image)
+    image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+    return debug_image, image
+
+
+def camera_frames(args):
+    # Filled frames at the collector's capture size, one per call, as the
+    # camera hands out a new one each read
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=make_image().shape, dtype=np.uint8)
+    return [frame.copy() for _ in range(min(args.frames, 20))]
+
+
+def stage_preprocess_legacy(args):
+    return legacy_preprocess, camera_frames(args)
+
+
+def stage_preprocess(args):
+    return FramePreprocessor().process, camera_frames(args)
+
+
+def stage_preprocess_mirror_landmarks(args):
+    # The frame is still mirrored for display, after the RGB conversion;
+    # the landmarks are mirrored on top (mirror_hand_results)
+    preprocessor = FramePreprocessor(mirror_landmarks=True)
+    results = [results for results, _ in synthetic_frames(len(camera_frames(args)))]
+
+    def run(item):
+        frame, hand_results = item
+        output = preprocessor.process(frame)
+        mirror_hand_results(hand_results)
+        return output
+    return run, list(zip(camera_frames(args), results))
+
+
+def transition_buffers():
+    # BUFFER holds the signs in the order they were made, the walk reads it
+    # backwards; add the same buffers ending in an unexpected sign
+    from transition import finalState, startState, transition
+
+    with open(LABEL_PATH, encoding='utf-8-sig') as f:
+        labels = [row[0] for row in csv.reader(f)]
+    buffers = []
+    for path in accepted_paths(transition, startState, finalState):
+        if not all(name in labels for name in path):
+            continue
+        buffer = ['_'] + list(reversed(path))
+        buffers.append(buffer)
+        buffers.append(buffer + [labels[0]])
+    return labels, buffers
+
+
+def stage_transition_walk(args):
+    _, buffers = transition_buffers()
+    return legacy_transition_walk, buffers
+
+
+def stage_automaton_walk(args):
+    # The same buffers through the compiled table, as label ids
+    from decoder import load_automaton
+
+    labels, buffers = transition_buffers()
+    automaton = load_automaton()
+    return automaton.walk, [[labels.index(name) for name in buffer[1:]] for buffer in buffers]
+
+
+STAGES = {
+    'calc_frame_landmarks': stage_calc_frame_landmarks,
+    'calc_landmark_array': stage_calc_landmark_array,
+    'pre_process_landmark': stage_pre_process_landmark,
+    'keypoint_classifier': stage_keypoint_classifier,
+    'draw_legacy': stage_draw_legacy,
+    'draw': stage_draw,
+    'preprocess_legacy': stage_preprocess_legacy,
+    'preprocess': stage_preprocess,
+    'preprocess_mirror_landmarks': stage_preprocess_mirror_landmarks,
+    'transition_walk': stage_transition_walk,
+    'automaton_walk': stage_automaton_walk,
+}
+
+
+def measure(function, inputs, repeat, min_time):
+    # ns/op: best of repeat timed passes over the inputs, each pass repeated
+    # until it takes at least min_time seconds
+    passes = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(passes):
+            for item in inputs:
+                function(item)
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        passes *= 2
+
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter_ns()
+        for _ in range(passes):
+            for item in inputs:
+                function(item)
+        timings.append(time.perf_counter_ns() - start)
+    ns_per_op = min(timings) / (passes * len(inputs))
+
+    # Allocations: the peak of traced memory during one call above what was
+    # live before it, and what is still live after it (the result included)
+    tracemalloc.start()
+    peak_bytes = 0
+    retained_bytes = 0
+    for item in inputs:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = function(item)
+        after, peak = tracemalloc.get_traced_memory()
+        peak_bytes += peak - before
+        retained_bytes += after - before
+        del result
+    tracemalloc.stop()
+
+    return {
+        'ns_per_op': ns_per_op,
+        'peak_bytes_per_op': peak_bytes / len(inputs),
+        'retained_bytes_per_op': retained_bytes / len(inputs),
+        'ops': passes * len(inputs),
+        'inputs': len(inputs),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    header = '{:<28} {:>12} {:>12} {:>12}'.format('stage', 'ns/op', 'peak B/op', 'kept B/op')
+    if baseline is not None:
+        header += ' {:>12} {:>8}'.format('base ns/op', 'ratio')
+    print(header)
+    for name, result in results['stages'].items():
+        line = '{:<28} {:>12.0f} {:>12.0f} {:>12.0f}'.format(
+            name, result['ns_per_op'], result['peak_bytes_per_op'], result['retained_bytes_per_op'])
+        base = baseline['stages'].get(name) if baseline is not None else None
+        if base is not None:
+            line += ' {:>12.0f} {:>7.2f}x'.format(base['ns_per_op'], base['ns_per_op'] / result['ns_per_op'])
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stages", nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--frames", help='synthetic frames per stage', type=int, default=200)
+    parser.add_argument("--rows", help='keypoint rows for the classifier', default='t.txt')
+    parser.add_argument("--model", default='model/keypoint_classifier/keypoint_classifier.tflite')
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min_time", help='seconds per timed pass', type=float, default=0.2)
+    parser.add_argument("--output", help='write the results to this JSON file')
+    parser.add_argument("--compare", help='JSON file of an earlier run to compare with')
+    args = parser.parse_args()
+
+    results = {
+        'revision': git_revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'stages': {},
+    }
+    for name in args.stages:
+        function, inputs = STAGES[name](args)
+        results['stages'][name] = measure(function, inputs, args.repeat, args.min_time)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('baseline: {} ({})'.format(baseline.get('revision'), baseline.get('time')))
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Per-frame cost of turning MediaPipe results into the 43-point frame:
+# the old calc_bounding_rect / calc_landmark_list pair against
+# utils.calc_frame_landmarks.
+#
+#   python -m benchmark.landmark_extraction
+import argparse
+import timeit
+
+import cv2 as cv
+import numpy as np
+
+from benchmark.synthetic import make_face_results, make_hand_results, make_image
+from utils import calc_frame_landmarks, FRAME_POINTS
+
+
+def legacy_calc_bounding_rect(image, landmarks):
+    image_width, image_height = image.shape[1], image.shape[0]
+    landmark_array = np.empty((0, 2), int)
+
+    for _, landmark in enumerate(landmarks.landmark):
+        landmark_x = min(int(landmark.x * image_width), image_width - 1)
+        landmark_y = min(int(landmark.y * image_height), image_height - 1)
+
+        landmark_point = [np.array((landmark_x, landmark_y))]
+
+        landmark_array = np.append(landmark_array, landmark_point, axis=0)
+
+    x, y, w, h = cv.boundingRect(landmark_array)
+
+    return [x, y, x + w, y + h]
+
+
+def legacy_calc_landmark_list(image, landmarks):
+    image_width, image_height = image.shape[1], image.shape[0]
+
+    landmark_point = []
+    for _, landmark in enumerate(landmarks):
+        landmark_x = min(int(landmark.x * image_width), image_width - 1)
+        landmark_y = min(int(landmark.y * image_height), image_height - 1)
+        landmark_point.append([landmark_x, landmark_y])
+
+    return landmark_point
+
+
+def legacy_frame(image, results, result2):
+    data_points = {
+        'Face': [[0, 0]] * 1,
+        'Left': [[0, 0]] * 21,
+        'Right': [[0, 0]] * 21,
+    }
+    if result2.detections is not None:
+        face_landmarks = result2.detections[0].location_data
+        data_points['Face'] = legacy_calc_landmark_list(
+            image, face_landmarks.relative_keypoints)[2: 3]
+
+    brects = []
+    if results.multi_hand_landmarks is not None:
+        for hand_landmarks, handedness in zip(results.multi_hand_landmarks,
+                                              results.multi_handedness):
+            brects.append(legacy_calc_bounding_rect(image, hand_landmarks))
+            data_points[handedness.classification[0].label] = \
+                legacy_calc_landmark_list(image, hand_landmarks.landmark)
+
+    merged = np.concatenate((data_points['Face'], data_points['Left'],
+                             data_points['Right']), axis=0)
+    return merged, brects
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", help='synthetic frames', type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = make_image()
+    frames = [(make_hand_results(rng), make_face_results(rng))
+              for _ in range(args.frames)]
+    out = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
+
+    # Both paths have to agree before their timings mean anything
+    for results, result2 in frames:
+        merged, brects = legacy_frame(image, results, result2)
+        points, _, hands = calc_frame_landmarks(image, results, result2, out=out)
+        assert np.array_equal(merged, points)
+        assert brects == [brect for _, _, brect in hands]
+
+    def run_legacy():
+        for results, result2 in frames:
+            legacy_frame(image, results, result2)
+
+    def run_current():
+        for results, result2 in frames:
+            calc_frame_landmarks(image, results, result2, out=out)
+
+    legacy = min(timeit.repeat(run_legacy, number=1, repeat=args.repeat))
+    current = min(timeit.repeat(run_current, number=1, repeat=args.repeat))
+
+    print('legacy:  {:8.1f} us/frame'.format(legacy / args.frames * 1e6))
+    print('current: {:8.1f} us/frame'.format(current / args.frames * 1e6))
+    print('speedup: {:8.2f}x'.format(legacy / current))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+
+# Stand-ins for the MediaPipe result objects, shaped like the protobufs the
+# entry points read (only the fields they touch).
+def make_hand_results(rng, num_hands=2):
+    labels = ['Left', 'Right'][:num_hands]
+    multi_hand_landmarks = []
+    multi_handedness = []
+    for label in labels:
+        center = rng.uniform(0.3, 0.7, size=2)
+        points = center + rng.normal(0, 0.08, size=(21, 2))
+        multi_hand_landmarks.append(SimpleNamespace(landmark=[
+            SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in points
+        ]))
+        multi_handedness.append(SimpleNamespace(classification=[
+            SimpleNamespace(label=label, score=0.99)
+        ]))
+
+    if num_hands == 0:
+        return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+    return SimpleNamespace(multi_hand_landmarks=multi_hand_landmarks,
+                           multi_handedness=multi_handedness)
+
+
+def make_face_results(rng):
+    center = rng.uniform(0.4, 0.6, size=2)
+    keypoints = center + rng.normal(0, 0.03, size=(6, 2))
+    location_data = SimpleNamespace(
+        relative_bounding_box=SimpleNamespace(xmin=float(center[0] - 0.1),
+                                              ymin=float(center[1] - 0.1),
+                                              width=0.2, height=0.25),
+        relative_keypoints=[SimpleNamespace(x=float(x), y=float(y))
+                            for x, y in keypoints],
+    )
+    return SimpleNamespace(detections=[SimpleNamespace(location_data=location_data, score=[0.93])])
+
+
+def make_image(width=960, height=540):
+    return np.zeros((height, width, 3), dtype=np.uint8)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# How the vocabulary automaton scales with the number of words: build time,
+# states, memory, load time from the cache and the cost of a walk, for
+# synthetic vocabularies over the classifier's labels (or over --labels
+# made-up ones).
+#
+#   python -m benchmark.vocabulary --words 100 1000 10000
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from decoder import build_automaton, read_vocabulary
+from decoder.automaton import read_labels
+from decoder.vocabulary import VOCABULARY_PATH, load_saved_automaton, save_automaton
+
+
+def synthetic_vocabulary(rng, labels, words, length, singles=0.05):
+    # words random sign sequences, none inside another (check_vocabulary);
+    # a share of singles are one-sign words, whose signs no other word uses
+    vocabulary = []
+    sequences = set()
+    inner = set()
+    single = set()
+    attempts = 0
+    while len(vocabulary) < words:
+        attempts += 1
+        if attempts > 100 * words:
+            raise ValueError('cannot fit {} words over {} labels'.format(words, len(labels)))
+        if rng.random() < singles:
+            signs = (labels[rng.integers(len(labels))],)
+        else:
+            signs = tuple(labels[i] for i in rng.integers(len(labels), size=rng.integers(length[0], length[1] + 1)))
+            if single.intersection(signs):
+                continue
+        parts = {signs[start:end] for end in range(1, len(signs) + 1) for start in range(end)}
+        if signs in inner or parts & sequences:
+            continue
+        if len(signs) == 1:
+            if any(signs[0] in sequence for sequence in sequences):
+                continue
+            single.add(signs[0])
+        sequences.add(signs)
+        inner |= parts
+        vocabulary.append(('w{}'.format(len(vocabulary)), signs))
+    return vocabulary
+
+
+def measure_walk(automaton, buffers, min_time):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        for buffer in buffers:
+            automaton.walk(buffer)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / (runs * len(buffers)) * 1e9
+
+
+def measure(vocabulary, labels, rng, min_time):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        automaton = build_automaton(vocabulary, labels)
+        build = time.perf_counter() - start
+        # Built again for its memory, tracing slows building down
+        del automaton
+        tracemalloc.start()
+        automaton = build_automaton(vocabulary, labels)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'vocabulary.npz')
+        save_automaton(automaton, path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        load_saved_automaton(path)
+        load = time.perf_counter() - start
+
+    # Pending signs as the decoder walks them: a few signs, then a word
+    label_ids = {label: index for index, label in enumerate(labels)}
+    walkable = [signs for _, signs in vocabulary if all(sign in label_ids for sign in signs)]
+    buffers = []
+    for _ in range(1000):
+        signs = walkable[rng.integers(len(walkable))]
+        buffers.append([int(i) for i in rng.integers(len(labels), size=rng.integers(0, 3))]
+                       + [label_ids[sign] for sign in signs])
+    walk = measure_walk(automaton, buffers, min_time)
+
+    return {
+        'words': len(vocabulary),
+        'signs': sum(len(signs) for _, signs in vocabulary),
+        'states': len(automaton.states),
+        'table_bytes': automaton.next_state.nbytes + automaton.output.nbytes,
+        'retained_bytes': retained,
+        'peak_bytes': peak,
+        'cache_bytes': size,
+        'build_s': build,
+        'load_s': load,
+        'walk_ns': walk,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument("--labels", help='made-up labels instead of the classifier\'s', type=int)
+    parser.add_argument("--length", help='signs per word (min max)', type=int, nargs=2, default=[2, 4])
+    parser.add_argument("--min_time", help='seconds to time walks for', type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.labels:
+        labels = ['s{}'.format(i) for i in range(args.labels)]
+    else:
+        labels = read_labels()
+    rng = np.random.default_rng(args.seed)
+
+    rows = [('shipped', read_vocabulary(VOCABULARY_PATH), read_labels())]
+    rows += [('synthetic', synthetic_vocabulary(rng, labels, words, args.length), labels)
+             for words in args.words]
+
+    print('{:<10} {:>7} {:>7} {:>8} {:>9} {:>10} {:>9} {:>9} {:>9} {:>8}'.format(
+        'vocabulary', 'words', 'signs', 'states', 'table KB', 'python KB', 'cache KB',
+        'build ms', 'load ms', 'walk ns'))
+    for name, vocabulary, vocabulary_labels in rows:
+        result = measure(vocabulary, vocabulary_labels, rng, args.min_time)
+        print('{:<10} {:>7} {:>7} {:>8} {:>9.0f} {:>10.0f} {:>9.0f} {:>9.1f} {:>9.1f} {:>8.0f}'.format(
+            name, result['words'], result['signs'], result['states'], result['table_bytes'] / 1024,
+            result['retained_bytes'] / 1024, result['cache_bytes'] / 1024,
+            result['build_s'] * 1000, result['load_s'] * 1000, result['walk_ns']))
+
+
+if __name__ == '__main__':
+    main()
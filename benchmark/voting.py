@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Replays synthetic signing sessions through the voters of decoder.voting
+# and reports how long each takes to commit a sign and how often it commits
+# the wrong one. A session is a sequence of signs, each held for a number of
+# frames whose features are rows of that label from the dataset, run
+# through the real classifier; sometimes the hands drop between signs.
+#
+#   python -m benchmark.voting --dataset t.txt
+import argparse
+
+import numpy as np
+
+from decoder import CountVoter, SequentialVoter
+
+
+def load_dataset(path):
+    if path.endswith('.bin'):
+        from dataset import load_binary_dataset
+
+        features, labels, _ = load_binary_dataset(path)
+        return np.asarray(features, dtype=np.float32), np.asarray(labels, dtype=int)
+    data = np.loadtxt(path, delimiter=',', dtype='float32', ndmin=2)
+    return data[:, 1:], data[:, 0].astype(int)
+
+
+def make_session(rng, rows_by_label, signs, hold, gap, gap_probability):
+    # frames: row index per frame, -1 for a frame without a hand;
+    # segments: (first frame, end frame, label) of every sign held
+    labels = sorted(rows_by_label)
+    frames = []
+    segments = []
+    previous = None
+    for _ in range(signs):
+        label = previous
+        while label == previous:
+            label = labels[rng.integers(len(labels))]
+        previous = label
+
+        length = int(rng.integers(hold[0], hold[1] + 1))
+        segments.append((len(frames), len(frames) + length, label))
+        frames.extend(rng.choice(rows_by_label[label], size=length))
+        if rng.random() < gap_probability:
+            frames.extend([-1] * int(rng.integers(gap[0], gap[1] + 1)))
+    return np.array(frames), segments
+
+
+def replay(voter, frames, distributions, score_th):
+    # [(frame, label)] of every commit
+    commits = []
+    for index, row in enumerate(frames):
+        if row < 0:
+            voter.idle()
+            continue
+        distribution = distributions[row]
+        label_id = int(np.argmax(distribution))
+        if distribution[label_id] <= score_th:
+            label_id = None
+        committed = voter.update(label_id, distribution, float(distribution.max()))
+        if committed is not None:
+            commits.append((index, committed))
+    return commits
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+def score(commits, segments):
+    # Latency: frames from the start of a sign to its first correct commit
+    # before the next sign starts. Errors: edit distance between committed
+    # and signed sequences.
+    latencies = []
+    missed = 0
+    commit_index = 0
+    for number, (start, end, label) in enumerate(segments):
+        next_start = segments[number + 1][0] if number + 1 < len(segments) else float('inf')
+        while commit_index < len(commits) and commits[commit_index][0] < start:
+            commit_index += 1
+        found = None
+        for frame, committed in commits[commit_index:]:
+            if frame >= next_start:
+                break
+            if committed == label:
+                found = frame
+                break
+        if found is None:
+            missed += 1
+        else:
+            latencies.append(found - start)
+
+    errors = edit_distance([label for _, label in commits], [label for _, _, label in segments])
+    return latencies, missed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default='t.txt', help='.csv or .bin keypoint dataset')
+    parser.add_argument("--model", default='model/keypoint_classifier/keypoint_classifier.tflite')
+    parser.add_argument("--score_th", type=float, default=0.9)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--signs", help='signs per session', type=int, default=20)
+    parser.add_argument("--hold", help='frames a sign is held (min max)', type=int, nargs=2, default=[20, 45])
+    parser.add_argument("--gap", help='frames without a hand between signs (min max)', type=int, nargs=2, default=[5, 15])
+    parser.add_argument("--gap_probability", type=float, default=0.3)
+    parser.add_argument("--fps", help='frame rate the latencies are converted at', type=float, default=30.0)
+    parser.add_argument("--margins", help='SequentialVoter margins to try', type=float, nargs='+', default=[4.0, 8.0, 16.0])
+    parser.add_argument("--min_dwell", type=int, default=3)
+    parser.add_argument("--repeat_frames", help='SequentialVoter repeat_frames to also try, at margin 8',
+                        type=int, nargs='*', default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from model import KeyPointClassifier
+
+    features, labels = load_dataset(args.dataset)
+    keypoint_classifier = KeyPointClassifier(model_path=args.model, score_th=args.score_th)
+    distributions = keypoint_classifier.predict_batch(features, batch_size=1024)
+    num_labels = distributions.shape[1]
+    rows_by_label = {label: np.flatnonzero(labels == label) for label in np.unique(labels)}
+    print('{} rows of {} labels, classifier top-1 accuracy {:.1%}'.format(
+        len(labels), len(rows_by_label), np.mean(np.argmax(distributions, axis=1) == labels)))
+
+    voters = [('count (17 votes)', lambda: CountVoter(num_labels, 17))]
+    for margin in args.margins:
+        voters.append(('sequential m={:g} d={}'.format(margin, args.min_dwell),
+                       lambda margin=margin: SequentialVoter(num_labels, margin=margin, min_dwell=args.min_dwell)))
+    for repeat_frames in args.repeat_frames:
+        voters.append(('sequential r={} d={}'.format(repeat_frames, args.min_dwell),
+                       lambda repeat_frames=repeat_frames: SequentialVoter(
+                           num_labels, min_dwell=args.min_dwell, repeat_frames=repeat_frames)))
+
+    rng = np.random.default_rng(args.seed)
+    sessions = [make_session(rng, rows_by_label, args.signs, args.hold, args.gap, args.gap_probability)
+                for _ in range(args.sessions)]
+    signed = sum(len(segments) for _, segments in sessions)
+
+    print('{:<24} {:>9} {:>9} {:>9} {:>8} {:>8}'.format(
+        'voter', 'mean ms', 'p50 ms', 'p95 ms', 'missed', 'errors'))
+    for name, make_voter in voters:
+        latencies = []
+        missed = 0
+        errors = 0
+        for frames, segments in sessions:
+            session_latencies, session_missed, session_errors = score(
+                replay(make_voter(), frames, distributions, args.score_th), segments)
+            latencies.extend(session_latencies)
+            missed += session_missed
+            errors += session_errors
+
+        latencies = np.array(latencies, dtype=float) / args.fps * 1000 if latencies else np.zeros(1)
+        print('{:<24} {:>9.0f} {:>9.0f} {:>9.0f} {:>7.1%} {:>7.1%}'.format(
+            name, latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 95),
+            missed / signed, errors / signed))
+
+
+if __name__ == '__main__':
+    main()
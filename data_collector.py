@@ -1,18 +1,20 @@
 import csv
-import copy
-import itertools
 import cv2 as cv
 import numpy as np
-import mediapipe as mp
-from model import KeyPointClassifier
+from model import KeyPointClassifier, MODEL_PATH, WEIGHTS_PATH
+from utils import pre_process_landmark
+from utils import calc_frame_landmarks, FRAME_POINTS, FACE_SLICE
+from utils import Pipeline, FaceAnchorTracker, HandRegionDetector, FramePreprocessor
+from utils import OverlayRenderer, StageTimers, LatencyExporter, draw_latency_overlay
+from utils import Command, run_window
+from utils import StartupProfile, load_parallel, load_hands, load_face
 import argparse
 import ctypes
+from concurrent.futures import ThreadPoolExecutor
 from insight import get_insight
-from transition import finalState, startState, transition, dependent
-
-LOOK_UP_TABLE = {
-    'h': ['h_1', 'h_2'],
-}
+from dataset import open_dataset_writer
+from decoder import load_automaton, SignDecoder, BeamDecoder, SIGN, WORD
+from decoder import CountVoter, SequentialVoter
 
 def get_args():
     parser = argparse.ArgumentParser()
@@ -24,23 +26,44 @@ def get_args():
     parser.add_argument('--use_static_image_mode', action='store_true')
     parser.add_argument("--min_detection_confidence", help='min_detection_confidence', type=float, default=0.7)
     parser.add_argument("--min_tracking_confidence", help='min_tracking_confidence', type=int, default=0.5)
+    parser.add_argument("--dataset", help='dataset file to log to, .csv or .bin', default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--classifier", help='tflite: the .tflite model; numpy: its Keras weights, without TFLite', choices=['tflite', 'numpy'], default='tflite')
+    parser.add_argument("--face_interval", help='frames between face detections, tracked in between (1: every frame)', type=int, default=5)
+    parser.add_argument("--mirror_landmarks", help='detect on the frame as captured and mirror the landmarks', action='store_true')
+    parser.add_argument("--hand_region", help='search for hands around the previous ones only', action='store_true')
+    parser.add_argument("--detect_size", help='downscale the searched image to this longer side (pixels)', type=int)
+    parser.add_argument("--face_drift", help='redetect the face earlier once it differs from its template this much (0-255)', type=float, default=12.0)
+
+    parser.add_argument("--decoder", help='greedy: commit signs one by one; beam: search the vocabulary', choices=['greedy', 'beam'], default='greedy')
+    parser.add_argument("--beam_width", help='beam decoder: hypotheses kept per frame', type=int, default=16)
+    parser.add_argument("--voter", help='how a sign is committed', choices=['sequential', 'count'], default='sequential')
+    parser.add_argument("--vote_margin", help='sequential voter: lead in nats needed to commit', type=float, default=8.0)
+    parser.add_argument("--min_dwell", help='sequential voter: frames a sign must lead', type=int, default=3)
+    parser.add_argument("--repeat_frames", help='sequential voter: frames a committed sign is held before it counts again (default: never)', type=int, default=None)
+
+    parser.add_argument("--no_draw", "--no-draw", help='draw no overlays on the frames (headless / kiosk)', action='store_true')
+    parser.add_argument("--latency_overlay", help='show per-stage latencies (toggle with l)', action='store_true')
+    parser.add_argument("--startup_profile", help='print where start-up time goes, up to the first recognized frame', action='store_true')
+    parser.add_argument("--latency_output", help='write latency snapshots to this .json or .prom file')
+    parser.add_argument("--latency_interval", help='seconds between latency snapshots', type=float, default=5.0)
     args = parser.parse_args()
     return args
 
 
-BUFFER = ['_']
-
 def main():
-    global BUFFER
-
-    user32 = ctypes.windll.user32
-    width = int(user32.GetSystemMetrics(0) / 2)
-    height = int(user32.GetSystemMetrics(1) / 2)
-
     # --------------------- Argument parsing --------------------- #
     args = get_args()
+    profile = StartupProfile(verbose=args.startup_profile)
     cap_device = args.device
 
+    if hasattr(ctypes, 'windll'):
+        user32 = ctypes.windll.user32
+        width = int(user32.GetSystemMetrics(0) / 2)
+        height = int(user32.GetSystemMetrics(1) / 2)
+    else:
+        # No screen metrics outside Windows, use the requested capture size
+        width, height = args.width, args.height
+
     use_static_image_mode = args.use_static_image_mode
     min_detection_confidence = args.min_detection_confidence
     min_tracking_confidence = args.min_tracking_confidence
@@ -51,36 +74,34 @@ def main():
     LOGGING_BOOL = False
     NUMBER = 0
     NEXT_AFTER = 12*seconds
-    use_brect = True
     SYMBOL_COUNTER = 0
     # MAX_SYMBOL_COUNTER = 25
     MAX_SYMBOL_COUNTER = 12
 
-    # --------------------- Camera Preparation --------------------- #
-    cap = cv.VideoCapture(cap_device)
-    cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
-    cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
-
-    # --------------------- Load MediaPipe Model --------------------- #
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=use_static_image_mode,
-        max_num_hands=2,
-        min_detection_confidence=min_detection_confidence,
-        min_tracking_confidence=min_tracking_confidence,
-    )
-
-    mp_face = mp.solutions.face_detection
-    face = mp_face.FaceDetection(
-        # static_image_mode=use_static_image_mode,
-        # max_num_hands=2,
-        # min_detection_confidence=min_detection_confidence,
-        # min_tracking_confidence=min_tracking_confidence,
-        model_selection=1, min_detection_confidence=0.5
-    )
-
-    # --------------------- Load NN Classifier Model --------------------- #
-    keypoint_classifier = KeyPointClassifier()
+    model_path = WEIGHTS_PATH if args.classifier == 'numpy' else MODEL_PATH
+
+    # --------------------- Camera, Models and Graphs --------------------- #
+    # Loaded side by side, each graph and the classifier warmed up with one
+    # run so that the first frames do not pay for it
+    def open_camera():
+        cap = cv.VideoCapture(cap_device)
+        cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+        return cap
+
+    loaded = load_parallel({
+        'camera': open_camera,
+        'hands': lambda: load_hands(use_static_image_mode, min_detection_confidence, min_tracking_confidence,
+                                    warm_up_size=(width, height)),
+        'face': lambda: load_face(warm_up_size=(width, height)),
+        'classifier': lambda: KeyPointClassifier(model_path).warm_up(),
+        'automaton': load_automaton,
+    }, profile)
+    cap = loaded['camera']
+    hands = loaded['hands']
+    face = loaded['face']
+    keypoint_classifier = loaded['classifier']
+    automaton = loaded['automaton']
 
     # --------------------- Read Labels --------------------- #
     with open('model/keypoint_classifier/keypoint_classifier_label.csv',
@@ -90,51 +111,48 @@ def main():
             row[0] for row in keypoint_classifier_labels
         ]
 
-    
-    resultDict = {}
+    # --------------------- Sign Decoder --------------------- #
+    if args.voter == 'count':
+        # More than 16 frames of the same label, the original rule
+        voter = CountVoter(len(automaton.labels), vote_frames=17)
+    else:
+        voter = SequentialVoter(len(automaton.labels), margin=args.vote_margin, min_dwell=args.min_dwell,
+                                repeat_frames=args.repeat_frames)
+    if args.decoder == 'beam':
+        sign_decoder = BeamDecoder(automaton, beam_width=args.beam_width)
+    else:
+        sign_decoder = SignDecoder(automaton, voter=voter)
+
+    # --------------------- Dataset Writer --------------------- #
+    dataset_writer = open_dataset_writer(args.dataset)
+
+    # --------------------- Latency Instrumentation --------------------- #
+    timers = StageTimers()
+    latency_overlay = args.latency_overlay
+    latency_exporter = None
+    if args.latency_output:
+        latency_exporter = LatencyExporter(timers, args.latency_output, args.latency_interval)
+
     # --------------------- Initial Setup --------------------- #
+    preprocessor = FramePreprocessor(mirror_landmarks=args.mirror_landmarks)
+    # Detects the face every face_interval frames with hands and tracks it in
+    # between; frames that are logged always get a fresh detection
+    face_tracker = FaceAnchorTracker(face, args.face_interval, args.face_drift, timers,
+                                     mirror=preprocessor.mirror_results)
+    # Crops / downscales what the hands graph sees, landmarks stay full-frame
+    hand_region = HandRegionDetector(hands, args.hand_region, max_size=args.detect_size, timers=timers,
+                                     mirror=preprocessor.mirror_results)
+    # Batched overlays, timed under 'draw'
+    renderer = OverlayRenderer(enabled=not args.no_draw, timers=timers)
+    frame_points = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
     mode = 1
     t = 0
-    t2 = 0
-
-    while True:
-        key = cv.waitKey(10)
-        # if key != -1:
-        #     print(key)
 
-        if key == 27:  # ESC
-            print('Exited the Program!')
-            break
-        elif key == 115 and not STARTED:    # s -> Save to the csv
-            if mode == 1: LOGGING_BOOL = True
-        elif key == 120 and not STARTED:    # x -> Reset the number
-            NUMBER = 0
-            print('Number: ' + str(NUMBER))
-        elif key == 107 and not STARTED:    # k
-            if mode == 1:
-                mode = 0
-                print('Mode: Detecting!')
-            else:
-                mode = 1
-                t = 0
-                print('Mode: Logging Data!')
-        elif 0 <= (key - 48) <= 9 and not STARTED:
-            if mode == 1: NUMBER = NUMBER*10 + (key - 48)
-            print(NUMBER, end=' corresponds to ')
-            print(keypoint_classifier_labels[NUMBER])
-        elif key == 8 and not STARTED:  # backspace -> Delete the last number
-            if mode == 1: NUMBER = int(NUMBER/10)
-            print(NUMBER)
-        elif key == 13 and mode == 1:   # enter -> start/stop the snap shooting
-            STARTED = not STARTED
-            t = 0
-            COUNTER = 0
-            if STARTED: print('Started Logging!')
-            else: print('Stopped Logging!')
-        elif key == 103:    # g -> get insight
-            get_insight()
-        elif key == 104:    # h -> help
-            show_help()
+    # --------------------- Frame Processing --------------------- #
+    # Runs on the pipeline's processing thread, as does handle() below for
+    # the keys
+    def process(image):
+        nonlocal frame_points, t, LOGGING_BOOL, COUNTER, SYMBOL_COUNTER
 
         number = NUMBER
         
@@ -146,529 +164,186 @@ def main():
                 COUNTER = COUNTER + 1
 
 
-        # --------------------- Capture Camera --------------------- #
-        ret, image = cap.read()
-        if not ret:
-            break
-        image = cv.flip(image, 1)  # Mirror display
-        debug_image = copy.deepcopy(image)
-
         # --------------------- Image Pre-Processing --------------------- #
-        image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
-
-        image.flags.writeable = False
-        results = hands.process(image)
-        result2 = face.process(image)
-        image.flags.writeable = True
-
-        data_points = {
-            'Face': [[0, 0]]*1,
-            'Left': [[0, 0]]*21,
-            'Right': [[0, 0]]*21,
-            'detected': False
-        }
-
-        # if face is detected
-        if result2.detections is not None:
-            face_landmarks = result2.detections[0].location_data
-            face_bounding_rect = calc_bounding_rect_face(debug_image, [face_landmarks.relative_bounding_box])
-            face_landmarks_list = calc_landmark_list_face(debug_image, face_landmarks.relative_keypoints)[2: 3]
-            data_points['Face'] = face_landmarks_list
-
-            debug_image = draw_bounding_rect(use_brect, debug_image, face_bounding_rect)
-            debug_image = draw_face_landmarks(debug_image, face_landmarks_list)
-            
+        # The captured frame is mirrored in place and drawn on; the RGB copy
+        # for the detectors goes into a reused buffer
+        with timers.time('preprocess'):
+            debug_image, image = preprocessor.process(image)
+
+        with timers.time('hands'):
+            results = hand_region.process(image, face_tracker.box)
+        result2 = face_tracker.process(image, results.multi_hand_landmarks is not None, force=LOGGING_BOOL)
+
+        with timers.time('landmarks'):
+            frame_points, face_bounding_rect, detected_hands = calc_frame_landmarks(
+                debug_image, results, result2, out=frame_points)
+
+        if face_bounding_rect is not None:
+            renderer.add_face(face_bounding_rect, frame_points[FACE_SLICE])
+        for handedness, landmark_list, brect in detected_hands:
+            renderer.add_hand(landmark_list, brect, handedness.classification[0].label)
+
+        # Second line of the panel
+        status = 'Counter: ' + str(COUNTER) if mode == 1 else ''
 
-        # If hands are detected
-        if results.multi_hand_landmarks is not None:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
-                data_points[handedness.classification[0].label[0:]] = landmark_list
-                # pre_processed_landmark_list = pre_process_landmark(landmark_list)
-                # data_points[handedness.classification[0].label[0:]] = pre_processed_landmark_list
-                data_points['detected'] = True
-
-                # Drawing part
-                debug_image = draw_bounding_rect(use_brect, debug_image, brect)
-                debug_image = draw_landmarks(debug_image, landmark_list)
-                debug_image = draw_info_text(
-                    debug_image,
-                    brect,
-                    handedness,
-                    # keypoint_classifier_labels[hand_sign_id]
-                    ''
-                )
-
-        # Drawing While Rectangle
-        cv.rectangle(debug_image, (0, 0), (150, 60), (255, 255, 255), -1)
-
-        if data_points['detected'] == True:
+        if len(detected_hands) > 0:
             # incrementing the symbol counter
             SYMBOL_COUNTER = SYMBOL_COUNTER + 1
             
             # print('INFINITE')
 
-            # merge the landmarks of two hands
-            merged_landmark_list = np.concatenate((data_points['Face'], data_points['Left'], data_points['Right']), axis=0)
             # convert the points relatively to 1st point
-            pre_process_merged_list = pre_process_landmark(merged_landmark_list)
+            pre_process_merged_list = pre_process_landmark(frame_points)
 
             # --------------------- Write to the dataset file --------------------- #
             if LOGGING_BOOL:
-                logging_csv(number, pre_process_merged_list)
+                dataset_writer.write(number, pre_process_merged_list)
                 print('Data Collected: ' + str(number))
                 LOGGING_BOOL = False
 
             # --------------------- Hand Sign Classification Process --------------------- #
             elif mode == 0:
-                hand_sign_id = keypoint_classifier(pre_process_merged_list)
-
-                if hand_sign_id == None:
+                with timers.time('classify'):
+                    result = keypoint_classifier.predict(pre_process_merged_list, top_k=1)
+                profile.mark('first recognized frame')
+                hand_sign_id = int(result.label_ids[0])
+                confidence = float(result.probabilities[0])
+
+                if confidence <= keypoint_classifier.score_th:
+                    hand_sign_id = None
                     sign = 'Not Trained!'   
                 else:
-                    # symbol = keypoint_classifier_labels[hand_sign_id]
-                    # if len(BUFFER) == 0 or BUFFER[-1] != symbol:
-                    #     if SYMBOL_COUNTER >= MAX_SYMBOL_COUNTER:
-                    #         SYMBOL_COUNTER = 0
-                    #         BUFFER.append(symbol)
-                    #         print(BUFFER)
-                    #         validateBuffer(BUFFER)
                     sign = keypoint_classifier_labels[hand_sign_id]
-                    
-                    # creating a temp hash map that contains the number of times a sign was predicted
-                    try :
-                        resultDict[sign] = resultDict[sign] + 1
-                        prominentSign = max(resultDict, key=resultDict.get)
-                        # if sign occurs more than 16 times then it is most prominent sign and we add it to the buffer
-                        if resultDict[prominentSign] > 16:
-                            BUFFER.append(prominentSign)
-
-                            if prominentSign not in dependent:
-                                print(BUFFER)
-                                BUFFER = ['_']
-                            else:
-                                print(BUFFER)
-
-                            try:
-                                # The part which should be inside a function
-                                index = len(BUFFER) - 1
-                                state = startState
-                                output = ''
-                                while (index > 0 and state not in finalState) :
-                                    inp = BUFFER[index]
-                                    fin = transition[state][inp]
-                                    state = fin['state']
-                                    output = fin['output']
-                                    index = index - 1
-                                
-                                if output != '':
-                                    BUFFER = BUFFER[0: index + 1]
-                                    BUFFER.append(output)
-                                    print(BUFFER)
-                                    BUFFER = ['_']
-
-                            except:
-                                pass
-                            finally:
-                                resultDict = {} 
-                                cv.rectangle(debug_image, (0, 0), (width, height), (255, 255, 255), -1)
-                                    
-                    except:
-                        resultDict[sign] = 1
-
-                cv.putText(debug_image, 'Detected: ' + sign, (10, 50),
-                   cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv.LINE_AA)
-        else:
-            # print(BUFFER)
-            t2 = t2 + 1
-            if t2 > 16 and len(BUFFER) > 1:
-                # if BUFFER[-1] not in dependent:  
-                print(BUFFER)
-                BUFFER = ['_'] 
-                t2 = 0
-
-        # Other Stuff
-        res = int(t*(width/NEXT_AFTER))
-        cv.rectangle(debug_image, (0, height - 20), (res, height), (0, 0, 255), -1)
-        
-        
-        # if (len(BUFFER) > 3) :
-        #     # cv.rectangle(debug_image, (0, height - 20), (res, height), (0, 0, 255), -1)
-        #     cv.putText(debug_image, ''.join(BUFFER[-3: ]), (20, height - 30), cv.FONT_HERSHEY_SIMPLEX, 0.6, (1, 1, 1), 1, cv.LINE_AA)
-
-        mode_info(mode, debug_image, COUNTER)
-
-        # --------------------- Display Screen --------------------- #
-        cv.imshow('Hand Gesture Recognition', debug_image)
-
-    cap.release()
-    cv.destroyAllWindows()
-
-def show_help():
-    print('k \t=>\t change the mode i.e logging/detecting')
-    print('0 - 9 \t=>\t input the label number')
-    print('backspace \t=>\t remove the last digit of the number')
-    print('x \t=>\t reset the number back to 0')
-    print('s \t=>\t add a single data when on logging data mode')
-    print('s \t=>\t add a single data when on logging data mode')
-    print('g \t=>\t get insight on the collected data')
-    print('esc \t=>\t close the application')
-
-def validateBuffer(buffer):
-    global BUFFER
-    
-    try:
-        last = buffer[-1]
-        i = last.index('_')
-        last = last[0: i]
-        list_point = LOOK_UP_TABLE[last]
-
-        if len(buffer) >= len(list_point):
-            for i in range(len(list_point)):
-                if buffer[- len(list_point) + i] == list_point[i]:
-                    print(buffer[- len(list_point) + i], end=' ')
-                    continue
-                else:
-                    return
-            print()
-
-            buffer = [i for i in buffer if '_' not in i]
-            buffer.append(last)
-            BUFFER = buffer
-            # return buffer
-            # buffer[- len(list_point)] = last
-            # del buffer[- len(list_point) + 1: ]
-            # for i in range(len(list_point)): 
-            #     print('removed')
-            #     buffer.pop(- len(list_point) + i)
 
-            # print('found ' + last)
-            # print(buffer)
-    except: 
-        pass
+                with timers.time('fsm'):
+                    events = sign_decoder.update(hand_sign_id, confidence, probabilities=result.distribution)
+                if events:
+                    print_events(events)
+                    renderer.flash()
 
+                status = 'Detected: ' + sign
+        else:
+            # Pending signs are dropped once the hands have been down for a while
+            print_events(sign_decoder.idle())
 
+        # Landmarks, the panel and the progress to the next snapshot
+        mode_text = 'Detecting' if mode == 0 else 'Logging Data'
+        debug_image = renderer.render(debug_image, (mode_text, status), t / NEXT_AFTER)
 
-def calc_bounding_rect(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-    landmark_array = np.empty((0, 2), int)
+        profile.mark('first frame')
+        timers.tick('frame')
+        if latency_overlay:
+            draw_latency_overlay(debug_image, timers.recent_snapshot())
 
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
+        return debug_image
 
-        landmark_point = [np.array((landmark_x, landmark_y))]
+    # --------------------- Key Commands --------------------- #
+    # Sent by the window loop, applied on the processing thread between
+    # frames; reading the dataset for g runs on a thread of its own
+    insight_tasks = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Insight')
 
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
+    def show_insight():
+        try:
+            dataset_writer.flush()
+            get_insight(args.dataset)
+        except Exception as error:
+            print('Insight failed: ' + str(error))
 
-    x, y, w, h = cv.boundingRect(landmark_array)
+    def handle(command):
+        nonlocal STARTED, LOGGING_BOOL, NUMBER, COUNTER, mode, t, latency_overlay
 
-    return [x, y, x + w, y + h]
+        name = command.name
+        if name == 'save' and not STARTED:
+            if mode == 1: LOGGING_BOOL = True
+        elif name == 'reset_number' and not STARTED:
+            NUMBER = 0
+            print('Number: ' + str(NUMBER))
+        elif name == 'mode' and not STARTED:
+            if mode == 1:
+                mode = 0
+                print('Mode: Detecting!')
+            else:
+                mode = 1
+                t = 0
+                print('Mode: Logging Data!')
+        elif name == 'digit' and not STARTED:
+            if mode == 1: NUMBER = NUMBER*10 + command.value
+            print(NUMBER, end=' corresponds to ')
+            print(keypoint_classifier_labels[NUMBER])
+        elif name == 'backspace' and not STARTED:
+            if mode == 1: NUMBER = int(NUMBER/10)
+            print(NUMBER)
+        elif name == 'logging' and mode == 1:
+            STARTED = not STARTED
+            t = 0
+            COUNTER = 0
+            if STARTED: print('Started Logging!')
+            else: print('Stopped Logging!')
+        elif name == 'insight':
+            insight_tasks.submit(show_insight)
+        elif name == 'latency_overlay':
+            latency_overlay = not latency_overlay
 
-def calc_bounding_rect_face(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-    landmark_array = []
+    # --------------------- Capture / Inference Pipeline --------------------- #
+    pipeline = Pipeline(cap, process, timers=timers, handle=handle)
+    pipeline.start()
 
-    for _, landmark in enumerate(landmarks):
-        landmark_x = min(int(landmark.xmin * image_width), image_width - 1)
-        landmark_y = min(int(landmark.ymin * image_height), image_height - 1)
-        landmark_width = min(int(landmark.width * image_width), image_width - 1)
-        landmark_height = min(int(landmark.height * image_height), image_height - 1)
+    # --------------------- Display Screen --------------------- #
+    run_window(pipeline, 'Hand Gesture Recognition', key_command, timers=timers)
+    print('Exited the Program!')
 
-        landmark_array = [landmark_x, landmark_y, landmark_x + landmark_width,  landmark_y + landmark_height]
-    return landmark_array
+    pipeline.stop()
+    insight_tasks.shutdown()
+    if latency_exporter is not None:
+        latency_exporter.close()
 
+    dataset_writer.close()
+    cap.release()
+    cv.destroyAllWindows()
+    if args.startup_profile:
+        print(profile.summary())
+
+# Keys of the window and the commands they send; h is answered right away
+KEY_COMMANDS = {
+    115: 'save',            # s -> save a row to the dataset
+    120: 'reset_number',    # x -> reset the number
+    107: 'mode',            # k -> logging / detecting
+    8: 'backspace',         # backspace -> delete the last digit
+    13: 'logging',          # enter -> start/stop the snap shooting
+    103: 'insight',         # g -> get insight
+    108: 'latency_overlay', # l -> latency overlay
+}
 
-def calc_landmark_list(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
 
-    landmark_point = []
+def key_command(key):
+    if 48 <= key <= 57:
+        return Command('digit', key - 48)
+    if key == 104:  # h -> help
+        show_help()
+        return None
+    name = KEY_COMMANDS.get(key)
+    return Command(name) if name is not None else None
 
-    # Keypoint
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
 
-        landmark_point.append([landmark_x, landmark_y])
+def show_help():
+    print('k \t=>\t change the mode i.e logging/detecting')
+    print('0 - 9 \t=>\t input the label number')
+    print('backspace \t=>\t remove the last digit of the number')
+    print('x \t=>\t reset the number back to 0')
+    print('s \t=>\t add a single data when on logging data mode')
+    print('s \t=>\t add a single data when on logging data mode')
+    print('g \t=>\t get insight on the collected data')
+    print('l \t=>\t show/hide the per-stage latencies')
+    print('esc \t=>\t close the application')
 
-    return landmark_point
-
-def calc_landmark_list_face(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
-
-    return landmark_point
-
-
-def pre_process_landmark(landmark_list):
-    temp_landmark_list = copy.deepcopy(landmark_list)
-
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, landmark_point in enumerate(temp_landmark_list):
-        if index == 0:
-            base_x, base_y = landmark_point[0], landmark_point[1]
-
-        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
-        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
-
-    # Convert to a one-dimensional list
-    temp_landmark_list = list(
-        itertools.chain.from_iterable(temp_landmark_list))
-
-    # Normalization
-    max_value = max(list(map(abs, temp_landmark_list)))
-
-    def normalize_(n):
-        return n / max_value
-
-    temp_landmark_list = list(map(normalize_, temp_landmark_list))
-
-    return temp_landmark_list
-
-
-def logging_csv(number, landmark_list):
-    csv_path = 'model/keypoint_classifier/keypoint.csv'
-    with open(csv_path, 'a', newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([number, *landmark_list])
-
-
-def draw_landmarks(image, landmark_point):
-    if len(landmark_point) > 0:
-        # Thumb
-        cv.line(image, tuple(landmark_point[2]), tuple(landmark_point[3]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[2]), tuple(landmark_point[3]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[3]), tuple(landmark_point[4]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[3]), tuple(landmark_point[4]),
-                (0, 255, 0), 2)
-
-        # Index finger
-        cv.line(image, tuple(landmark_point[5]), tuple(landmark_point[6]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[5]), tuple(landmark_point[6]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[6]), tuple(landmark_point[7]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[6]), tuple(landmark_point[7]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[7]), tuple(landmark_point[8]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[7]), tuple(landmark_point[8]),
-                (0, 255, 0), 2)
-
-        # Middle finger
-        cv.line(image, tuple(landmark_point[9]), tuple(landmark_point[10]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[9]), tuple(landmark_point[10]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[10]), tuple(landmark_point[11]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[10]), tuple(landmark_point[11]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[11]), tuple(landmark_point[12]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[11]), tuple(landmark_point[12]),
-                (0, 255, 0), 2)
-
-        # Ring finger
-        cv.line(image, tuple(landmark_point[13]), tuple(landmark_point[14]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[13]), tuple(landmark_point[14]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[14]), tuple(landmark_point[15]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[14]), tuple(landmark_point[15]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[15]), tuple(landmark_point[16]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[15]), tuple(landmark_point[16]),
-                (0, 255, 0), 2)
-
-        # Little finger
-        cv.line(image, tuple(landmark_point[17]), tuple(landmark_point[18]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[17]), tuple(landmark_point[18]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[18]), tuple(landmark_point[19]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[18]), tuple(landmark_point[19]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[19]), tuple(landmark_point[20]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[19]), tuple(landmark_point[20]),
-                (0, 255, 0), 2)
-
-        # Palm
-        cv.line(image, tuple(landmark_point[0]), tuple(landmark_point[1]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[0]), tuple(landmark_point[1]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[1]), tuple(landmark_point[2]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[1]), tuple(landmark_point[2]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[2]), tuple(landmark_point[5]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[2]), tuple(landmark_point[5]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[5]), tuple(landmark_point[9]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[5]), tuple(landmark_point[9]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[9]), tuple(landmark_point[13]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[9]), tuple(landmark_point[13]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[13]), tuple(landmark_point[17]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[13]), tuple(landmark_point[17]),
-                (0, 255, 0), 2)
-        cv.line(image, tuple(landmark_point[17]), tuple(landmark_point[0]),
-                (0, 0, 0), 6)
-        cv.line(image, tuple(landmark_point[17]), tuple(landmark_point[0]),
-                (0, 255, 0), 2)
-
-    # Key Points
-    for index, landmark in enumerate(landmark_point):
-        if index == 0:  # 手首1
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 1:  # 手首2
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 2:  # 親指：付け根
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 3:  # 親指：第1関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 4:  # 親指：指先
-            cv.circle(image, (landmark[0], landmark[1]), 8, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 8, (0, 0, 0), 1)
-        if index == 5:  # 人差指：付け根
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 6:  # 人差指：第2関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 7:  # 人差指：第1関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 8:  # 人差指：指先
-            cv.circle(image, (landmark[0], landmark[1]), 8, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 8, (0, 0, 0), 1)
-        if index == 9:  # 中指：付け根
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 10:  # 中指：第2関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 11:  # 中指：第1関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 12:  # 中指：指先
-            cv.circle(image, (landmark[0], landmark[1]), 8, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 8, (0, 0, 0), 1)
-        if index == 13:  # 薬指：付け根
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 14:  # 薬指：第2関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 15:  # 薬指：第1関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 16:  # 薬指：指先
-            cv.circle(image, (landmark[0], landmark[1]), 8, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 8, (0, 0, 0), 1)
-        if index == 17:  # 小指：付け根
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 18:  # 小指：第2関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 19:  # 小指：第1関節
-            cv.circle(image, (landmark[0], landmark[1]), 5, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 5, (0, 0, 0), 1)
-        if index == 20:  # 小指：指先
-            cv.circle(image, (landmark[0], landmark[1]), 8, (255, 255, 255),
-                      -1)
-            cv.circle(image, (landmark[0], landmark[1]), 8, (0, 0, 0), 1)
-
-    return image
-
-
-def draw_face_landmarks(image, landmark_points):
-    for index, landmark_point in enumerate(landmark_points):
-        cv.circle(image, (landmark_point[0], landmark_point[1]), 3, (255, 255, 255), -1)
-        # cv.putText(image, str(index), (landmark_point[0], landmark_point[1]), cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv.LINE_AA)
-    return image
-
-def draw_bounding_rect(use_brect, image, brect):
-    if use_brect:
-        # Outer rectangle
-        cv.rectangle(image, (brect[0], brect[1]), (brect[2], brect[3]),
-                     (0, 0, 0), 1)
-    return image
-
-
-def mode_info(mode, image, ctr):
-    mode_text = 'Nothing'
-    if mode == 0:
-        mode_text = 'Detecting'
-    elif mode == 1:
-        mode_text = 'Logging Data'
-        cv.putText(image, 'Counter: ' + str(ctr), (10, 50),
-                   cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv.LINE_AA)
-    cv.putText(image, mode_text, (10, 20),
-               cv.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv.LINE_AA)
-
-
-def draw_info_text(image, brect, handedness, hand_sign_text):
-    cv.rectangle(image, (brect[0], brect[1]), (brect[2], brect[1] - 22),
-                 (0, 0, 0), -1)
-    info_text = handedness.classification[0].label[0:]
-    if hand_sign_text != "":
-        info_text = info_text + ':' + hand_sign_text
-    cv.putText(image, info_text, (brect[0] + 5, brect[1] - 4),
-               cv.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv.LINE_AA)
-    return image
+def print_events(events):
+    for event in events:
+        if event.kind == SIGN:
+            print('Sign: ' + event.text)
+        elif event.kind == WORD:
+            print('Word: ' + event.text)
+        else:
+            print('Dropped: ' + event.text)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,5 @@
+from dataset.writer import DatasetWriter
+from dataset.binary import BinaryDatasetWriter, open_dataset_writer
+from dataset.binary import load_binary_dataset, convert_csv
+from dataset.manifest import DatasetManifest
+from dataset.cache import LandmarkCache
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   python -m dataset convert model/keypoint_classifier/keypoint.csv \
+#                             model/keypoint_classifier/keypoint.bin
+#   python -m dataset info model/keypoint_classifier/keypoint.bin
+#   python -m dataset extract recordings/ model/keypoint_classifier/keypoint.bin
+#   python -m dataset cache info
+#   python -m dataset cache invalidate recordings/a/1.mp4
+import argparse
+import json
+import os
+
+from dataset.binary import LABEL_PATH, convert_csv, count_rows, read_header
+from dataset.cache import CACHE_DIR, CACHE_SIZE, LandmarkCache
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help='convert a keypoint csv to the binary format')
+    convert.add_argument('csv_path')
+    convert.add_argument('bin_path')
+    convert.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    convert.add_argument('--label_path', default=LABEL_PATH)
+
+    info = subparsers.add_parser('info', help='print the header and row count')
+    info.add_argument('bin_path')
+
+    extract = subparsers.add_parser('extract', help='extract rows from a directory of labelled recordings')
+    extract.add_argument('root', help='directory with one sub-directory per label')
+    extract.add_argument('output', help='.csv or .bin dataset to append to')
+    extract.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    extract.add_argument('--every', type=int, default=1, help='use every n-th frame')
+    extract.add_argument('--use_static_image_mode', action='store_true')
+    extract.add_argument('--min_detection_confidence', type=float, default=0.7)
+    extract.add_argument('--min_tracking_confidence', type=float, default=0.5)
+    extract.add_argument('--no_mirror', help='do not mirror frames like the live loops do', action='store_true')
+    extract.add_argument('--label_path', default=LABEL_PATH)
+    extract.add_argument('--cache', default=CACHE_DIR, help='landmark cache directory')
+    extract.add_argument('--cache_size', type=int, default=CACHE_SIZE // 1024 ** 2, help='in MB')
+    extract.add_argument('--no_cache', action='store_true', help='always run the detector')
+
+    cache = subparsers.add_parser('cache', help='inspect or clear the landmark cache')
+    cache.add_argument('action', choices=['info', 'invalidate', 'evict'])
+    cache.add_argument('media', nargs='*', help='recordings to invalidate (default: all)')
+    cache.add_argument('--cache', default=CACHE_DIR, help='landmark cache directory')
+    cache.add_argument('--cache_size', type=int, default=CACHE_SIZE // 1024 ** 2, help='in MB')
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+
+    if args.command == 'convert':
+        rows = convert_csv(args.csv_path, args.bin_path, args.dtype, args.label_path)
+        print('Converted {} rows: {} -> {} ({} -> {} bytes)'.format(
+            rows, args.csv_path, args.bin_path,
+            os.path.getsize(args.csv_path), os.path.getsize(args.bin_path)))
+    elif args.command == 'info':
+        header = read_header(args.bin_path)
+        print(json.dumps(header, indent=2))
+        print('rows: {}'.format(count_rows(args.bin_path, header)))
+    elif args.command == 'extract':
+        # Imported here: the workers load MediaPipe, the other commands do not
+        from dataset.extract import extract_dataset
+
+        extract_dataset(
+            args.root, args.output,
+            workers=args.workers,
+            every=args.every,
+            static_image_mode=args.use_static_image_mode,
+            min_detection_confidence=args.min_detection_confidence,
+            min_tracking_confidence=args.min_tracking_confidence,
+            mirror=not args.no_mirror,
+            label_path=args.label_path,
+            cache=None if args.no_cache else args.cache,
+            cache_size=args.cache_size * 1024 ** 2,
+        )
+    elif args.command == 'cache':
+        cache = LandmarkCache(args.cache, args.cache_size * 1024 ** 2)
+        if args.action == 'invalidate':
+            removed = cache.invalidate(args.media or None)
+            print('Removed {} entries from {}'.format(removed, args.cache))
+        elif args.action == 'evict':
+            removed = cache.evict()
+            print('Evicted {} entries from {}'.format(removed, args.cache))
+        entries = cache.entries()
+        print('{}: {} entries, {:.1f} of {} MB'.format(
+            args.cache, len(entries), sum(size for _, size, _ in entries) / 1024 ** 2, args.cache_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# Binary keypoint dataset: a fixed-size JSON header followed by fixed-size
+# records of (uint16 label, float32/float16 features). Records are only ever
+# appended, so the collectors can write straight into it, and the loader
+# memory-maps the records instead of parsing text.
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+
+from dataset.writer import DatasetWriter
+
+MAGIC = b'KPDS'
+VERSION = 1
+HEADER_SIZE = 512
+NUM_FEATURES = 86
+LABEL_PATH = 'model/keypoint_classifier/keypoint_classifier_label.csv'
+
+
+def label_file_hash(label_path=LABEL_PATH):
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def record_dtype(num_features=NUM_FEATURES, dtype='float32'):
+    return np.dtype([
+        ('label', '<u2'),
+        ('features', np.dtype(dtype).newbyteorder('<'), (num_features,)),
+    ])
+
+
+def make_header(num_features=NUM_FEATURES, dtype='float32', label_path=LABEL_PATH):
+    header = {
+        'version': VERSION,
+        'num_features': num_features,
+        'dtype': np.dtype(dtype).name,
+        'label_dtype': 'uint16',
+        'label_file': label_path,
+        'label_sha1': label_file_hash(label_path),
+    }
+    encoded = MAGIC + json.dumps(header).encode('utf-8')
+    if len(encoded) > HEADER_SIZE:
+        raise ValueError('dataset header does not fit in {} bytes'.format(HEADER_SIZE))
+    return header, encoded.ljust(HEADER_SIZE, b' ')
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or not raw.startswith(MAGIC):
+        raise ValueError(path + ' is not a binary keypoint dataset')
+
+    header = json.loads(raw[len(MAGIC):].decode('utf-8'))
+    if header['version'] != VERSION:
+        raise ValueError('unsupported dataset version {} in {}'.format(header['version'], path))
+    return header
+
+
+def count_rows(path, header=None):
+    # A record cut short by a crash is ignored rather than treated as corrupt
+    header = header or read_header(path)
+    itemsize = record_dtype(header['num_features'], header['dtype']).itemsize
+    return (os.path.getsize(path) - HEADER_SIZE) // itemsize
+
+
+def load_binary_dataset(path, mmap=True, label_path=LABEL_PATH):
+    # Returns (features, labels, header). With mmap=True both arrays are
+    # read-only views into the file: nothing is parsed or copied up front.
+    header = read_header(path)
+    current_hash = label_file_hash(label_path)
+    if current_hash is not None and header['label_sha1'] not in (None, current_hash):
+        warnings.warn('{} was written against a different {}'.format(path, label_path))
+
+    dtype = record_dtype(header['num_features'], header['dtype'])
+    rows = count_rows(path, header)
+    if mmap:
+        records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(rows,))
+    else:
+        records = np.fromfile(path, dtype=dtype, count=rows, offset=HEADER_SIZE)
+
+    return records['features'], records['label'], header
+
+
+class BinaryDatasetWriter(DatasetWriter):
+    # DatasetWriter that appends records to a binary dataset, creating the
+    # header on first use and refusing to mix schemas in one file.
+    def __init__(self, path='model/keypoint_classifier/keypoint.bin',
+                 num_features=NUM_FEATURES, dtype='float32', **kwargs):
+        self.num_features = num_features
+        self.dtype = np.dtype(dtype).name
+        self._record_dtype = record_dtype(num_features, dtype)
+        super().__init__(path, **kwargs)
+
+    def _open(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            header = read_header(self.path)
+            if (header['num_features'], header['dtype']) != (self.num_features, self.dtype):
+                raise ValueError('{} holds {} x {}, not {} x {}'.format(
+                    self.path, header['num_features'], header['dtype'],
+                    self.num_features, self.dtype))
+            f = open(self.path, 'ab')
+            # Drop a partial record left behind by a crash so rows stay aligned
+            f.truncate(HEADER_SIZE + count_rows(self.path, header) * self._record_dtype.itemsize)
+            return f
+
+        f = open(self.path, 'wb')
+        f.write(make_header(self.num_features, self.dtype)[1])
+        return f
+
+    def _write_rows(self, f, rows):
+        records = np.empty(len(rows), dtype=self._record_dtype)
+        for index, (label, features) in enumerate(rows):
+            records[index] = (label, features)
+        f.write(records.tobytes())
+
+
+def open_dataset_writer(path, **kwargs):
+    # Picks the dataset format from the file extension
+    if path.endswith('.bin'):
+        return BinaryDatasetWriter(path, **kwargs)
+    return DatasetWriter(path, **kwargs)
+
+
+def convert_csv(csv_path, bin_path, dtype='float32', label_path=LABEL_PATH):
+    dataset = np.loadtxt(csv_path, delimiter=',', dtype='float64', ndmin=2)
+    labels = dataset[:, 0]
+    if labels.min() < 0 or labels.max() > np.iinfo(np.uint16).max:
+        raise ValueError('labels in {} do not fit in uint16'.format(csv_path))
+
+    records = np.empty(len(dataset), dtype=record_dtype(dataset.shape[1] - 1, dtype))
+    records['label'] = labels
+    records['features'] = dataset[:, 1:]
+
+    with open(bin_path, 'wb') as f:
+        f.write(make_header(dataset.shape[1] - 1, dtype, label_path)[1])
+        f.write(records.tobytes())
+    return len(records)
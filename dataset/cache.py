@@ -0,0 +1,177 @@
+# Content-addressed cache of the raw per-frame landmarks of recorded media.
+# Entries are keyed by a hash of the media contents plus a hash of the
+# detector settings, so renaming a file keeps its entry and changing any
+# setting misses. Entries hold the MediaPipe results as reported, normalized
+# (utils.landmark.calc_raw_landmarks): hand landmarks with z, handedness and
+# scores, the face keypoints and box, and the frame size. FRAME_POINTS and
+# the features are rebuilt from them without running MediaPipe, however
+# either changes.
+#
+#   <cache>/<media hash>-<settings hash>.npz
+#
+# The mtime of an entry is its last use; once the cache grows past max_bytes
+# the least recently used entries are removed. Entries are written aside as
+# *.tmp.npz and renamed; those left by a writer that died are removed by
+# evict() once older than TEMP_AGE seconds.
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Bump when the layout of the cached arrays changes
+CACHE_VERSION = 2
+CACHE_DIR = '.landmark_cache'
+CACHE_SIZE = 2 * 1024 ** 3
+TEMP_AGE = 60 * 60
+
+
+def media_hash(path):
+    # Hash of a video file, or of the names and contents of the images of a
+    # directory in the order they are read
+    from utils.media import IMAGE_EXTENSIONS
+
+    digest = hashlib.sha1()
+    if os.path.isdir(path):
+        files = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        paths = [os.path.join(path, name) for name in files]
+    else:
+        paths = [path]
+
+    for file_path in paths:
+        if file_path != path:
+            # The names decide the order of the frames
+            digest.update(os.path.basename(file_path).encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(settings):
+    data = dict(settings, cache_version=CACHE_VERSION)
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class LandmarkCache(object):
+    def __init__(self, path=CACHE_DIR, max_bytes=CACHE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def key(self, media, settings):
+        return '{}-{}'.format(media_hash(media), settings_hash(settings))
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + '.npz')
+
+    def get(self, key):
+        # dict of the arrays put() stored, or None
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as data:
+                entry = {name: data[name] for name in data.files if name != 'info'}
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, source, settings, landmarks):
+        # landmarks: name -> array with one row per processed frame, the
+        # calc_raw_landmarks arrays stacked (dataset.extract.detect_recording)
+        os.makedirs(self.path, exist_ok=True)
+        entry_path = self._entry_path(key)
+        # Written aside and renamed so that readers in other processes never
+        # see a partial entry
+        temp_path = '{}.{}.{}.tmp.npz'.format(entry_path, os.getpid(), threading.get_ident())
+        info = json.dumps({'source': source, 'settings': settings})
+        try:
+            np.savez(temp_path, info=np.array(info), **landmarks)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            _remove(temp_path)
+            raise
+        self.evict()
+
+    def entries(self):
+        # [(path, size, last used)] oldest first
+        entries = []
+        for entry_path in glob.glob(os.path.join(self.path, '*.npz')):
+            if entry_path.endswith('.tmp.npz'):
+                continue
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((entry_path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        # Removes least recently used entries until the cache fits, and stale
+        # temporary files
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        self.remove_stale()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for entry_path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                removed += 1
+            except FileNotFoundError:
+                # Evicted concurrently by another worker
+                pass
+            total -= size
+        return removed
+
+    def remove_stale(self, max_age=TEMP_AGE):
+        # Removes the temporary files older than max_age seconds: put() renames
+        # its own within moments, so these were left by a writer that died
+        removed = 0
+        now = time.time()
+        for temp_path in glob.glob(os.path.join(self.path, '*.tmp.npz')):
+            try:
+                if now - os.stat(temp_path).st_mtime < max_age:
+                    continue
+            except OSError:
+                continue
+            removed += _remove(temp_path)
+        return removed
+
+    def invalidate(self, media=None):
+        # Removes the entries of the given media (under any settings), or all
+        # entries when media is None
+        if media is None:
+            patterns = ['*.npz']
+        else:
+            patterns = ['{}-*.npz'.format(media_hash(path)) for path in media]
+
+        removed = 0
+        for pattern in patterns:
+            for entry_path in glob.glob(os.path.join(self.path, pattern)):
+                try:
+                    os.remove(entry_path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def _remove(path):
+    # 1 if path was removed, 0 if it was already gone
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
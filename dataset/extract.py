@@ -0,0 +1,189 @@
+# Offline dataset extraction: runs the hands + face detection pipeline over
+# a corpus of labelled recordings with one MediaPipe graph per worker
+# process and emits the same 86-feature rows the collectors log.
+#
+# The corpus is laid out as <root>/<label>/<video or image folder>, where
+# <label> is either a name from keypoint_classifier_label.csv or its id.
+# The raw landmarks of each recording are kept in a LandmarkCache, so
+# changing the features only rebuilds FRAME_POINTS and re-runs
+# pre_process_landmark.
+import csv
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from dataset.binary import LABEL_PATH, NUM_FEATURES, open_dataset_writer
+from dataset.cache import CACHE_DIR, CACHE_SIZE, LandmarkCache
+
+# Per worker process: the settings handed over by _init_worker and the
+# detectors built from them on first use
+_settings = None
+_detectors = {}
+
+
+def read_labels(label_path=LABEL_PATH):
+    with open(label_path, encoding='utf-8-sig') as f:
+        return [row[0] for row in csv.reader(f)]
+
+
+def find_corpus(root, labels):
+    # [(label_id, media_path)] for every recording under root
+    from utils.media import list_media
+
+    tasks = []
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            continue
+        if name in labels:
+            label_id = labels.index(name)
+        elif name.isdigit() and int(name) < len(labels):
+            label_id = int(name)
+        else:
+            raise ValueError('{} is not a label in {}'.format(name, LABEL_PATH))
+
+        for media in list_media(directory):
+            tasks.append((label_id, media))
+    return tasks
+
+
+def _init_worker(settings):
+    global _settings
+    _settings = settings
+
+
+def _get_detector(static_image_mode):
+    # Image folders need static mode, videos track; keep one graph of each
+    # kind per worker rather than one per recording
+    from utils.detector import LandmarkDetector
+
+    if static_image_mode not in _detectors:
+        _detectors[static_image_mode] = LandmarkDetector(
+            static_image_mode=static_image_mode,
+            min_detection_confidence=_settings['detector']['min_detection_confidence'],
+            min_tracking_confidence=_settings['detector']['min_tracking_confidence'],
+            mirror=_settings['detector']['mirror'],
+        )
+    return _detectors[static_image_mode]
+
+
+def detect_recording(media, static_image_mode, every=1):
+    # Raw MediaPipe results of every processed frame of one recording, as
+    # calc_raw_landmarks arrays stacked over the frames
+    from utils.landmark import calc_raw_landmarks
+    from utils.media import open_media
+
+    detector = _get_detector(static_image_mode)
+    # Nothing tracked in a previous recording may leak into this one, so the
+    # rows do not depend on which worker got which recording
+    detector.reset()
+    cap = open_media(media)
+    frames = []
+    frame_index = 0
+    while True:
+        ret, image = cap.read()
+        if not ret:
+            break
+        if frame_index % every == 0:
+            frames.append(calc_raw_landmarks(*detector.detect(image)))
+        frame_index += 1
+    cap.release()
+
+    if not frames:
+        return empty_landmarks()
+    return {name: np.stack([frame[name] for frame in frames]) for name in frames[0]}
+
+
+def empty_landmarks():
+    from utils.landmark import FACE_KEYPOINTS, HAND_LANDMARKS, MAX_HANDS
+
+    return {
+        'hand_landmarks': np.zeros((0, MAX_HANDS, HAND_LANDMARKS, 3), dtype=np.float32),
+        'handedness': np.zeros((0, MAX_HANDS), dtype=np.int8),
+        'hand_scores': np.zeros((0, MAX_HANDS), dtype=np.float32),
+        'face_keypoints': np.zeros((0, FACE_KEYPOINTS, 2), dtype=np.float32),
+        'face_box': np.zeros((0, 4), dtype=np.float32),
+        'face_score': np.zeros(0, dtype=np.float32),
+        'frame_size': np.zeros((0, 2), dtype=np.int32),
+    }
+
+
+def _extract(task):
+    from utils.landmark import calc_frame_points, pre_process_landmark
+
+    label_id, media = task
+    static_image_mode = _settings['static_image_mode'] or os.path.isdir(media)
+    detector_settings = dict(_settings['detector'], static_image_mode=static_image_mode)
+
+    landmarks = None
+    cached = False
+    if _settings['cache'] is not None:
+        cache = LandmarkCache(_settings['cache'], _settings['cache_size'])
+        key = cache.key(media, detector_settings)
+        landmarks = cache.get(key)
+        cached = landmarks is not None
+    if landmarks is None:
+        landmarks = detect_recording(media, static_image_mode, _settings['detector']['every'])
+        if _settings['cache'] is not None:
+            cache.put(key, media, detector_settings, landmarks)
+
+    # Only frames with a hand are logged, as in the live loop; one
+    # vectorized call for the whole recording
+    with_hands = (landmarks['handedness'] >= 0).any(axis=1)
+    frame_points = calc_frame_points({name: array[with_hands] for name, array in landmarks.items()})
+    if len(frame_points):
+        features = pre_process_landmark(frame_points)
+    else:
+        features = np.zeros((0, NUM_FEATURES))
+    return label_id, media, features, len(with_hands), cached
+
+
+def extract_dataset(root, output, workers=None, every=1, static_image_mode=False,
+                    min_detection_confidence=0.7, min_tracking_confidence=0.5,
+                    mirror=True, label_path=LABEL_PATH,
+                    cache=CACHE_DIR, cache_size=CACHE_SIZE):
+    # cache: directory of the landmark cache, or None to always run the
+    # detector
+    labels = read_labels(label_path)
+    tasks = find_corpus(root, labels)
+    settings = {
+        'static_image_mode': static_image_mode,
+        # Everything that changes the detected landmarks, i.e. the cache key
+        'detector': {
+            'every': every,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence,
+            'mirror': mirror,
+        },
+        'cache': cache,
+        'cache_size': cache_size,
+    }
+
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    total_frames = 0
+    total_rows = 0
+    cache_hits = 0
+    writer = open_dataset_writer(output)
+    # 'spawn' keeps each worker's MediaPipe graph independent of the parent
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker, initargs=(settings,)) as pool:
+        # imap keeps the corpus order, so the output is reproducible
+        for label_id, media, features, frames, cached in pool.imap(_extract, tasks):
+            for row in features:
+                writer.write(label_id, row)
+            total_frames += frames
+            total_rows += len(features)
+            cache_hits += cached
+            print('{}: {} -> {} rows{}'.format(
+                media, labels[label_id], len(features), ' (cached)' if cached else ''))
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    print('Extracted {} rows from {} frames of {} recordings in {:.1f}s with {} workers ({:.1f} frames/s)'.format(
+        total_rows, total_frames, len(tasks), elapsed, workers, total_frames / max(elapsed, 1e-9)))
+    if cache is not None:
+        print('Landmark cache: {} of {} recordings cached'.format(cache_hits, len(tasks)))
+    return total_rows
@@ -0,0 +1,128 @@
+# Sidecar manifest of a dataset file (<dataset>.manifest.json) holding the
+# row count and per-label counts / first and last row, plus the byte size and
+# mtime of the dataset it describes. DatasetWriter keeps it current as it
+# appends; if the file grew behind its back only the new tail is scanned.
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+def manifest_path(dataset_path):
+    return dataset_path + '.manifest.json'
+
+
+class DatasetManifest(object):
+    def __init__(self, dataset_path):
+        self.dataset_path = dataset_path
+        self.path = manifest_path(dataset_path)
+        self.rows = 0
+        # Byte offset up to which the dataset has been counted
+        self.size = 0
+        self.mtime = None
+        self.labels = {}
+
+    @classmethod
+    def load(cls, dataset_path):
+        manifest = cls(dataset_path)
+        if os.path.exists(manifest.path):
+            with open(manifest.path, 'r') as f:
+                data = json.load(f)
+            manifest.rows = data['rows']
+            manifest.size = data['size']
+            manifest.mtime = data['mtime']
+            manifest.labels = data['labels']
+        return manifest
+
+    def save(self):
+        data = {
+            'dataset': os.path.basename(self.dataset_path),
+            'rows': self.rows,
+            'size': self.size,
+            'mtime': self.mtime,
+            'updated': time.time(),
+            'labels': self.labels,
+        }
+        temp_path = '{}.{}.tmp'.format(self.path, threading.get_ident())
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def add_rows(self, labels, size):
+        # labels: labels of the rows that now end at byte offset size
+        for label in labels:
+            label = str(label)
+            entry = self.labels.get(label)
+            if entry is None:
+                entry = self.labels[label] = {'count': 0, 'first_row': self.rows, 'last_row': self.rows}
+            entry['count'] += 1
+            entry['last_row'] = self.rows
+            self.rows += 1
+
+        self.size = size
+        if os.path.exists(self.dataset_path):
+            self.mtime = os.path.getmtime(self.dataset_path)
+
+    def counts(self):
+        return {label: entry['count'] for label, entry in self.labels.items()}
+
+    def is_current(self):
+        return (os.path.exists(self.dataset_path)
+                and os.path.getsize(self.dataset_path) == self.size)
+
+    def refresh(self):
+        # Counts rows appended since the manifest was last written. Only the
+        # unseen tail is read; a file that shrank is counted from scratch.
+        # Returns the number of rows added.
+        if not os.path.exists(self.dataset_path):
+            return 0
+        if os.path.getsize(self.dataset_path) < self.size:
+            self._reset()
+
+        rows = self.rows
+        if self.dataset_path.endswith('.bin'):
+            labels, size = _scan_binary(self.dataset_path, self.size)
+        else:
+            labels, size = _scan_csv(self.dataset_path, self.size)
+        self.add_rows(labels, size)
+        return self.rows - rows
+
+    def rebuild(self):
+        self._reset()
+        self.refresh()
+        self.save()
+
+    def _reset(self):
+        self.rows = 0
+        self.size = 0
+        self.mtime = None
+        self.labels = {}
+
+
+def _scan_csv(path, start):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        tail = f.read()
+
+    # A line without its newline is still being written, leave it for later
+    end = tail.rfind(b'\n') + 1
+    labels = [line.split(b',', 1)[0].decode('ascii')
+              for line in tail[:end].splitlines() if line.strip()]
+    return labels, start + end
+
+
+def _scan_binary(path, start):
+    # dataset.binary imports the writer, which imports this module
+    from dataset.binary import HEADER_SIZE, read_header, record_dtype
+
+    if os.path.getsize(path) < HEADER_SIZE:
+        return [], start
+
+    header = read_header(path)
+    dtype = record_dtype(header['num_features'], header['dtype'])
+    start = max(start, HEADER_SIZE)
+    count = (os.path.getsize(path) - start) // dtype.itemsize
+    records = np.fromfile(path, dtype=dtype, count=count, offset=start)
+    return records['label'].tolist(), start + count * dtype.itemsize
@@ -0,0 +1,170 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from dataset.manifest import DatasetManifest
+
+_CLOSE = object()
+
+
+class DatasetWriter(object):
+    # Appends (label, features) rows to a dataset file from a background
+    # thread so the capture loop never waits on the disk.
+    #
+    # Rows go through a bounded queue (write() only blocks if the writer is
+    # max_queue rows behind), are written in batches of up to batch_rows and
+    # fsync'ed at most every fsync_interval seconds. Pending rows are flushed
+    # by close(), which is also registered with atexit so a crash of the
+    # frame loop does not lose them. With manifest=True the sidecar manifest
+    # (see dataset/manifest.py) is updated alongside every fsync. Like a
+    # file object, write() and flush() raise ValueError once it is closed.
+    def __init__(
+        self,
+        path='model/keypoint_classifier/keypoint.csv',
+        max_queue=1024,
+        batch_rows=64,
+        fsync_interval=1.0,
+        manifest=True,
+    ):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.fsync_interval = fsync_interval
+        self.manifest = manifest
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._closed = False
+        # Opened by the writer thread once the first row arrives
+        self._file = None
+        self._manifest = None
+
+        self._thread = threading.Thread(target=self._run, name='DatasetWriter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, label, features):
+        self._check_open()
+        self._raise_error()
+        self._queue.put((label, np.asarray(features).tolist()))
+
+    def flush(self):
+        # Blocks until every row queued so far is on disk
+        self._check_open()
+        self._raise_error()
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self._raise_error()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._raise_error()
+
+    def _check_open(self):
+        # Nothing consumes the queue after close(), flush() would wait forever
+        if self._closed:
+            raise ValueError('writer is closed')
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError('dataset writer failed for ' + self.path) from self._error
+
+    def _open(self):
+        return open(self.path, 'a', newline="")
+
+    def _write_rows(self, f, rows):
+        writer = csv.writer(f)
+        for label, features in rows:
+            writer.writerow([label, *features])
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as error:
+            self._error = error
+            # Keep draining so producers blocked on a full queue wake up
+            while True:
+                item = self._queue.get()
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _CLOSE:
+                    break
+
+    def _loop(self):
+        last_sync = time.monotonic()
+        dirty = False
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+
+            rows = []
+            markers = []
+            while item is not None:
+                if isinstance(item, tuple):
+                    rows.append(item)
+                else:
+                    markers.append(item)
+                if markers or len(rows) >= self.batch_rows:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            try:
+                if rows:
+                    if self._file is None:
+                        self._file = self._open()
+                        if self.manifest:
+                            self._manifest = DatasetManifest.load(self.path)
+                            self._manifest.refresh()
+                    self._write_rows(self._file, rows)
+                    self._file.flush()
+                    dirty = True
+                    if self._manifest is not None:
+                        self._manifest.add_rows([label for label, _ in rows],
+                                                os.fstat(self._file.fileno()).st_size)
+
+                now = time.monotonic()
+                if dirty and (markers or now - last_sync >= self.fsync_interval):
+                    os.fsync(self._file.fileno())
+                    last_sync = now
+                    dirty = False
+                    if self._manifest is not None:
+                        self._manifest.save()
+            except BaseException as error:
+                self._error = error
+                if _CLOSE in markers:
+                    # close() is already waiting, there is nothing left to drain
+                    return
+                raise
+            finally:
+                # Wake flush() callers even if the write failed
+                for marker in markers:
+                    if marker is not _CLOSE:
+                        marker.set()
+
+            if _CLOSE in markers:
+                if self._file is not None:
+                    self._file.close()
+                return
@@ -0,0 +1,6 @@
+from decoder.automaton import SignAutomaton, Walk, compile_automaton, load_automaton, load_transition_automaton
+from decoder.automaton import UNKNOWN, NO_WORD
+from decoder.sign_decoder import SignDecoder, DecoderEvent, SIGN, WORD, RESET
+from decoder.voting import CountVoter, SequentialVoter
+from decoder.beam import BeamDecoder, word_sequences
+from decoder.vocabulary import read_vocabulary, check_vocabulary, build_automaton, load_vocabulary
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   python -m decoder check
+#   python -m decoder check my_vocabulary.csv --label_path my_labels.csv
+#   python -m decoder words
+import argparse
+
+from decoder.automaton import LABEL_PATH
+from decoder.vocabulary import VOCABULARY_PATH, load_vocabulary, read_vocabulary
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    check = subparsers.add_parser('check', help='build the automaton of a vocabulary and refresh its cache')
+    check.add_argument('vocabulary_path', nargs='?', default=VOCABULARY_PATH)
+    check.add_argument('--label_path', default=LABEL_PATH)
+
+    words = subparsers.add_parser('words', help='list the words and the signs they are made of')
+    words.add_argument('vocabulary_path', nargs='?', default=VOCABULARY_PATH)
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+
+    if args.command == 'check':
+        vocabulary = read_vocabulary(args.vocabulary_path)
+        automaton = load_vocabulary(args.vocabulary_path, args.label_path)
+        single = sum(1 for _, signs in vocabulary if len(signs) == 1)
+        print('{}: {} words ({} single signs), {} states, longest word {} signs'.format(
+            args.vocabulary_path, len(vocabulary), single, len(automaton.states), automaton.max_length))
+        if automaton.unknown_inputs:
+            print('Not classifier labels: ' + ', '.join(automaton.unknown_inputs))
+    elif args.command == 'words':
+        for word, signs in read_vocabulary(args.vocabulary_path):
+            print('{:<20} {}'.format(word, ' '.join(signs)))
+
+
+if __name__ == '__main__':
+    main()
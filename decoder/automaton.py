@@ -0,0 +1,166 @@
+# A sign vocabulary (decoder.vocabulary, or the hand-written transition.py)
+# compiled into dense integer tables indexed by classifier label id:
+#
+#   next_state[state, label]  -> next state, or UNKNOWN
+#   output[state, label]      -> index into outputs ('' for no word)
+#
+# A step is two array lookups; nothing is hashed per frame, and a sign
+# without a transition is reported as UNKNOWN rather than raising KeyError.
+import csv
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+LABEL_PATH = 'model/keypoint_classifier/keypoint_classifier_label.csv'
+UNKNOWN = -1
+NO_WORD = 0
+
+# Result of walking a sign buffer. word: index into outputs (NO_WORD if no
+# word was completed); length: signs the word used; unknown: label id that
+# had no transition, or UNKNOWN if the walk never left the table.
+Walk = namedtuple('Walk', ['word', 'length', 'unknown'])
+
+
+class SignAutomaton(object):
+    def __init__(self, next_state, output, outputs, final, dependent, start, states, labels,
+                 unknown_inputs=(), max_length=None):
+        self.next_state = next_state
+        self.output = output
+        self.outputs = outputs
+        self.final = final
+        self.dependent = dependent
+        self.start = start
+        self.states = states
+        self.labels = labels
+        self.unknown_inputs = tuple(sorted(unknown_inputs))
+        # The same tables as a dict of edges per state, {label id: (next
+        # state, output)}: looking up a small int in a dict from Python is
+        # several times cheaper than indexing a numpy array element, and
+        # takes memory by edge rather than by state and label
+        self._edges = [{} for _ in range(len(next_state))]
+        for state, label_id in zip(*np.nonzero(next_state != UNKNOWN)):
+            self._edges[state][int(label_id)] = (int(next_state[state, label_id]), int(output[state, label_id]))
+        self._final = final.tolist()
+        # Longest path through the table: how far back a walk can read
+        if max_length is None:
+            max_length = _longest_path(next_state, final, start)
+        self.max_length = max_length
+
+    def step(self, state, label_id):
+        # (next state, output id); next state is UNKNOWN if the table has no
+        # transition for label_id in state
+        return self._edges[state].get(label_id, (UNKNOWN, NO_WORD))
+
+    def sign_word(self, label_id):
+        # The word a sign that is not dependent spells by itself: the
+        # table's output for it, or else its label
+        next_state, output = self.step(self.start, label_id)
+        if next_state != UNKNOWN and output != NO_WORD:
+            return self.outputs[output]
+        return self.labels[label_id]
+
+    def walk(self, label_ids):
+        # The walk data_collector.py does over BUFFER: the table is read from
+        # the most recent sign backwards until a final state is reached.
+        state = self.start
+        length = 0
+        word = NO_WORD
+        for label_id in reversed(label_ids):
+            if self._final[state]:
+                break
+            edge = self._edges[state].get(label_id)
+            if edge is None:
+                return Walk(NO_WORD, 0, label_id)
+            state, word = edge
+            length += 1
+        if word == NO_WORD:
+            length = 0
+        return Walk(word, length, UNKNOWN)
+
+
+def _longest_path(next_state, final, start):
+    # Longest run of transitions from start before a final state; the table
+    # is a tree of words, a cycle would make walks unbounded
+    longest = 0
+    stack = [(start, 0, frozenset([start]))]
+    while stack:
+        state, depth, seen = stack.pop()
+        longest = max(longest, depth)
+        if final[state]:
+            continue
+        for target in next_state[state][next_state[state] != UNKNOWN]:
+            target = int(target)
+            if target in seen:
+                raise ValueError('transition table has a cycle through ' + str(target))
+            stack.append((target, depth + 1, seen | {target}))
+    return longest
+
+
+def compile_automaton(transition, start_state, final_states, labels, dependent=()):
+    # transition: {state: {input: {'state': next, 'output': word}}} as in
+    # transition.py; labels: classifier labels in label-id order.
+    # States numbered in order of appearance, the start state first
+    state_ids = {start_state: 0}
+    for state, edges in transition.items():
+        for name in [state] + [edge['state'] for edge in edges.values()]:
+            state_ids.setdefault(name, len(state_ids))
+    for name in final_states:
+        state_ids.setdefault(name, len(state_ids))
+    states = list(state_ids)
+    label_ids = {name: index for index, name in enumerate(labels)}
+
+    outputs = ['']
+    output_ids = {'': NO_WORD}
+    # int16 holds every vocabulary written by hand; generated ones may not
+    words = {edge['output'] for edges in transition.values() for edge in edges.values()}
+    dtype = np.int16 if max(len(states), len(words) + 1) <= np.iinfo(np.int16).max else np.int32
+    next_state = np.full((len(states), len(labels)), UNKNOWN, dtype=dtype)
+    output = np.full((len(states), len(labels)), NO_WORD, dtype=dtype)
+    unknown_inputs = set()
+    for state, edges in transition.items():
+        for inp, edge in edges.items():
+            if inp not in label_ids:
+                unknown_inputs.add(inp)
+                continue
+            word = edge['output']
+            if word not in output_ids:
+                output_ids[word] = len(outputs)
+                outputs.append(word)
+            next_state[state_ids[state], label_ids[inp]] = state_ids[edge['state']]
+            output[state_ids[state], label_ids[inp]] = output_ids[word]
+
+    if unknown_inputs:
+        warn_unknown_inputs(unknown_inputs)
+
+    final = np.zeros(len(states), dtype=bool)
+    final[[state_ids[name] for name in final_states]] = True
+    dependent_ids = np.zeros(len(labels), dtype=bool)
+    dependent_ids[[label_ids[name] for name in dependent if name in label_ids]] = True
+
+    return SignAutomaton(next_state, output, outputs, final, dependent_ids,
+                         state_ids[start_state], states, list(labels), unknown_inputs)
+
+
+def warn_unknown_inputs(unknown_inputs):
+    warnings.warn('transition table inputs that are not classifier labels: '
+                  + ', '.join(sorted(unknown_inputs)))
+
+
+def read_labels(label_path=LABEL_PATH):
+    with open(label_path, encoding='utf-8-sig') as f:
+        return [row[0] for row in csv.reader(f)]
+
+
+def load_transition_automaton(label_path=LABEL_PATH):
+    # The hand-written table of transition.py against the classifier's labels
+    from transition import dependent, finalState, startState, transition
+
+    return compile_automaton(transition, startState, finalState, read_labels(label_path), dependent)
+
+
+def load_automaton(label_path=LABEL_PATH, vocabulary_path=None, cache=True):
+    # The vocabulary file (decoder.vocabulary) against the classifier's labels
+    from decoder.vocabulary import VOCABULARY_PATH, load_vocabulary
+
+    return load_vocabulary(vocabulary_path or VOCABULARY_PATH, label_path, cache)
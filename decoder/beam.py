@@ -0,0 +1,186 @@
+# Beam search over the classifier's per-frame probability vectors,
+# constrained by the sign vocabulary. Instead of committing one hard label
+# at a time, every hypothesis is a segmentation of the frames into held
+# signs that spells words of the automaton, scored by the summed
+# log-probabilities of its frames; the best few are kept each frame. A word
+# is emitted once every surviving hypothesis agrees on it, or when the hands
+# drop.
+#
+# Segments that do not belong to any word (filler) are allowed at a cost,
+# so an unknown sign does not force a wrong word.
+import numpy as np
+
+from decoder.automaton import NO_WORD, UNKNOWN
+from decoder.sign_decoder import DecoderEvent, WORD
+
+ROOT = 0
+NO_LABEL = -1
+
+
+def word_sequences(automaton):
+    # [(label ids in the order they are signed, word)] for every word of
+    # the automaton, plus every sign that is a word by itself. The table
+    # reads signs backwards, so its paths are reversed.
+    words = []
+    stack = [(automaton.start, ())]
+    while stack:
+        state, path = stack.pop()
+        for label_id in np.flatnonzero(automaton.next_state[state] != UNKNOWN):
+            label_id = int(label_id)
+            next_state, output = automaton.step(state, label_id)
+            if automaton.final[next_state]:
+                if output != NO_WORD:
+                    words.append((tuple(reversed(path + (label_id,))), automaton.outputs[output]))
+            else:
+                stack.append((next_state, path + (label_id,)))
+
+    for label_id in range(len(automaton.labels)):
+        if not automaton.dependent[label_id]:
+            words.append(((label_id,), automaton.sign_word(label_id)))
+    # A table may list signs that are words by themselves, too
+    return sorted(set(words))
+
+
+class BeamDecoder(object):
+    # Same interface as SignDecoder: feed update() for every frame with a
+    # hand and idle() for every frame without, get WORD events back.
+    #
+    # beam_width:      hypotheses kept per frame
+    # top_labels:      a new sign may only start on one of the frame's
+    #                  top_labels most likely labels (at most all of them)
+    # min_segment:     frames a sign is held at least
+    # switch_penalty:  cost (nats) of starting a new sign
+    # filler_penalty:  extra cost of a sign outside the vocabulary, or of
+    #                  abandoning an unfinished word
+    # beam_threshold:  hypotheses scoring more than this (nats) below the
+    #                  best are dropped, even with room left in the beam
+    # idle_frames:     frames without a hand that end the utterance
+    def __init__(self, automaton, beam_width=16, top_labels=4, min_segment=8,
+                 switch_penalty=4.0, filler_penalty=8.0, beam_threshold=30.0,
+                 idle_frames=5, floor=1e-4):
+        self.automaton = automaton
+        self.labels = automaton.labels
+        self.beam_width = beam_width
+        self.top_labels = max(1, min(top_labels, len(self.labels)))
+        self.min_segment = min_segment
+        self.switch_penalty = switch_penalty
+        self.filler_penalty = filler_penalty
+        self.beam_threshold = beam_threshold
+        self.idle_frames = idle_frames
+        self.floor = floor
+
+        # Prefix tree of the vocabulary: children[node] = {label id: node}
+        self.children = [{}]
+        self.words = [None]
+        for sequence, word in word_sequences(automaton):
+            node = ROOT
+            for label_id in sequence:
+                child = self.children[node].get(label_id)
+                if child is None:
+                    child = len(self.children)
+                    self.children[node][label_id] = child
+                    self.children.append({})
+                    self.words.append(None)
+                node = child
+            self.words[node] = word
+
+        self._log_probabilities = np.empty(len(self.labels))
+        self.reset()
+
+    def reset(self):
+        # A hypothesis: (score, trie node, label held, frames held, gap,
+        # words not yet emitted). node is the trie node reached with the
+        # held sign; gap is set after frames without a hand, when the same
+        # label may start a new sign.
+        self._beam = [(0.0, ROOT, NO_LABEL, 0, False, ())]
+        self._idle = 0
+
+    def update(self, label_id, confidence=1.0, timestamp=None, probabilities=None):
+        self._idle = 0
+        log_probabilities = self._log_probabilities
+        if probabilities is None:
+            if label_id is None:
+                return []
+            log_probabilities.fill(np.log(self.floor))
+            log_probabilities[label_id] = np.log(max(confidence, self.floor))
+        else:
+            log_probabilities[:len(probabilities)] = probabilities
+            log_probabilities[len(probabilities):] = self.floor
+            np.maximum(log_probabilities, self.floor, out=log_probabilities)
+            np.log(log_probabilities, out=log_probabilities)
+
+        top = np.argpartition(log_probabilities, -self.top_labels)[-self.top_labels:].tolist()
+        log_p = log_probabilities.tolist()
+
+        candidates = {}
+
+        def push(score, node, label, held, gap, words):
+            key = (node, label, min(held, self.min_segment), gap)
+            best = candidates.get(key)
+            if best is None or score > best[0]:
+                candidates[key] = (score, node, label, held, gap, words)
+
+        children = self.children
+        root_children = children[ROOT]
+        for score, node, label, held, gap, words in self._beam:
+            if label != NO_LABEL:
+                # Keep holding the same sign
+                push(score + log_p[label], node, label, held + 1, False, words)
+            if label != NO_LABEL and held < self.min_segment and not gap:
+                continue
+
+            word = self.words[node]
+            finished = words + (word,) if word is not None else words
+            # Leaving a word unfinished costs as much as a filler sign
+            leave = 0.0 if word is not None or node == ROOT else self.filler_penalty
+            for next_label in top:
+                if next_label == label and not gap:
+                    continue
+                start = score + log_p[next_label] - self.switch_penalty
+                child = children[node].get(next_label)
+                if child is not None:
+                    push(start, child, next_label, 1, False, words)
+                child = root_children.get(next_label)
+                if child is not None:
+                    push(start - leave, child, next_label, 1, False, finished)
+                push(start - leave - self.filler_penalty, ROOT, next_label, 1, False, finished)
+
+        beam = sorted(candidates.values(), key=lambda hypothesis: hypothesis[0], reverse=True)
+        best = beam[0][0]
+        beam = [hypothesis for hypothesis in beam[:self.beam_width]
+                if hypothesis[0] >= best - self.beam_threshold]
+        # Keep the scores small
+        self._beam = [(hypothesis[0] - best,) + hypothesis[1:] for hypothesis in beam]
+        return self._emit_agreed(timestamp)
+
+    def idle(self, timestamp=None):
+        # One frame without a hand: the held sign ends; after idle_frames
+        # the best hypothesis is final
+        self._idle += 1
+        if self._idle < self.idle_frames:
+            self._beam = [(score, node, label, held, True, words)
+                          for score, node, label, held, _, words in self._beam]
+            return []
+        if self._idle > self.idle_frames:
+            return []
+
+        score, node, label, held, gap, words = self._beam[0]
+        if self.words[node] is not None:
+            words = words + (self.words[node],)
+        self.reset()
+        self._idle = self.idle_frames
+        return [DecoderEvent(WORD, None, word, timestamp) for word in words]
+
+    def _emit_agreed(self, timestamp):
+        # Words at the start of every hypothesis cannot change any more
+        first = self._beam[0][5]
+        agreed = 0
+        while agreed < len(first) and all(
+                len(hypothesis[5]) > agreed and hypothesis[5][agreed] == first[agreed]
+                for hypothesis in self._beam):
+            agreed += 1
+        if agreed == 0:
+            return []
+
+        self._beam = [hypothesis[:5] + (hypothesis[5][agreed:],) for hypothesis in self._beam]
+        return [DecoderEvent(WORD, None, word, timestamp) for word in first[:agreed]]
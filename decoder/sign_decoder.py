@@ -0,0 +1,93 @@
+# Streaming decoder from per-frame classifier labels to words. Replaces the
+# BUFFER / resultDict handling that lived in data_collector.py's frame loop:
+#
+#   votes:   every frame with a hand goes to a voter (decoder.voting),
+#            which decides when a label is committed as a sign; by default
+#            the original count of vote_frames votes
+#   signs:   a sign that is not part of any longer word (not dependent) is
+#            a word on its own; otherwise the pending signs are walked
+#            through the compiled automaton, which reads them backwards
+#   idle:    idle_frames consecutive frames without a hand drop the pending
+#            signs; any frame with a hand starts the count again (the old
+#            loop counted them since the last word or reset)
+#
+# Memory is bounded by the number of labels and the longest word, and the
+# output only depends on the sequence of update() / idle() calls.
+from collections import deque, namedtuple
+
+from decoder.automaton import NO_WORD
+from decoder.voting import CountVoter
+
+SIGN = 'sign'
+WORD = 'word'
+RESET = 'reset'
+
+# kind: SIGN (a sign was committed), WORD (a word was recognized) or RESET
+# (pending signs were dropped); label_id: the committed sign, or None;
+# text: the sign label / the word / the dropped signs joined by spaces
+DecoderEvent = namedtuple('DecoderEvent', ['kind', 'label_id', 'text', 'timestamp'])
+
+
+class SignDecoder(object):
+    def __init__(self, automaton, vote_frames=17, idle_frames=17, voter=None):
+        self.automaton = automaton
+        self.labels = automaton.labels
+        self.idle_frames = idle_frames
+        if voter is None:
+            voter = CountVoter(len(self.labels), vote_frames)
+        self.voter = voter
+
+        # The walk never reads further back than the longest word
+        self._pending = deque(maxlen=max(automaton.max_length, 1))
+        self._idle = 0
+
+    @property
+    def pending(self):
+        # Label ids of the committed signs not yet part of a word
+        return list(self._pending)
+
+    def reset(self):
+        self.voter.reset()
+        self._pending.clear()
+        self._idle = 0
+
+    def update(self, label_id, confidence=1.0, timestamp=None, probabilities=None):
+        # One frame with a hand. label_id is None for a frame whose
+        # classification was below the classifier's threshold; confidence is
+        # its probability and probabilities the classifier's distribution,
+        # for voters that weigh them. Returns the events it caused.
+        self._idle = 0
+        label_id = self.voter.update(label_id, probabilities, confidence)
+        if label_id is None:
+            return []
+        return self._commit(label_id, timestamp)
+
+    def idle(self, timestamp=None):
+        # One frame without a hand
+        self.voter.idle()
+        if not self._pending:
+            return []
+        self._idle += 1
+        if self._idle < self.idle_frames:
+            return []
+
+        text = ' '.join(self.labels[label_id] for label_id in self._pending)
+        self.voter.reset()
+        self._pending.clear()
+        self._idle = 0
+        return [DecoderEvent(RESET, None, text, timestamp)]
+
+    def _commit(self, label_id, timestamp):
+        events = [DecoderEvent(SIGN, label_id, self.labels[label_id], timestamp)]
+        if not self.automaton.dependent[label_id]:
+            # A word by itself
+            self._pending.clear()
+            events.append(DecoderEvent(WORD, label_id, self.automaton.sign_word(label_id), timestamp))
+            return events
+
+        self._pending.append(label_id)
+        walk = self.automaton.walk(self._pending)
+        if walk.word != NO_WORD:
+            self._pending.clear()
+            events.append(DecoderEvent(WORD, label_id, self.automaton.outputs[walk.word], timestamp))
+        return events
@@ -0,0 +1,177 @@
+# The vocabulary file: one word per row, followed by the signs (classifier
+# labels) it is made of, in the order they are signed:
+#
+#   hello,hello_1,hello_2
+#   you,you
+#
+# A row with a single sign makes that sign a word by itself; every other
+# label is dependent and waits for the rest of a word. Rows starting with #
+# are comments.
+#
+# build_automaton() turns the rows into SignAutomaton tables. The tables
+# read signs backwards from the most recent one, so they are a trie of the
+# reversed sign sequences with equivalent states merged: every word ends in
+# the same final state and words that end alike share their states.
+import csv
+import hashlib
+import os
+import warnings
+from collections import deque
+
+import numpy as np
+
+from decoder.automaton import LABEL_PATH, SignAutomaton, compile_automaton, read_labels
+from decoder.automaton import warn_unknown_inputs
+
+VOCABULARY_PATH = 'model/keypoint_classifier/keypoint_classifier_vocabulary.csv'
+# Bump when the tables built from the same files change
+VOCABULARY_VERSION = 1
+
+
+def read_vocabulary(path=VOCABULARY_PATH):
+    # [(word, (sign, ...))] in file order
+    vocabulary = []
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for line, row in enumerate(csv.reader(f), 1):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith('#'):
+                continue
+            signs = tuple(cell for cell in row[1:] if cell)
+            if not signs:
+                raise ValueError('{}:{}: word {!r} has no signs'.format(path, line, row[0]))
+            vocabulary.append((row[0], signs))
+    return vocabulary
+
+
+def check_vocabulary(vocabulary):
+    # A word whose signs appear, in a row, inside another word is recognized
+    # as soon as they are signed, and the pending signs are cleared, so the
+    # longer word could never be completed.
+    words = {}
+    for word, signs in vocabulary:
+        if words.setdefault(signs, word) != word:
+            raise ValueError('{!r} and {!r} are both signed {}'.format(
+                words[signs], word, ' '.join(signs)))
+
+    conflicts = []
+    for signs, word in words.items():
+        for end in range(1, len(signs) + 1):
+            for start in range(end):
+                inner = signs[start:end]
+                if inner != signs and inner in words:
+                    conflicts.append('{!r} ({}) inside {!r} ({})'.format(
+                        words[inner], ' '.join(inner), word, ' '.join(signs)))
+    if conflicts:
+        raise ValueError('words that hide longer words: ' + '; '.join(sorted(set(conflicts))))
+
+
+def build_automaton(vocabulary, labels):
+    # vocabulary: [(word, (sign, ...))]; labels: classifier labels in
+    # label-id order
+    check_vocabulary(vocabulary)
+
+    # Trie of the reversed sign sequences; ends[node] is the word a leaf
+    # completes. No word is inside another, so words end only at leaves.
+    children = [{}]
+    ends = [None]
+    for word, signs in vocabulary:
+        node = 0
+        for sign in reversed(signs):
+            child = children[node].get(sign)
+            if child is None:
+                child = len(children)
+                children[node][sign] = child
+                children.append({})
+                ends.append(None)
+            node = child
+        ends[node] = word
+
+    # Merge states with the same outgoing edges, children first (a child is
+    # always created after its parent). All leaves become the final state.
+    merged = [0] * len(children)
+    signatures = {}
+    for node in range(len(children) - 1, -1, -1):
+        signature = tuple(sorted((sign, merged[child], ends[child] or '')
+                                 for sign, child in children[node].items()))
+        merged[node] = signatures.setdefault(signature, len(signatures))
+
+    # Name the merged states in the order they are reached from the start
+    final = signatures.get(()) if len(children) > 1 else None
+    names = {merged[0]: 'q1'}
+    transition = {}
+    queue = deque([0])
+    while queue:
+        node = queue.popleft()
+        edges = transition[names[merged[node]]] = {}
+        for sign, child in children[node].items():
+            target = merged[child]
+            if target not in names:
+                names[target] = 'q' + str(len(names) + 1)
+                if target != final:
+                    queue.append(child)
+            edges[sign] = {'state': names[target], 'output': ends[child] or ''}
+
+    final_states = [names[final]] if final is not None else []
+    single = {signs[0] for _, signs in vocabulary if len(signs) == 1}
+    dependent = [label for label in labels if label not in single]
+    return compile_automaton(transition, 'q1', final_states, labels, dependent)
+
+
+def vocabulary_key(vocabulary_path, label_path):
+    # Content hash of everything the tables are built from
+    digest = hashlib.sha1(str(VOCABULARY_VERSION).encode())
+    for path in (vocabulary_path, label_path):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def save_automaton(automaton, path, key=''):
+    # Written to a temporary file first, so a reader never sees half of it
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, key=np.array(key), next_state=automaton.next_state, output=automaton.output,
+                 outputs=np.array(automaton.outputs, dtype=str), final=automaton.final,
+                 dependent=automaton.dependent, start=np.array(automaton.start),
+                 states=np.array(automaton.states, dtype=str),
+                 labels=np.array(automaton.labels, dtype=str),
+                 unknown_inputs=np.array(automaton.unknown_inputs, dtype=str),
+                 max_length=np.array(automaton.max_length))
+    os.replace(tmp_path, path)
+
+
+def load_saved_automaton(path, key=None):
+    # The automaton save_automaton() wrote, or None if it is missing,
+    # unreadable or was saved under another key
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if key is not None and str(data['key']) != key:
+                return None
+            return SignAutomaton(data['next_state'], data['output'], data['outputs'].tolist(),
+                                 data['final'], data['dependent'], int(data['start']),
+                                 data['states'].tolist(), data['labels'].tolist(),
+                                 data['unknown_inputs'].tolist(), int(data['max_length']))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_vocabulary(vocabulary_path=VOCABULARY_PATH, label_path=LABEL_PATH, cache=True):
+    # The automaton of a vocabulary file. With cache, the tables are kept in
+    # <vocabulary>.cache.npz and rebuilt when either file changes.
+    cache_path = vocabulary_path + '.cache.npz'
+    key = vocabulary_key(vocabulary_path, label_path)
+    if cache:
+        automaton = load_saved_automaton(cache_path, key)
+        if automaton is not None:
+            if automaton.unknown_inputs:
+                warn_unknown_inputs(automaton.unknown_inputs)
+            return automaton
+
+    automaton = build_automaton(read_vocabulary(vocabulary_path), read_labels(label_path))
+    if cache:
+        try:
+            save_automaton(automaton, cache_path, key)
+        except OSError as e:
+            warnings.warn('could not cache the vocabulary tables: {}'.format(e))
+    return automaton
@@ -0,0 +1,142 @@
+# Voters turn the per-frame classifier output into committed signs. Each
+# one is fed every frame with a hand and returns the label id it commits on
+# that frame, or None. update() gets the label id (None below the
+# classifier's threshold), the classifier's distribution if there is one,
+# and the confidence of the label.
+import numpy as np
+
+
+class CountVoter(object):
+    # The original rule: every frame above the classifier's threshold votes
+    # for its label, the first label to reach vote_frames votes is committed
+    # and all votes are cleared. Every vote counts the same, whatever its
+    # confidence.
+    def __init__(self, num_labels, vote_frames=17):
+        self.vote_frames = vote_frames
+        self._votes = [0] * num_labels
+        # Labels with a non-zero vote, so clearing does not touch every label
+        self._voted = []
+
+    def update(self, label_id, probabilities=None, confidence=1.0):
+        if label_id is None:
+            return None
+
+        votes = self._votes[label_id] + 1
+        self._votes[label_id] = votes
+        if votes == 1:
+            self._voted.append(label_id)
+        if votes < self.vote_frames:
+            return None
+
+        self.reset()
+        return label_id
+
+    def idle(self):
+        # Votes survive frames without a hand, as they always have
+        pass
+
+    def reset(self):
+        for label_id in self._voted:
+            self._votes[label_id] = 0
+        self._voted = []
+
+
+class SequentialVoter(object):
+    # Sequential test on the classifier's probability vectors. Every frame
+    # adds log(p) to a per-label score, the scores are kept relative to the
+    # best one and clipped at -window, so old evidence is forgotten. A label
+    # is committed once
+    #
+    #   - it leads every other label by margin (in nats),
+    #   - it has led for min_dwell consecutive frames, and
+    #   - it is not the label committed last, unless that one was released
+    #     first: another label led it by release_margin, the hand left, or
+    #     it kept the lead for repeat_frames frames since its commit.
+    #
+    # By default (repeat_frames=None) the hold is only released by another
+    # label or the hand leaving, so a sign made twice in a row (the a, a of
+    # 'answer') needs the hands to drop in between. With repeat_frames,
+    # holding a sign that many more frames commits it again, as the count
+    # voter does every vote_frames frames; but a sign simply held long is
+    # then read twice, which on the dataset's classifier output
+    # (benchmark/voting.py) costs far more than it wins.
+    #
+    # Confident frames add about log(0.99 / floor) ~ 9 nats of lead each,
+    # so a clear sign commits in min_dwell frames; frames that are split
+    # between labels add little and the voter keeps waiting. Without a
+    # distribution, a frame puts its confidence on its label and spreads the
+    # rest evenly over the others.
+    def __init__(self, num_labels, margin=8.0, min_dwell=3, release_margin=None,
+                 window=None, floor=1e-4, repeat_frames=None):
+        self.margin = margin
+        self.min_dwell = min_dwell
+        self.repeat_frames = repeat_frames
+        self.release_margin = margin / 2 if release_margin is None else release_margin
+        self.window = 2 * margin if window is None else window
+        self.floor = floor
+
+        self._scores = np.zeros(num_labels)
+        self._log_probabilities = np.full(num_labels, np.log(floor))
+        self._leader = None
+        self._dwell = 0
+        self._held = None
+        self._held_frames = 0
+
+    def update(self, label_id, probabilities=None, confidence=1.0):
+        if probabilities is None:
+            if label_id is None:
+                return None
+            # Only a hard decision and its confidence
+            rest = (1.0 - confidence) / max(len(self._scores) - 1, 1)
+            self._log_probabilities.fill(np.log(max(rest, self.floor)))
+            self._log_probabilities[label_id] = np.log(max(confidence, self.floor))
+        else:
+            # The model may know fewer classes than the label file
+            log_probabilities = self._log_probabilities[:len(probabilities)]
+            np.maximum(probabilities, self.floor, out=log_probabilities)
+            np.log(log_probabilities, out=log_probabilities)
+            self._log_probabilities[len(probabilities):] = np.log(self.floor)
+
+        scores = self._scores
+        scores += self._log_probabilities
+        leader = int(np.argmax(scores))
+        scores -= scores[leader]
+        np.maximum(scores, -self.window, out=scores)
+
+        if leader == self._leader:
+            self._dwell += 1
+        else:
+            self._leader = leader
+            self._dwell = 1
+
+        held = self._held
+        if held is not None:
+            if held != leader:
+                if scores[held] <= -self.release_margin:
+                    self._held = held = None
+            else:
+                self._held_frames += 1
+                if self.repeat_frames is not None and self._held_frames >= self.repeat_frames:
+                    # Held for another sign's worth of frames: the same sign again
+                    self._held = held = None
+        if leader == held or self._dwell < self.min_dwell:
+            return None
+
+        # Lead over the runner-up; the leader's own score is 0
+        if -np.partition(scores, -2)[-2] < self.margin:
+            return None
+
+        self._held = leader
+        self._held_frames = 0
+        return leader
+
+    def idle(self):
+        # The hand left: the sign is over
+        self.reset()
+
+    def reset(self):
+        self._scores.fill(0.0)
+        self._leader = None
+        self._dwell = 0
+        self._held = None
+        self._held_frames = 0
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Scores one or more .tflite (or Keras .hdf5) models against a dataset file,
+# .csv or memory-mapped .bin, e.g.
+#   python evaluate.py --model model/keypoint_classifier/keypoint_classifier_v1.tflite \
+#                      --model model/keypoint_classifier/keypoint_classifier_v2.tflite
+import argparse
+import time
+
+import numpy as np
+
+from dataset import load_binary_dataset
+from model import KeyPointClassifier
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--dataset", help='.csv or .bin dataset file', default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--model", action='append',
+                        help='.tflite or .hdf5 model to score, can be repeated')
+    parser.add_argument("--batch_size", help='rows per interpreter call', type=int, default=4096)
+    parser.add_argument("--num_threads", type=int, default=1)
+    args = parser.parse_args()
+    return args
+
+
+def load_dataset(path):
+    # (features, labels). A binary dataset stays memory-mapped in the dtype
+    # of its header; predict_batch converts it one batch at a time.
+    if path.endswith('.bin'):
+        features, labels, _ = load_binary_dataset(path)
+        return features, labels
+    dataset = np.loadtxt(path, delimiter=',', dtype='float32', ndmin=2)
+    return dataset[:, 1:], dataset[:, 0].astype(np.int32)
+
+
+def main():
+    args = get_args()
+    model_paths = args.model or ['model/keypoint_classifier/keypoint_classifier.tflite']
+
+    features, labels = load_dataset(args.dataset)
+
+    for model_path in model_paths:
+        keypoint_classifier = KeyPointClassifier(model_path=model_path,
+                                                 num_threads=args.num_threads)
+
+        start = time.perf_counter()
+        probabilities = keypoint_classifier.predict_batch(features, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        predictions = np.argmax(probabilities, axis=1)
+        accuracy = np.mean(predictions == labels)
+        print(f"{model_path}: accuracy {accuracy:.4f} on {len(labels)} rows, "
+              f"{len(labels) / elapsed:.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
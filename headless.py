@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Runs the recognizer over recorded media instead of a camera, without any
+# window, as fast as the CPU allows. Inputs are video files or directories
+# (of images, or of further videos); one JSON line per frame is written with
+# the raw frame landmarks and the recognized sign.
+#
+#   python headless.py recordings/ --output recognized.jsonl
+import argparse
+import csv
+import json
+import os
+import time
+
+from model import KeyPointClassifier
+from utils import pre_process_landmark
+from utils import LandmarkDetector, PrefetchReader, list_media, open_media
+from utils import StageTimers
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("inputs", nargs='+', help='video files or directories')
+    parser.add_argument("--output", help='JSON lines file to write', default='recognized.jsonl')
+    parser.add_argument("--model", default='model/keypoint_classifier/keypoint_classifier.tflite')
+
+    parser.add_argument('--use_static_image_mode', action='store_true')
+    parser.add_argument("--min_detection_confidence", help='min_detection_confidence', type=float, default=0.7)
+    parser.add_argument("--min_tracking_confidence", help='min_tracking_confidence', type=float, default=0.5)
+    parser.add_argument("--no_mirror", help='do not mirror frames like the live loops do', action='store_true')
+    parser.add_argument("--hand_region", help='search videos for hands around the previous ones only', action='store_true')
+    parser.add_argument("--detect_size", help='downscale the searched image to this longer side (pixels)', type=int)
+    parser.add_argument("--face_interval", help='frames between face detections in videos (1: every frame)', type=int, default=1)
+    parser.add_argument("--latency_output", help='write the per-stage latencies to this .json file')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = get_args()
+
+    # --------------------- Load NN Classifier Model --------------------- #
+    keypoint_classifier = KeyPointClassifier(model_path=args.model)
+
+    # --------------------- Read Labels --------------------- #
+    with open('model/keypoint_classifier/keypoint_classifier_label.csv',
+              encoding='utf-8-sig') as f:
+        keypoint_classifier_labels = csv.reader(f)
+        keypoint_classifier_labels = [
+            row[0] for row in keypoint_classifier_labels
+        ]
+
+    media = [source for path in args.inputs for source in list_media(path)]
+    timers = StageTimers()
+
+    # Graphs are loaded once per kind of source, not per source; between
+    # sources their tracking state is reset
+    detectors = {}
+
+    def get_detector(unrelated):
+        detector = detectors.get(unrelated)
+        if detector is not None:
+            detector.reset()
+            return detector
+        detector = detectors[unrelated] = LandmarkDetector(
+            static_image_mode=args.use_static_image_mode or unrelated,
+            min_detection_confidence=args.min_detection_confidence,
+            min_tracking_confidence=args.min_tracking_confidence,
+            mirror=not args.no_mirror,
+            timers=timers,
+            face_interval=1 if unrelated else args.face_interval,
+            hand_region=args.hand_region and not unrelated,
+            detect_size=args.detect_size,
+        )
+        return detector
+
+    total_frames = 0
+    total_start = time.perf_counter()
+    try:
+        with open(args.output, 'w') as output:
+            for source in media:
+                # Image folders hold unrelated frames, so nothing can be tracked
+                unrelated = os.path.isdir(source)
+                detector = get_detector(unrelated)
+                face_tracker, hand_region = detector.face_tracker, detector.hand_region
+                counts = (face_tracker.detections, face_tracker.frames,
+                          hand_region.full_searches, hand_region.searches)
+                reader = PrefetchReader(open_media(source))
+
+                frames = 0
+                start = time.perf_counter()
+                # Closed however the loop ends, or its thread stays blocked on
+                # the queue with the capture open
+                try:
+                    for frame_index, image in enumerate(reader):
+                        frame_points, _, detected_hands = detector.process(image)
+
+                        record = {
+                            'source': source,
+                            'frame': frame_index,
+                            'hands': [handedness.classification[0].label
+                                      for handedness, _, _ in detected_hands],
+                            'landmarks': frame_points.tolist(),
+                        }
+                        if len(detected_hands) > 0:
+                            with timers.time('classify'):
+                                result = keypoint_classifier.predict(pre_process_landmark(frame_points), top_k=1)
+                            hand_sign_id = int(result.label_ids[0])
+                            confidence = float(result.probabilities[0])
+
+                            record['label_id'] = hand_sign_id
+                            record['confidence'] = confidence
+                            if confidence > keypoint_classifier.score_th:
+                                record['sign'] = keypoint_classifier_labels[hand_sign_id]
+                            else:
+                                record['sign'] = 'Not Trained!'
+
+                        output.write(json.dumps(record) + '\n')
+                        frames += 1
+                finally:
+                    reader.close()
+
+                elapsed = time.perf_counter() - start
+                total_frames += frames
+                face_detections, face_frames, full_searches, searches = (
+                    now - before for now, before in zip((face_tracker.detections, face_tracker.frames,
+                                                         hand_region.full_searches, hand_region.searches), counts))
+                print(f"{source}: {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} fps, "
+                      f"face detected on {face_detections / max(face_frames, 1):.0%}, "
+                      f"{full_searches}/{searches} hand searches full-frame)")
+    finally:
+        for detector in detectors.values():
+            detector.close()
+
+    elapsed = time.perf_counter() - total_start
+    print(f"Processed {total_frames} frames from {len(media)} inputs in {elapsed:.1f}s -> {args.output}")
+
+    snapshot = timers.snapshot()
+    for name, stage in snapshot['stages'].items():
+        print(f"{name:<10} p50 {stage['p50']:7.2f}  p95 {stage['p95']:7.2f}  "
+              f"p99 {stage['p99']:7.2f}  max {stage['max']:7.2f} ms")
+    if args.latency_output:
+        with open(args.latency_output, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
+import argparse
 import csv
+import os
 
-def get_insight():
+from dataset.manifest import DatasetManifest
+
+def get_insight(dataset_path='model/keypoint_classifier/keypoint.csv'):
     # read and store the keypoint labels
     with open('model/keypoint_classifier/keypoint_classifier_label.csv', encoding='utf-8-sig') as f:
         keypoint_classifier_labels = csv.reader(f)
@@ -8,18 +12,27 @@ def get_insight():
             row[0] for row in keypoint_classifier_labels
         ]
 
-    # Create a dictionary to store the counts
-    number_counts = {}
-    with open('model/keypoint_classifier/keypoint.csv', 'r') as file:
-        csv_reader = csv.reader(file)
-
-        for row in csv_reader:
-            if row:
-                first_column_value = row[0]
-                number_counts[first_column_value] = number_counts.get(first_column_value, 0) + 1
+    # The counts come from the sidecar manifest, only rows appended behind
+    # its back (if any) are read from the dataset itself
+    if not os.path.exists(dataset_path):
+        raise FileNotFoundError('no dataset at ' + dataset_path)
+    manifest = DatasetManifest.load(dataset_path)
+    if not manifest.is_current():
+        manifest.refresh()
+        manifest.save()
 
-    for number, count in number_counts.items():
+    for number, count in manifest.counts().items():
         print(f"{keypoint_classifier_labels[int(number)]}: {count} occurrences")
 
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default='model/keypoint_classifier/keypoint.csv')
+    parser.add_argument("--rebuild", help='recount the manifest from the dataset file', action='store_true')
+    args = parser.parse_args()
+    return args
+
 if __name__ == '__main__':
-    get_insight()
\ No newline at end of file
+    args = get_args()
+    if args.rebuild:
+        DatasetManifest(args.dataset).rebuild()
+    get_insight(args.dataset)
@@ -1 +1,4 @@
-from model.keypoint_classifier.keypoint_classifier import KeyPointClassifier
\ No newline at end of file
+from model.keypoint_classifier.keypoint_classifier import KeyPointClassifier
+from model.keypoint_classifier.keypoint_classifier import KeyPointResult
+from model.keypoint_classifier.keypoint_classifier import MODEL_PATH, WEIGHTS_PATH
+from model.keypoint_classifier.numpy_mlp import NumpyMLP, load_mlp
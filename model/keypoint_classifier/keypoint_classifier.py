@@ -1,38 +1,151 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import time
+from collections import namedtuple
+
 import numpy as np
-import tensorflow as tf
+
+from model.keypoint_classifier.numpy_mlp import load_mlp
+
+# The deployed TFLite model and the Keras model it was converted from
+MODEL_PATH = 'model/keypoint_classifier/keypoint_classifier.tflite'
+WEIGHTS_PATH = 'model/keypoint_classifier/keypoint_classifier.hdf5'
+
+# label_ids / probabilities: the top-k classes, most likely first
+# distribution: the full softmax vector of the frame
+# latency_us: time spent in interpreter.invoke() or the NumPy forward pass
+KeyPointResult = namedtuple(
+    'KeyPointResult', ['label_ids', 'probabilities', 'distribution', 'latency_us'])
+
+
+def load_interpreter(model_path, num_threads=1):
+    # The TFLite interpreter of tflite_runtime when it is installed, as it
+    # loads in a fraction of the time importing TensorFlow takes. Otherwise
+    # TensorFlow's; it is imported here, not with this module, so that
+    # neither is loaded until a .tflite model is.
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
 
 
 class KeyPointClassifier(object):
+    # Runs a .tflite model through the TFLite interpreter or, given the
+    # Keras .hdf5 model, runs it with NumpyMLP: neither TFLite nor
+    # TensorFlow is needed, and batches run several times faster. A single
+    # row is slower, about 1.7-2x invoke(), as it takes a few NumPy calls
+    # per layer whose overhead outweighs the math; the live loops keep the
+    # .tflite model. quantize (NumpyMLP) rounds the weights like the
+    # .tflite conversion did, so both backends agree.
     def __init__(
         self,
-        model_path='model/keypoint_classifier/keypoint_classifier.tflite',
+        model_path=MODEL_PATH,
         num_threads=1,
+        score_th=0.9,
+        quantize='weights',
     ):
-        self.interpreter = tf.lite.Interpreter(model_path=model_path,
-                                               num_threads=num_threads)
-        self.interpreter.allocate_tensors()
-        self.input_details = self.interpreter.get_input_details()
-        self.output_details = self.interpreter.get_output_details()
+        self.score_th = score_th
+        if model_path.endswith(('.hdf5', '.h5')):
+            self.backend = 'numpy'
+            self.interpreter = None
+            self.network = load_mlp(model_path, quantize)
+            input_size = self.network.input_size
+        else:
+            self.backend = 'tflite'
+            self.network = None
+            self.interpreter = load_interpreter(model_path, num_threads)
+            self.interpreter.allocate_tensors()
+            self.input_details = self.interpreter.get_input_details()
+            self.output_details = self.interpreter.get_output_details()
+
+            self._input_index = self.input_details[0]['index']
+            self._output_index = self.output_details[0]['index']
+
+            # Batch size the input tensor is currently allocated for
+            self._batch_size = int(self.input_details[0]['shape'][0])
+            input_size = self.input_details[0]['shape'][1]
+
+        # Reused by predict() so the live path does not allocate its input
+        self._input = np.zeros((1, input_size), dtype=np.float32)
+
+    def warm_up(self):
+        # One inference on zeros: the first invoke() sets up the kernels and
+        # delegate, better at start-up than on the first sign
+        self.predict(np.zeros(self._input.shape[1], dtype=np.float32), top_k=1)
+        return self
 
     def __call__(
         self,
         landmark_list,
     ):
-        input_details_tensor_index = self.input_details[0]['index']
-        self.interpreter.set_tensor(
-            input_details_tensor_index,
-            np.array([landmark_list], dtype=np.float32))
-        self.interpreter.invoke()
+        result = self.predict(landmark_list, top_k=1)
 
-        output_details_tensor_index = self.output_details[0]['index']
+        if result.probabilities[0] > self.score_th: # defines confidence
+            return result.label_ids[0]
+        else:
+            return None
 
-        result = np.squeeze(self.interpreter.get_tensor(output_details_tensor_index)
-)
-        result_index = np.argmax(result)
+    def predict(self, landmark_list, top_k=3):
+        # Single frame fast path: fills the preallocated input buffer in place
+        # and returns a KeyPointResult instead of a bare index. top_k past
+        # the number of classes returns them all.
+        if top_k < 1:
+            raise ValueError('top_k must be at least 1, got {}'.format(top_k))
+        self._input[0] = landmark_list
+        if self.network is not None:
+            start = time.perf_counter_ns()
+            distribution = self.network(self._input[0])
+            latency_us = (time.perf_counter_ns() - start) / 1000
+        else:
+            if self._batch_size != 1:
+                self._resize(1)
+            self.interpreter.set_tensor(self._input_index, self._input)
+
+            start = time.perf_counter_ns()
+            self.interpreter.invoke()
+            latency_us = (time.perf_counter_ns() - start) / 1000
 
-        if result[result_index] > 0.9: # defines confidence
-            return result_index
+            distribution = self.interpreter.get_tensor(self._output_index)[0]
+
+        top_k = min(top_k, len(distribution))
+        if top_k == 1:
+            label_ids = np.array([np.argmax(distribution)])
         else:
-            return None
+            label_ids = np.argpartition(distribution, -top_k)[-top_k:]
+            label_ids = label_ids[np.argsort(distribution[label_ids])[::-1]]
+
+        return KeyPointResult(label_ids, distribution[label_ids], distribution, latency_us)
+
+    def predict_batch(self, features, batch_size=None):
+        # features: (B, 86) -> probabilities (B, num_classes).
+        # batch_size splits very large inputs into chunks of that size; the
+        # input tensor is only resized when the chunk size changes. Chunks
+        # are converted to float32 one at a time, so a memory-mapped float16
+        # dataset is never converted as a whole.
+        if batch_size is None or len(features) <= batch_size:
+            return self._invoke(np.ascontiguousarray(features, dtype=np.float32))
+
+        return np.concatenate([
+            self._invoke(np.ascontiguousarray(features[start:start + batch_size], dtype=np.float32))
+            for start in range(0, len(features), batch_size)
+        ])
+
+    def _invoke(self, features):
+        if self.network is not None:
+            return self.network(features)
+
+        if len(features) != self._batch_size:
+            self._resize(len(features))
+
+        self.interpreter.set_tensor(self._input_index, features)
+        self.interpreter.invoke()
+
+        return self.interpreter.get_tensor(self._output_index)
+
+    def _resize(self, batch_size):
+        self.interpreter.resize_tensor_input(self._input_index,
+                                             [batch_size, self._input.shape[1]])
+        self.interpreter.allocate_tensors()
+        self._batch_size = batch_size
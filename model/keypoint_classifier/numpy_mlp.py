@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import warnings
+
+import numpy as np
+
+# Bump when the cache layout changes
+MLP_CACHE_VERSION = 1
+
+ACTIVATIONS = ('relu', 'softmax', 'linear')
+
+# How the weights are used:
+#   None:       as trained, the float Keras model
+#   'weights':  rounded to int8 like TFLiteConverter's dynamic range
+#               quantization (Optimize.DEFAULT) does, one scale per kernel
+#   'dynamic':  also quantizes each layer's input per row, as TFLite's
+#               hybrid kernels do at run time; closest to the .tflite model
+QUANTIZE_MODES = (None, 'weights', 'dynamic')
+
+
+class NumpyMLP(object):
+    # A Keras Sequential of Dense layers run as NumPy matmuls, the keypoint
+    # classifier's model (86 -> 90 -> 120 -> 50 -> 71) without an
+    # interpreter. Weights are held as contiguous float32 arrays; for a
+    # batch each layer is one matmul into a reused buffer, with the bias and
+    # activation applied in place, and only the output is a new array.
+    def __init__(self, kernels, biases, activations, quantize='weights'):
+        if quantize not in QUANTIZE_MODES:
+            raise ValueError('quantize must be one of {}'.format(QUANTIZE_MODES))
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError('unsupported activation: {}'.format(activation))
+
+        if quantize is not None:
+            kernels = [_quantize_kernel(kernel) for kernel in kernels]
+        self.kernels = [np.ascontiguousarray(kernel, dtype=np.float32) for kernel in kernels]
+        self.biases = [np.ascontiguousarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = list(activations)
+        self.quantize = quantize
+
+        # Hidden layer outputs, for the batch size they were last used with
+        self._buffers = []
+
+    @property
+    def input_size(self):
+        return self.kernels[0].shape[0]
+
+    @property
+    def output_size(self):
+        return self.kernels[-1].shape[1]
+
+    def __call__(self, features):
+        # features: (B, input_size) -> (B, output_size), or one row
+        # (input_size,) -> (output_size,)
+        x = np.asarray(features, dtype=np.float32)
+        if x.ndim == 1:
+            return self._forward_row(x)
+
+        if not self._buffers or self._buffers[0].shape[0] != len(x):
+            self._buffers = [np.empty((len(x), kernel.shape[1]), dtype=np.float32)
+                             for kernel in self.kernels[:-1]]
+
+        last = len(self.kernels) - 1
+        for index, (kernel, bias, activation) in enumerate(zip(self.kernels, self.biases, self.activations)):
+            if self.quantize == 'dynamic':
+                x = _quantize_rows(x)
+            if index == last:
+                out = np.empty((len(x), kernel.shape[1]), dtype=np.float32)
+            else:
+                out = self._buffers[index]
+            np.matmul(x, kernel, out=out)
+            out += bias
+            _activate(out, activation)
+            x = out
+        return x
+
+    def _forward_row(self, x):
+        # A single row is all call overhead: vector products into fresh
+        # (small) arrays take fewer NumPy calls than filling buffers
+        for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+            if self.quantize == 'dynamic':
+                x = _quantize_rows(x[None])[0]
+            x = np.dot(x, kernel)
+            x += bias
+            _activate(x, activation)
+        return x
+
+
+def _activate(x, activation):
+    # In place, over the last axis
+    if activation == 'relu':
+        np.maximum(x, 0, out=x)
+    elif activation == 'softmax':
+        x -= x.max(axis=-1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=-1, keepdims=True)
+
+
+def _quantize_kernel(kernel):
+    # Symmetric int8, one scale for the whole kernel, back to float
+    scale = np.abs(kernel).max() / 127
+    if scale == 0:
+        return kernel
+    return np.round(kernel / scale) * scale
+
+
+def _quantize_rows(x):
+    # Asymmetric int8 per row over a range that includes 0, back to float
+    low = np.minimum(x.min(axis=1, keepdims=True), 0)
+    high = np.maximum(x.max(axis=1, keepdims=True), 0)
+    scale = (high - low) / 255
+    scale[scale == 0] = 1
+    zero_point = np.round(-128 - low / scale)
+    return (np.clip(np.round(x / scale) + zero_point, -128, 127) - zero_point) * scale
+
+
+def read_keras_mlp(path):
+    # (kernels, biases, activations) of a model saved by Keras 2 as .hdf5
+    # (model.save / ModelCheckpoint). Dropout is a no-op at inference;
+    # any other layer but Dense is refused.
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        if 'model_config' not in f.attrs:
+            raise ValueError('{} holds weights only, not the model'.format(path))
+        config = json.loads(f.attrs['model_config'])
+        weights = f['model_weights']
+
+        kernels, biases, activations = [], [], []
+        for layer in config['config']['layers']:
+            kind = layer['class_name']
+            if kind in ('InputLayer', 'Dropout'):
+                continue
+            if kind != 'Dense':
+                raise ValueError('unsupported layer: {}'.format(kind))
+            name = layer['config']['name']
+            group = weights[name]
+            names = [n.decode() if isinstance(n, bytes) else n for n in group.attrs['weight_names']]
+            values = {n.rsplit('/', 1)[-1].split(':')[0]: group[n][()] for n in names}
+            kernel = values['kernel']
+            kernels.append(kernel)
+            biases.append(values.get('bias', np.zeros(kernel.shape[1], dtype=np.float32)))
+            activations.append(layer['config']['activation'])
+    return kernels, biases, activations
+
+
+def mlp_key(path):
+    # Content hash of the weights file
+    digest = hashlib.sha1(str(MLP_CACHE_VERSION).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def save_mlp(kernels, biases, activations, path, key=''):
+    # Written to a temporary file first, so a reader never sees half of it
+    arrays = {'key': np.array(key), 'activations': np.array(activations, dtype=str)}
+    for index, (kernel, bias) in enumerate(zip(kernels, biases)):
+        arrays['kernel_{}'.format(index)] = kernel
+        arrays['bias_{}'.format(index)] = bias
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_saved_mlp(path, key=None):
+    # (kernels, biases, activations) save_mlp() wrote, or None if missing,
+    # unreadable or saved under another key
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if key is not None and str(data['key']) != key:
+                return None
+            activations = data['activations'].tolist()
+            kernels = [data['kernel_{}'.format(i)] for i in range(len(activations))]
+            biases = [data['bias_{}'.format(i)] for i in range(len(activations))]
+            return kernels, biases, activations
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_mlp(path, quantize='weights', cache=True):
+    # The NumpyMLP of a Keras .hdf5 model. With cache, the weights are kept
+    # in <path>.cache.npz, so later loads skip h5py (whose import alone
+    # takes far longer than the load), and reread when the file changes.
+    cache_path = path + '.cache.npz'
+    key = mlp_key(path)
+    layers = load_saved_mlp(cache_path, key) if cache else None
+    if layers is None:
+        layers = read_keras_mlp(path)
+        if cache:
+            try:
+                save_mlp(*layers, cache_path, key)
+            except OSError as e:
+                warnings.warn('could not cache the model weights: {}'.format(e))
+    return NumpyMLP(*layers, quantize=quantize)
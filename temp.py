@@ -1,14 +1,16 @@
 import csv
-import copy
-import itertools
 import cv2 as cv
 import numpy as np
-# import mediapipe as mp
 from model import KeyPointClassifier
+from utils import pre_process_landmark
+from utils import calc_frame_landmarks, FRAME_POINTS, FACE_SLICE
+from utils import Pipeline, Command, run_window, FramePreprocessor
+from utils import load_parallel, load_hands, load_face
 import argparse
 import ctypes
+from concurrent.futures import ThreadPoolExecutor
 from insight import get_insight
-import dill
+from dataset import open_dataset_writer
 
 
 def get_args():
@@ -21,20 +23,25 @@ def get_args():
     parser.add_argument('--use_static_image_mode', action='store_true')
     parser.add_argument("--min_detection_confidence", help='min_detection_confidence', type=float, default=0.7)
     parser.add_argument("--min_tracking_confidence", help='min_tracking_confidence', type=int, default=0.5)
+    parser.add_argument("--dataset", help='dataset file to log to, .csv or .bin', default='model/keypoint_classifier/keypoint.csv')
     args = parser.parse_args()
     return args
 
 
 def main():
     print('started')
-    user32 = ctypes.windll.user32
-    width = int(user32.GetSystemMetrics(0) / 2)
-    height = int(user32.GetSystemMetrics(1) / 2)
-
     # --------------------- Argument parsing --------------------- #
     args = get_args()
     cap_device = args.device
 
+    if hasattr(ctypes, 'windll'):
+        user32 = ctypes.windll.user32
+        width = int(user32.GetSystemMetrics(0) / 2)
+        height = int(user32.GetSystemMetrics(1) / 2)
+    else:
+        # No screen metrics outside Windows, use the requested capture size
+        width, height = args.width, args.height
+
     use_static_image_mode = args.use_static_image_mode
     min_detection_confidence = args.min_detection_confidence
     min_tracking_confidence = args.min_tracking_confidence
@@ -52,38 +59,18 @@ def main():
     cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
     cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
 
-    # --------------------- Load MediaPipe Model --------------------- #
-    # mp_hands = mp.solutions.hands
-    with open("hands.pkl", "rb") as file:
-        mp_hands = dill.load(file)
-    hands = mp_hands.Hands(
-        static_image_mode=use_static_image_mode,
-        max_num_hands=2,
-        min_detection_confidence=min_detection_confidence,
-        min_tracking_confidence=min_tracking_confidence,
-    )
-    # with open("hands.pkl", "wb") as file:
-    #     dill.dump(mp_hands, file)
-    #     print('saved')
-
-    # mp_face = mp.solutions.face_detection
-    with open("face.pkl", "rb") as file:
-        mp_face = dill.load(file)
-    face = mp_face.FaceDetection(
-        # static_image_mode=use_static_image_mode,
-        # max_num_hands=2,
-        # min_detection_confidence=min_detection_confidence,
-        # min_tracking_confidence=min_tracking_confidence,
-        model_selection=1, min_detection_confidence=0.5
-    )
-    
-
-    # with open("face.pkl", "wb") as file:
-    #     dill.dump(mp_face, file)
-    #     print('saved')
-
-    # --------------------- Load NN Classifier Model --------------------- #
-    keypoint_classifier = KeyPointClassifier()
+    # --------------------- Models and Graphs --------------------- #
+    # Loaded side by side and warmed up, instead of unpickling the
+    # MediaPipe solution modules from hands.pkl / face.pkl
+    loaded = load_parallel({
+        'hands': lambda: load_hands(use_static_image_mode, min_detection_confidence, min_tracking_confidence,
+                                    warm_up_size=(width, height)),
+        'face': lambda: load_face(warm_up_size=(width, height)),
+        'classifier': lambda: KeyPointClassifier().warm_up(),
+    })
+    hands = loaded['hands']
+    face = loaded['face']
+    keypoint_classifier = loaded['classifier']
 
     # --------------------- Read Labels --------------------- #
     with open('model/keypoint_classifier/keypoint_classifier_label.csv',
@@ -93,47 +80,20 @@ def main():
             row[0] for row in keypoint_classifier_labels
         ]
 
+    # --------------------- Dataset Writer --------------------- #
+    dataset_writer = open_dataset_writer(args.dataset)
+
     # --------------------- Initial Setup --------------------- #
+    preprocessor = FramePreprocessor()
+    frame_points = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
     mode = 1
     t = 0
 
-    while True:
-        key = cv.waitKey(10)
-        # if key != -1:
-        #     print(key)
-
-        if key == 27:  # ESC
-            print('Exited the Program!')
-            break
-        elif key == 115 and not STARTED:    # s -> Save to the csv
-            if mode == 1: LOGGING_BOOL = True
-        elif key == 120 and not STARTED:    # x -> Reset the number
-            NUMBER = 0
-            print('Number: ' + str(NUMBER))
-        elif key == 107 and not STARTED:    # k
-            if mode == 1:
-                mode = 0
-                print('Mode: Detecting!')
-            else:
-                mode = 1
-                t = 0
-                print('Mode: Logging Data!')
-        elif 0 <= (key - 48) <= 9 and not STARTED:
-            if mode == 1: NUMBER = NUMBER*10 + (key - 48)
-            print(NUMBER)
-        elif key == 8 and not STARTED:  # backspace -> Delete the last number
-            if mode == 1: NUMBER = int(NUMBER/10)
-            print(NUMBER)
-        elif key == 13 and mode == 1:   # enter -> start/stop the snap shooting
-            STARTED = not STARTED
-            t = 0
-            COUNTER = 0
-            if STARTED: print('Started Logging!')
-            else: print('Stopped Logging!')
-        elif key == 103:    # g -> get insight
-            get_insight()
-        elif key == 104:    # h -> help
-            show_help()
+    # --------------------- Frame Processing --------------------- #
+    # Runs on the pipeline's processing thread, as does handle() below for
+    # the keys
+    def process(image):
+        nonlocal frame_points, t, LOGGING_BOOL, COUNTER
 
         number = NUMBER
         
@@ -145,73 +105,44 @@ def main():
                 COUNTER = COUNTER + 1
 
 
-        # --------------------- Capture Camera --------------------- #
-        ret, image = cap.read()
-        if not ret:
-            break
-        image = cv.flip(image, 1)  # Mirror display
-        debug_image = copy.deepcopy(image)
-
         # --------------------- Image Pre-Processing --------------------- #
-        image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+        # Mirrored in place for display, RGB into a reused buffer
+        debug_image, image = preprocessor.process(image)
 
-        image.flags.writeable = False
         results = hands.process(image)
         result2 = face.process(image)
-        image.flags.writeable = True
 
-        data_points = {
-            'Face': [[0, 0]]*1,
-            'Left': [[0, 0]]*21,
-            'Right': [[0, 0]]*21,
-            'detected': False
-        }
+        frame_points, face_bounding_rect, detected_hands = calc_frame_landmarks(
+            debug_image, results, result2, out=frame_points)
 
         # if face is detected
-        if result2.detections is not None:
-            face_landmarks = result2.detections[0].location_data
-            face_bounding_rect = calc_bounding_rect_face(debug_image, [face_landmarks.relative_bounding_box])
-            face_landmarks_list = calc_landmark_list_face(debug_image, face_landmarks.relative_keypoints)[2: 3]
-            data_points['Face'] = face_landmarks_list
-
+        if face_bounding_rect is not None:
             debug_image = draw_bounding_rect(use_brect, debug_image, face_bounding_rect)
-            debug_image = draw_face_landmarks(debug_image, face_landmarks_list)
-            
+            debug_image = draw_face_landmarks(debug_image, frame_points[FACE_SLICE])
 
         # If hands are detected
-        if results.multi_hand_landmarks is not None:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
-                data_points[handedness.classification[0].label[0:]] = landmark_list
-                # pre_processed_landmark_list = pre_process_landmark(landmark_list)
-                # data_points[handedness.classification[0].label[0:]] = pre_processed_landmark_list
-                data_points['detected'] = True
-
-                # Drawing part
-                debug_image = draw_bounding_rect(use_brect, debug_image, brect)
-                debug_image = draw_landmarks(debug_image, landmark_list)
-                debug_image = draw_info_text(
-                    debug_image,
-                    brect,
-                    handedness,
-                    # keypoint_classifier_labels[hand_sign_id]
-                    ''
-                )
+        for handedness, landmark_list, brect in detected_hands:
+            # Drawing part
+            debug_image = draw_bounding_rect(use_brect, debug_image, brect)
+            debug_image = draw_landmarks(debug_image, landmark_list)
+            debug_image = draw_info_text(
+                debug_image,
+                brect,
+                handedness,
+                # keypoint_classifier_labels[hand_sign_id]
+                ''
+            )
 
         # Drawing While Rectangle
         cv.rectangle(debug_image, (0, 0), (150, 60), (255, 255, 255), -1)
 
-        if data_points['detected'] == True:
-            # merge the landmarks of two hands
-            merged_landmark_list = np.concatenate((data_points['Face'], data_points['Left'], data_points['Right']), axis=0)
+        if len(detected_hands) > 0:
             # convert the points relatively to 1st point
-            pre_process_merged_list = pre_process_landmark(merged_landmark_list)
+            pre_process_merged_list = pre_process_landmark(frame_points)
 
             # --------------------- Write to the dataset file --------------------- #
             if LOGGING_BOOL:
-                logging_csv(number, pre_process_merged_list)
+                dataset_writer.write(number, pre_process_merged_list)
                 print('Data Collected: ' + str(number))
                 LOGGING_BOOL = False
 
@@ -234,116 +165,97 @@ def main():
 
         mode_info(mode, debug_image, COUNTER)
 
-        # --------------------- Display Screen --------------------- #
-        cv.imshow('Hand Gesture Recognition', debug_image)
-
-    cap.release()
-    cv.destroyAllWindows()
-
-def show_help():
-    print('k \t=>\t change the mode i.e logging/detecting')
-    print('0 - 9 \t=>\t input the label number')
-    print('backspace \t=>\t remove the last digit of the number')
-    print('x \t=>\t reset the number back to 0')
-    print('s \t=>\t add a single data when on logging data mode')
-    print('s \t=>\t add a single data when on logging data mode')
-    print('g \t=>\t get insight on the collected data')
-    print('esc \t=>\t close the application')
-
-def calc_bounding_rect(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-    landmark_array = np.empty((0, 2), int)
-
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-
-        landmark_point = [np.array((landmark_x, landmark_y))]
-
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
-
-    x, y, w, h = cv.boundingRect(landmark_array)
-
-    return [x, y, x + w, y + h]
+        return debug_image
 
-def calc_bounding_rect_face(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-    landmark_array = []
+    # --------------------- Key Commands --------------------- #
+    # Sent by the window loop, applied on the processing thread between
+    # frames; reading the dataset for g runs on a thread of its own
+    insight_tasks = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Insight')
 
-    for _, landmark in enumerate(landmarks):
-        landmark_x = min(int(landmark.xmin * image_width), image_width - 1)
-        landmark_y = min(int(landmark.ymin * image_height), image_height - 1)
-        landmark_width = min(int(landmark.width * image_width), image_width - 1)
-        landmark_height = min(int(landmark.height * image_height), image_height - 1)
+    def show_insight():
+        try:
+            dataset_writer.flush()
+            get_insight(args.dataset)
+        except Exception as error:
+            print('Insight failed: ' + str(error))
 
-        landmark_array = [landmark_x, landmark_y, landmark_x + landmark_width,  landmark_y + landmark_height]
-    return landmark_array
+    def handle(command):
+        nonlocal STARTED, LOGGING_BOOL, NUMBER, COUNTER, mode, t
 
+        name = command.name
+        if name == 'save' and not STARTED:
+            if mode == 1: LOGGING_BOOL = True
+        elif name == 'reset_number' and not STARTED:
+            NUMBER = 0
+            print('Number: ' + str(NUMBER))
+        elif name == 'mode' and not STARTED:
+            if mode == 1:
+                mode = 0
+                print('Mode: Detecting!')
+            else:
+                mode = 1
+                t = 0
+                print('Mode: Logging Data!')
+        elif name == 'digit' and not STARTED:
+            if mode == 1: NUMBER = NUMBER*10 + command.value
+            print(NUMBER)
+        elif name == 'backspace' and not STARTED:
+            if mode == 1: NUMBER = int(NUMBER/10)
+            print(NUMBER)
+        elif name == 'logging' and mode == 1:
+            STARTED = not STARTED
+            t = 0
+            COUNTER = 0
+            if STARTED: print('Started Logging!')
+            else: print('Stopped Logging!')
+        elif name == 'insight':
+            insight_tasks.submit(show_insight)
 
-def calc_landmark_list(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
-
-    return landmark_point
-
-def calc_landmark_list_face(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
-
-    return landmark_point
-
-
-def pre_process_landmark(landmark_list):
-    temp_landmark_list = copy.deepcopy(landmark_list)
-
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, landmark_point in enumerate(temp_landmark_list):
-        if index == 0:
-            base_x, base_y = landmark_point[0], landmark_point[1]
-
-        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
-        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
+    # --------------------- Capture / Inference Pipeline --------------------- #
+    pipeline = Pipeline(cap, process, handle=handle)
+    pipeline.start()
 
-    # Convert to a one-dimensional list
-    temp_landmark_list = list(
-        itertools.chain.from_iterable(temp_landmark_list))
+    # --------------------- Display Screen --------------------- #
+    run_window(pipeline, 'Hand Gesture Recognition', key_command)
+    print('Exited the Program!')
 
-    # Normalization
-    max_value = max(list(map(abs, temp_landmark_list)))
+    pipeline.stop()
+    insight_tasks.shutdown()
 
-    def normalize_(n):
-        return n / max_value
+    dataset_writer.close()
+    cap.release()
+    cv.destroyAllWindows()
 
-    temp_landmark_list = list(map(normalize_, temp_landmark_list))
+# Keys of the window and the commands they send; h is answered right away
+KEY_COMMANDS = {
+    115: 'save',            # s -> save a row to the dataset
+    120: 'reset_number',    # x -> reset the number
+    107: 'mode',            # k -> logging / detecting
+    8: 'backspace',         # backspace -> delete the last digit
+    13: 'logging',          # enter -> start/stop the snap shooting
+    103: 'insight',         # g -> get insight
+}
 
-    return temp_landmark_list
 
+def key_command(key):
+    if 48 <= key <= 57:
+        return Command('digit', key - 48)
+    if key == 104:  # h -> help
+        show_help()
+        return None
+    name = KEY_COMMANDS.get(key)
+    return Command(name) if name is not None else None
 
-def logging_csv(number, landmark_list):
-    csv_path = 'model/keypoint_classifier/keypoint.csv'
-    with open(csv_path, 'a', newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([number, *landmark_list])
 
+def show_help():
+    print('k \t=>\t change the mode i.e logging/detecting')
+    print('0 - 9 \t=>\t input the label number')
+    print('backspace \t=>\t remove the last digit of the number')
+    print('x \t=>\t reset the number back to 0')
+    print('s \t=>\t add a single data when on logging data mode')
+    print('s \t=>\t add a single data when on logging data mode')
+    print('g \t=>\t get insight on the collected data')
+    print('esc \t=>\t close the application')
 
 def draw_landmarks(image, landmark_point):
     if len(landmark_point) > 0:
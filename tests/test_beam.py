@@ -0,0 +1,63 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from decoder import BeamDecoder, CountVoter, SignDecoder, WORD, load_automaton
+
+
+@pytest.fixture(scope='module')
+def automaton():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return load_automaton()
+
+
+def distribution(num_labels, probabilities):
+    # probabilities: {label id: p}, the rest shared evenly
+    frame = np.full(num_labels, (1.0 - sum(probabilities.values())) / (num_labels - len(probabilities)))
+    for label_id, p in probabilities.items():
+        frame[label_id] = p
+    return frame
+
+
+def decode(decoder, frames, score_th=0.9):
+    # Frames as data_collector feeds them: None without a hand, the label
+    # only above the threshold
+    words = []
+    for frame in frames:
+        if frame is None:
+            events = decoder.idle()
+        else:
+            label_id = int(np.argmax(frame))
+            confidence = float(frame[label_id])
+            if confidence <= score_th:
+                label_id = None
+            events = decoder.update(label_id, confidence, probabilities=frame)
+        words.extend(event.text for event in events if event.kind == WORD)
+    return words
+
+
+def test_beam_recovers_word_greedy_drops(automaton):
+    # hello_1 is clear; hello_2 is read right but never above the
+    # threshold, so the greedy decoder never commits it
+    labels = automaton.labels
+    num_labels = len(labels)
+    hello_1, hello_2 = labels.index('hello_1'), labels.index('hello_2')
+    frames = ([distribution(num_labels, {hello_1: 0.99})] * 20
+              + [distribution(num_labels, {hello_2: 0.7, hello_1: 0.25})] * 20
+              + [None] * 20)
+
+    assert decode(SignDecoder(automaton, voter=CountVoter(num_labels)), frames) == []
+    assert decode(BeamDecoder(automaton), frames) == ['hello']
+
+
+def test_top_labels_clamped_to_labels(automaton):
+    num_labels = len(automaton.labels)
+    decoder = BeamDecoder(automaton, top_labels=num_labels + 10)
+    assert decoder.top_labels == num_labels
+    assert BeamDecoder(automaton, top_labels=0).top_labels == 1
+
+    namaste = automaton.labels.index('namaste')
+    frames = [distribution(num_labels, {namaste: 0.99})] * 20 + [None] * 20
+    assert decode(decoder, frames) == ['namaste']
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+from dataset import BinaryDatasetWriter, convert_csv, load_binary_dataset
+from dataset.binary import HEADER_SIZE, count_rows, read_header, record_dtype
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(ROOT, 't.txt')
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'float16'])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_convert_round_trip(tmp_path, dtype, mmap):
+    path = str(tmp_path / 'keypoint.bin')
+    expected = np.loadtxt(SAMPLE, delimiter=',', dtype='float64', ndmin=2)
+    assert convert_csv(SAMPLE, path, dtype) == len(expected)
+
+    features, labels, header = load_binary_dataset(path, mmap=mmap)
+    assert header['dtype'] == dtype
+    assert header['num_features'] == expected.shape[1] - 1
+    assert features.dtype == np.dtype(dtype)
+    assert labels.tolist() == expected[:, 0].astype(int).tolist()
+    # Each feature is the nearest value of the dtype
+    assert np.array_equal(features, expected[:, 1:].astype(dtype))
+
+
+def test_partial_record_is_truncated(tmp_path):
+    path = str(tmp_path / 'keypoint.bin')
+    with BinaryDatasetWriter(path, manifest=False) as writer:
+        for label in range(3):
+            writer.write(label, np.full(86, label, dtype=np.float32))
+
+    # A crash in the middle of a record
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * 10)
+    assert count_rows(path) == 3
+
+    with BinaryDatasetWriter(path, manifest=False) as writer:
+        writer.write(7, np.full(86, 7, dtype=np.float32))
+
+    itemsize = record_dtype().itemsize
+    assert os.path.getsize(path) == HEADER_SIZE + 4 * itemsize
+    features, labels, _ = load_binary_dataset(path)
+    assert labels.tolist() == [0, 1, 2, 7]
+    assert features[:, 0].tolist() == [0, 1, 2, 7]
+
+
+def test_schema_mismatch_is_refused(tmp_path):
+    path = str(tmp_path / 'keypoint.bin')
+    with BinaryDatasetWriter(path, manifest=False) as writer:
+        writer.write(1, np.zeros(86))
+    size = os.path.getsize(path)
+
+    for kwargs in ({'dtype': 'float16'}, {'num_features': 42}):
+        writer = BinaryDatasetWriter(path, manifest=False, **kwargs)
+        writer.write(1, np.zeros(kwargs.get('num_features', 86)))
+        with pytest.raises(RuntimeError) as error:
+            writer.close()
+        assert isinstance(error.value.__cause__, ValueError)
+
+    assert os.path.getsize(path) == size
+    assert read_header(path)['dtype'] == 'float32'
@@ -0,0 +1,93 @@
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmark.synthetic import make_face_results, make_hand_results, make_image
+from dataset.cache import TEMP_AGE, LandmarkCache
+from utils.landmark import calc_frame_landmarks, calc_frame_points, calc_raw_landmarks
+
+
+def synthetic_results(rng, count):
+    # (image, hand results, face results) covering no hands, one or two
+    # hands, two hands with the same label, no face, and points past the
+    # edges of the image
+    image = make_image()
+    results = []
+    for index in range(count):
+        hand_results = make_hand_results(rng, index % 3)
+        if index % 5 == 4 and hand_results.multi_handedness:
+            for handedness in hand_results.multi_handedness:
+                handedness.classification[0].label = 'Left'
+        if index % 7 == 6 and hand_results.multi_hand_landmarks:
+            hand_results.multi_hand_landmarks[0].landmark[0].x = -0.2
+            hand_results.multi_hand_landmarks[0].landmark[1].y = 1.3
+        if index % 4 == 3:
+            face_results = SimpleNamespace(detections=None)
+        else:
+            face_results = make_face_results(rng)
+        results.append((image, hand_results, face_results))
+    return results
+
+
+def stack(frames):
+    return {name: np.stack([frame[name] for frame in frames]) for name in frames[0]}
+
+
+def test_frame_points_match_frame_landmarks():
+    rng = np.random.default_rng(0)
+    results = synthetic_results(rng, 200)
+    expected = np.stack([calc_frame_landmarks(*result)[0] for result in results])
+    raw = stack([calc_raw_landmarks(*result) for result in results])
+    np.testing.assert_array_equal(calc_frame_points(raw), expected)
+
+
+def test_put_get_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    raw = stack([calc_raw_landmarks(*result) for result in synthetic_results(rng, 20)])
+    cache = LandmarkCache(str(tmp_path))
+    cache.put('key', 'video.mp4', {'interval': 1}, raw)
+
+    entry = cache.get('key')
+    assert sorted(entry) == sorted(raw)
+    for name in raw:
+        np.testing.assert_array_equal(entry[name], raw[name])
+    assert cache.get('missing') is None
+    assert not list(tmp_path.glob('*.tmp.npz'))
+
+
+def test_get_refuses_pickled_arrays(tmp_path):
+    cache = LandmarkCache(str(tmp_path))
+    np.savez(str(tmp_path / 'key.npz'), hand_landmarks=np.array([{'x': 1}], dtype=object))
+    assert cache.get('key') is None
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = LandmarkCache(str(tmp_path), max_bytes=1024 ** 3)
+    landmarks = {'frame_size': np.zeros((1000, 2), dtype=np.int32)}
+    for index, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, key, {}, landmarks)
+        os.utime(str(tmp_path / (key + '.npz')), (1000 + index, 1000 + index))
+    # Using an entry makes it the most recent
+    assert cache.get('a') is not None
+
+    size = cache.size()
+    assert cache.evict(size * 2 // 3) == 1
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+
+def test_evict_removes_stale_temporary_files(tmp_path):
+    cache = LandmarkCache(str(tmp_path))
+    stale = tmp_path / 'key.npz.1.2.tmp.npz'
+    fresh = tmp_path / 'key.npz.3.4.tmp.npz'
+    stale.write_bytes(b'partial')
+    fresh.write_bytes(b'partial')
+    old = time.time() - TEMP_AGE - 10
+    os.utime(str(stale), (old, old))
+
+    cache.evict()
+    assert not stale.exists()
+    # Possibly still being written by another worker
+    assert fresh.exists()
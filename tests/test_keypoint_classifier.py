@@ -0,0 +1,54 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from model.keypoint_classifier.keypoint_classifier import MODEL_PATH, WEIGHTS_PATH, KeyPointClassifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tflite_classifier():
+    if importlib.util.find_spec('tflite_runtime') is None:
+        pytest.importorskip('tensorflow')
+    return KeyPointClassifier(os.path.join(ROOT, MODEL_PATH))
+
+
+@pytest.fixture(scope='module')
+def features():
+    data = np.loadtxt(os.path.join(ROOT, 't.txt'), delimiter=',', dtype='float32', ndmin=2)
+    return data[:, 1:]
+
+
+# Largest probability difference from the .tflite model on t.txt, and the
+# share of rows whose top label it must agree on. Unrounded weights differ
+# by up to 0.185 and flip 8 of 367 near ties; rounded like the conversion,
+# 0.067 ('weights') and 0.031 ('dynamic') and no flips.
+@pytest.mark.parametrize('quantize, tolerance, agreement', [
+    (None, 0.2, 0.97),
+    ('weights', 0.08, 1.0),
+    ('dynamic', 0.04, 1.0),
+])
+def test_numpy_backend_matches_tflite(features, quantize, tolerance, agreement):
+    pytest.importorskip('h5py')
+    from model.keypoint_classifier.numpy_mlp import load_mlp
+
+    expected = tflite_classifier().predict_batch(features)
+    # Not cached next to the model
+    probabilities = load_mlp(os.path.join(ROOT, WEIGHTS_PATH), quantize, cache=False)(features)
+    assert np.abs(probabilities - expected).max() < tolerance
+    assert np.mean(np.argmax(probabilities, axis=1) == np.argmax(expected, axis=1)) >= agreement
+
+
+def test_predict_top_k_bounds(features):
+    classifier = tflite_classifier()
+    num_classes = classifier.predict_batch(features[:1]).shape[1]
+
+    result = classifier.predict(features[0], top_k=num_classes + 5)
+    assert sorted(result.label_ids.tolist()) == list(range(num_classes))
+    assert np.all(np.diff(result.probabilities) <= 0)
+    assert classifier.predict(features[0], top_k=1).label_ids.tolist() == [int(np.argmax(result.distribution))]
+    for top_k in [0, -1]:
+        with pytest.raises(ValueError):
+            classifier.predict(features[0], top_k=top_k)
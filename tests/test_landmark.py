@@ -0,0 +1,77 @@
+import copy
+import itertools
+
+import numpy as np
+
+from benchmark.synthetic import make_face_results, make_hand_results, make_image
+from utils.landmark import FACE_SLICE, FRAME_POINTS, HAND_SLICES
+from utils.landmark import calc_frame_landmarks, pre_process_landmark
+
+
+def legacy_pre_process_landmark(landmark_list):
+    # The list-based function the entry points used before
+    temp_landmark_list = copy.deepcopy(landmark_list)
+
+    base_x, base_y = 0, 0
+    for index, landmark_point in enumerate(temp_landmark_list):
+        if index == 0:
+            base_x, base_y = landmark_point[0], landmark_point[1]
+
+        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
+        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
+
+    temp_landmark_list = list(itertools.chain.from_iterable(temp_landmark_list))
+
+    max_value = max(list(map(abs, temp_landmark_list)))
+
+    def normalize_(n):
+        return n / max_value
+
+    return list(map(normalize_, temp_landmark_list))
+
+
+def random_frames(rng, count):
+    # Pixel frames as the collectors log them: the nose and both hands, with
+    # a missing face or hand left at (0, 0), though never all three
+    frames = rng.integers(0, 960, size=(count, FRAME_POINTS, 2)).astype(np.int32)
+    parts = [FACE_SLICE, HAND_SLICES['Left'], HAND_SLICES['Right']]
+    for frame in frames:
+        for index in rng.permutation(len(parts))[:2]:
+            if rng.random() < 0.3:
+                frame[parts[index]] = 0
+    return frames
+
+
+def synthetic_frames(rng, count):
+    image = make_image()
+    return np.stack([
+        calc_frame_landmarks(image, make_hand_results(rng, int(rng.integers(1, 3))), make_face_results(rng))[0]
+        for _ in range(count)])
+
+
+def test_matches_legacy_bit_for_bit():
+    rng = np.random.default_rng(0)
+    frames = np.concatenate([random_frames(rng, 300), synthetic_frames(rng, 100)])
+    for frame in frames:
+        expected = legacy_pre_process_landmark(frame.tolist())
+        features = pre_process_landmark(frame)
+        assert isinstance(features, np.ndarray)
+        assert features.tolist() == expected
+        # float32 holds pixel coordinates exactly
+        assert pre_process_landmark(frame.astype(np.float32)).tolist() == expected
+
+
+def test_batch_matches_single_frames():
+    rng = np.random.default_rng(1)
+    frames = np.concatenate([random_frames(rng, 200), synthetic_frames(rng, 50)])
+    batch = pre_process_landmark(frames)
+    assert batch.shape == (len(frames), 2 * FRAME_POINTS)
+    for frame, features in zip(frames, batch):
+        assert features.tolist() == legacy_pre_process_landmark(frame.tolist())
+
+
+def test_coinciding_points_give_zeros():
+    features = pre_process_landmark(np.zeros((FRAME_POINTS, 2), dtype=np.int32))
+    assert features.tolist() == [0.0] * (2 * FRAME_POINTS)
+    batch = pre_process_landmark(np.full((3, FRAME_POINTS, 2), 7, dtype=np.int32))
+    assert not batch.any()
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+from dataset import BinaryDatasetWriter, DatasetManifest
+from insight import get_insight
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def append_csv(path, labels):
+    with open(path, 'a') as f:
+        for label in labels:
+            f.write('{},{}\n'.format(label, ','.join(['0.5'] * 86)))
+
+
+def test_refresh_counts_only_the_new_rows(tmp_path):
+    path = str(tmp_path / 'keypoint.csv')
+    append_csv(path, [1, 1, 2])
+    manifest = DatasetManifest.load(path)
+    assert manifest.refresh() == 3
+    manifest.save()
+
+    append_csv(path, [2, 5])
+    manifest = DatasetManifest.load(path)
+    assert not manifest.is_current()
+    size = manifest.size
+    assert manifest.refresh() == 2
+    assert manifest.size == os.path.getsize(path) > size
+    assert manifest.is_current()
+    assert manifest.counts() == {'1': 2, '2': 2, '5': 1}
+    assert manifest.labels['2'] == {'count': 2, 'first_row': 2, 'last_row': 3}
+
+
+def test_refresh_leaves_a_half_written_line(tmp_path):
+    path = str(tmp_path / 'keypoint.csv')
+    append_csv(path, [1, 2])
+    with open(path, 'a') as f:
+        f.write('3,0.5,0.5')
+
+    manifest = DatasetManifest.load(path)
+    assert manifest.refresh() == 2
+    assert manifest.counts() == {'1': 1, '2': 1}
+    assert not manifest.is_current()
+
+    # Once the line is complete it is counted, and only it
+    with open(path, 'a') as f:
+        f.write(',' + ','.join(['0.5'] * 84) + '\n')
+    assert manifest.refresh() == 1
+    assert manifest.counts() == {'1': 1, '2': 1, '3': 1}
+    assert manifest.is_current()
+
+
+def test_rebuild_and_shrunk_file(tmp_path):
+    path = str(tmp_path / 'keypoint.csv')
+    append_csv(path, [1, 2, 3])
+    manifest = DatasetManifest.load(path)
+    manifest.refresh()
+    manifest.save()
+
+    # Rewritten behind the manifest's back with fewer rows
+    os.remove(path)
+    append_csv(path, [4])
+    manifest = DatasetManifest.load(path)
+    assert manifest.refresh() == 1
+    assert manifest.counts() == {'4': 1}
+
+    # A stale manifest of the same size is only fixed by rebuild()
+    manifest.labels = {'9': {'count': 1, 'first_row': 0, 'last_row': 0}}
+    manifest.save()
+    DatasetManifest(path).rebuild()
+    assert DatasetManifest.load(path).counts() == {'4': 1}
+
+
+def test_binary_dataset(tmp_path):
+    path = str(tmp_path / 'keypoint.bin')
+    with BinaryDatasetWriter(path, manifest=False) as writer:
+        for label in [3, 3, 4]:
+            writer.write(label, np.zeros(86))
+    manifest = DatasetManifest.load(path)
+    assert manifest.refresh() == 3
+    assert manifest.counts() == {'3': 2, '4': 1}
+
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 5)
+    assert manifest.refresh() == 0
+
+
+def test_insight(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(ROOT)
+    path = str(tmp_path / 'keypoint.csv')
+    append_csv(path, [0, 0, 1])
+    get_insight(path)
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == 2
+    assert output[0].endswith(': 2 occurrences')
+    assert os.path.exists(path + '.manifest.json')
+
+    with pytest.raises(FileNotFoundError):
+        get_insight(str(tmp_path / 'missing.csv'))
@@ -0,0 +1,104 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from decoder import RESET, SignDecoder, WORD, load_automaton
+from transition import dependent, finalState, startState, transition
+
+
+@pytest.fixture(scope='module')
+def automaton():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return load_automaton()
+
+
+def legacy_words(labels, stream):
+    # The inline loop data_collector.py ran before SignDecoder, on the
+    # frames with a hand: label ids, None below the classifier's threshold.
+    # Returns what it printed as words.
+    buffer = ['_']
+    result_dict = {}
+    words = []
+    for hand_sign_id in stream:
+        if hand_sign_id is None:
+            continue
+        sign = labels[hand_sign_id]
+        try:
+            result_dict[sign] = result_dict[sign] + 1
+            prominent_sign = max(result_dict, key=result_dict.get)
+            if result_dict[prominent_sign] > 16:
+                buffer.append(prominent_sign)
+                if prominent_sign not in dependent:
+                    words.append(prominent_sign)
+                    buffer = ['_']
+                try:
+                    index = len(buffer) - 1
+                    state = startState
+                    output = ''
+                    while index > 0 and state not in finalState:
+                        fin = transition[state][buffer[index]]
+                        state = fin['state']
+                        output = fin['output']
+                        index = index - 1
+                    if output != '':
+                        words.append(output)
+                        buffer = ['_']
+                except KeyError:
+                    pass
+                finally:
+                    result_dict = {}
+        except KeyError:
+            result_dict[sign] = 1
+    return words
+
+
+def decoded_words(automaton, stream):
+    decoder = SignDecoder(automaton)
+    return [event.text for label_id in stream
+            for event in decoder.update(label_id) if event.kind == WORD]
+
+
+def test_words(automaton):
+    labels = automaton.labels
+    hello = [labels.index('hello_1')] * 17 + [labels.index('hello_2')] * 17
+    assert legacy_words(labels, hello) == decoded_words(automaton, hello) != []
+
+
+def test_same_words_as_legacy_loop(automaton):
+    labels = automaton.labels
+    vocabulary = [labels.index(label) for label in [
+        'h_1', 'h_2', 'hello_1', 'hello_2', 'sign_1', 'sign_2', 'morning_1', 'morning_2',
+        'man', 'woman', 'what', 'why_1', 'child', 'a', 'namaste', 'india']]
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        stream = []
+        for _ in range(rng.integers(1, 30)):
+            stream += [int(rng.choice(vocabulary))] * int(rng.integers(1, 25))
+            # Short bursts of another label and frames below the threshold
+            if rng.random() < 0.3:
+                stream += [int(rng.choice(vocabulary))] * int(rng.integers(1, 5))
+            if rng.random() < 0.2:
+                stream += [None] * int(rng.integers(1, 5))
+        assert decoded_words(automaton, stream) == legacy_words(labels, stream)
+
+
+def test_idle_reset_needs_consecutive_frames(automaton):
+    # Pending signs are dropped after idle_frames frames without a hand in
+    # a row; a frame with a hand, even one below the threshold, starts the
+    # count again. The old loop counted them since the last word instead.
+    labels = automaton.labels
+    decoder = SignDecoder(automaton)
+    for _ in range(17):
+        decoder.update(labels.index('hello_1'))
+    assert decoder.pending == [labels.index('hello_1')]
+
+    for _ in range(5):
+        assert all(decoder.idle() == [] for _ in range(decoder.idle_frames - 1))
+        decoder.update(None)
+    assert decoder.pending == [labels.index('hello_1')]
+
+    events = [event for _ in range(decoder.idle_frames) for event in decoder.idle()]
+    assert [(event.kind, event.text) for event in events] == [(RESET, 'hello_1')]
+    assert decoder.pending == []
@@ -0,0 +1,79 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from decoder import SequentialVoter, SignDecoder, WORD
+from decoder import load_automaton, word_sequences
+
+
+@pytest.fixture(scope='module')
+def automaton():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return load_automaton()
+
+
+def confident(num_labels, label_id):
+    probabilities = np.full(num_labels, 1e-4, dtype=np.float32)
+    probabilities[label_id] = 0.99
+    return probabilities
+
+
+def decode(decoder, labels, frames_per_sign):
+    # Words read from the signs held one after another, the hands never
+    # dropping, then enough idle frames to finish
+    num_labels = len(decoder.labels)
+    words = []
+    for label_id in labels:
+        for _ in range(frames_per_sign):
+            events = decoder.update(label_id, 0.99, probabilities=confident(num_labels, label_id))
+            words.extend(event.text for event in events if event.kind == WORD)
+    for _ in range(decoder.idle_frames):
+        decoder.idle()
+    return words
+
+
+def test_held_sign_commits_once_per_repeat_frames():
+    voter = SequentialVoter(4, min_dwell=3, repeat_frames=10)
+    commits = [frame for frame in range(25) if voter.update(1, confident(4, 1)) is not None]
+    assert commits == [2, 12, 22]
+
+
+def test_held_sign_commits_once_by_default():
+    voter = SequentialVoter(4)
+    commits = [frame for frame in range(100) if voter.update(1, confident(4, 1)) is not None]
+    assert commits == [2]
+
+
+def test_confidence_weighs_hard_decisions():
+    # Without distributions, a sure label commits as fast as min_dwell
+    # allows and an unsure one needs its lead to build up
+    def first_commit(confidence):
+        voter = SequentialVoter(4, repeat_frames=None)
+        return next(frame for frame in range(100) if voter.update(1, None, confidence) is not None)
+
+    assert first_commit(1.0) == first_commit(0.99) == 2
+    assert first_commit(0.4) == 11
+    # Confidence spread evenly is no evidence at all
+    voter = SequentialVoter(4)
+    assert all(voter.update(1, None, 0.25) is None for _ in range(100))
+
+
+@pytest.mark.parametrize('word', ['answer', 'question', 'uncle'])
+def test_repeated_sign_words(automaton, word):
+    sequence = dict((word, sequence) for sequence, word in word_sequences(automaton))[word]
+    assert len(set(sequence)) == 1 < len(sequence)
+
+    # Opted in: each sign held repeat_frames frames counts once
+    repeat_frames = 30
+    decoder = SignDecoder(automaton, voter=SequentialVoter(len(automaton.labels), repeat_frames=repeat_frames))
+    assert decode(decoder, sequence, repeat_frames) == [word]
+
+    # Held no longer than one sign takes, the sign is read once
+    decoder = SignDecoder(automaton, voter=SequentialVoter(len(automaton.labels), repeat_frames=repeat_frames))
+    assert decode(decoder, sequence[:1], repeat_frames) == []
+
+    # By default only dropping the hands between them repeats a sign
+    decoder = SignDecoder(automaton, voter=SequentialVoter(len(automaton.labels)))
+    assert decode(decoder, sequence, repeat_frames) == []
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from dataset import DatasetWriter, open_dataset_writer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_rows(path):
+    return np.loadtxt(path, delimiter=',', ndmin=2)
+
+
+def test_rows_are_written_at_close(tmp_path):
+    path = str(tmp_path / 'keypoint.csv')
+    writer = DatasetWriter(path, manifest=False)
+    for label in range(100):
+        writer.write(label, np.full(86, label / 100))
+    writer.close()
+
+    rows = read_rows(path)
+    assert rows[:, 0].tolist() == list(range(100))
+    assert np.allclose(rows[:, 1:], (rows[:, :1] / 100))
+
+
+def test_flush_waits_for_the_rows(tmp_path):
+    path = str(tmp_path / 'keypoint.csv')
+    with DatasetWriter(path, manifest=False, fsync_interval=60) as writer:
+        writer.write(3, np.zeros(86))
+        writer.flush()
+        assert read_rows(path)[:, 0].tolist() == [3]
+
+
+@pytest.mark.parametrize('name', ['keypoint.csv', 'keypoint.bin'])
+def test_closed_writer_raises(tmp_path, name):
+    writer = open_dataset_writer(str(tmp_path / name), manifest=False)
+    writer.write(1, np.zeros(86))
+    writer.close()
+    with pytest.raises(ValueError, match='closed'):
+        writer.write(1, np.zeros(86))
+    with pytest.raises(ValueError, match='closed'):
+        writer.flush()
+    # Closing again is fine
+    writer.close()
+
+
+def test_thread_error_is_raised_to_the_caller(tmp_path):
+    # The file is opened on the writer thread, in a directory that is missing
+    writer = DatasetWriter(str(tmp_path / 'missing' / 'keypoint.csv'), manifest=False)
+    writer.write(1, np.zeros(86))
+    with pytest.raises(RuntimeError) as error:
+        writer.flush()
+    assert isinstance(error.value.__cause__, FileNotFoundError)
+    with pytest.raises(RuntimeError):
+        writer.write(1, np.zeros(86))
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_rows_are_written_at_exit(tmp_path):
+    # Never closed: the atexit hook flushes the rows
+    path = str(tmp_path / 'keypoint.csv')
+    script = ('from dataset import DatasetWriter\n'
+              'writer = DatasetWriter({!r}, manifest=False, fsync_interval=60)\n'
+              'for label in range(50):\n'
+              '    writer.write(label, [0.5] * 86)\n').format(path)
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True)
+    assert read_rows(path)[:, 0].tolist() == list(range(50))
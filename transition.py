@@ -1,3 +1,6 @@
+# The original hand-written table, kept for benchmark.hot_path's legacy walk
+# and decoder.load_transition_automaton(). The decoder reads its words from
+# model/keypoint_classifier/keypoint_classifier_vocabulary.csv instead.
 finalState = ['q3']
 startState = 'q1'
 
@@ -1 +1,16 @@
-from utils.cvfpscalc import CvFpsCalc
\ No newline at end of file
+from utils.cvfpscalc import CvFpsCalc
+from utils.landmark import pre_process_landmark
+from utils.landmark import calc_landmark_array, calc_bounding_rect
+from utils.landmark import calc_bounding_rect_face, calc_frame_landmarks
+from utils.landmark import FRAME_POINTS, FACE_SLICE, HAND_SLICES
+from utils.landmark import calc_raw_landmarks, calc_frame_points
+from utils.pipeline import Pipeline, LatestFrame
+from utils.media import ImageFolderCapture, PrefetchReader, list_media, open_media
+from utils.frame import FramePreprocessor, mirror_hand_results, mirror_face_results
+from utils.face_tracker import FaceAnchorTracker
+from utils.hand_region import HandRegionDetector
+from utils.detector import LandmarkDetector, load_hands, load_face
+from utils.window import Command, run_window
+from utils.startup import StartupProfile, load_parallel, process_age
+from utils.overlay import OverlayRenderer
+from utils.latency import LatencyHistogram, StageTimers, LatencyExporter, draw_latency_overlay
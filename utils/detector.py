@@ -0,0 +1,121 @@
+import numpy as np
+
+from utils.face_tracker import FaceAnchorTracker
+from utils.frame import FramePreprocessor
+from utils.hand_region import HandRegionDetector
+from utils.landmark import calc_frame_landmarks, FRAME_POINTS
+
+
+def load_hands(static_image_mode=False, min_detection_confidence=0.7, min_tracking_confidence=0.5,
+               warm_up_size=None):
+    # The hands graph as every collector configures it. With warm_up_size
+    # (width, height), it runs once on a blank frame of that size, as the
+    # first frame pays for setting up the graph, and is then reset.
+    # MediaPipe is imported here so that modules which only need the array
+    # helpers do not pay for loading it.
+    import mediapipe as mp
+
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=static_image_mode,
+        max_num_hands=2,
+        min_detection_confidence=min_detection_confidence,
+        min_tracking_confidence=min_tracking_confidence,
+    )
+    if warm_up_size is not None:
+        _warm_up(hands, warm_up_size)
+    return hands
+
+
+def load_face(min_detection_confidence=0.5, warm_up_size=None):
+    # The face detection graph, as load_hands
+    import mediapipe as mp
+
+    face = mp.solutions.face_detection.FaceDetection(
+        model_selection=1, min_detection_confidence=min_detection_confidence
+    )
+    if warm_up_size is not None:
+        _warm_up(face, warm_up_size)
+    return face
+
+
+def _warm_up(graph, size):
+    width, height = size
+    graph.process(np.zeros((height, width, 3), dtype=np.uint8))
+    graph.reset()
+
+
+class LandmarkDetector(object):
+    # The MediaPipe hands + face detection graphs used by the collectors,
+    # configured the same way, with the step that turns their results into
+    # the FRAME_POINTS array. Shared by the headless and offline tools so
+    # they produce exactly the features the live loop does.
+    def __init__(
+        self,
+        static_image_mode=False,
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.5,
+        face_min_detection_confidence=0.5,
+        mirror=True,
+        timers=None,
+        face_interval=1,
+        face_drift=12.0,
+        hand_region=False,
+        detect_size=None,
+        mirror_landmarks=False,
+    ):
+        self.hands = load_hands(static_image_mode, min_detection_confidence, min_tracking_confidence)
+        self.face = load_face(face_min_detection_confidence)
+        # The live loops mirror the camera image before detection; with
+        # mirror_landmarks the landmarks are mirrored instead of the image.
+        # Nothing is drawn here, so the caller's frame is left alone.
+        self.mirror = mirror
+        self.preprocessor = FramePreprocessor(mirror, mirror_landmarks, display=False, in_place=False)
+        mirror_results = self.preprocessor.mirror_results
+        # face_interval=1 detects the face on every frame; more reuses
+        # detections in between (FaceAnchorTracker)
+        self.face_tracker = FaceAnchorTracker(self.face, face_interval, face_drift, timers, mirror_results)
+        # hand_region searches around the previous hands only; detect_size
+        # caps the longer side of the searched image (HandRegionDetector)
+        self.hand_region = HandRegionDetector(self.hands, hand_region, max_size=detect_size, timers=timers,
+                                              mirror=mirror_results)
+        # Optional StageTimers for the hands / face / landmarks stages
+        self.timers = timers
+        self._frame_points = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def process(self, image):
+        # image: BGR frame as returned by cap.read(). Returns the same tuple
+        # as calc_frame_landmarks; the frame array is reused between calls.
+        image, hand_results, face_results = self.detect(image)
+        if self.timers is None:
+            return calc_frame_landmarks(image, hand_results, face_results, out=self._frame_points)
+        with self.timers.time('landmarks'):
+            return calc_frame_landmarks(image, hand_results, face_results, out=self._frame_points)
+
+    def detect(self, image):
+        # The MediaPipe results before they become FRAME_POINTS: (the RGB
+        # frame that was searched, hand results, face results)
+        _, image = self.preprocessor.process(image)
+        if self.timers is None:
+            hand_results = self.hand_region.process(image, self.face_tracker.box)
+        else:
+            with self.timers.time('hands'):
+                hand_results = self.hand_region.process(image, self.face_tracker.box)
+        face_results = self.face_tracker.process(image, hand_results.multi_hand_landmarks is not None)
+        return image, hand_results, face_results
+
+    def reset(self):
+        # Forget the tracked hands, e.g. before starting on another recording
+        self.hands.reset()
+        self.face.reset()
+        self.face_tracker.reset()
+        self.hand_region.reset()
+
+    def close(self):
+        self.hands.close()
+        self.face.close()
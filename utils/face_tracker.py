@@ -0,0 +1,208 @@
+import cv2 as cv
+import numpy as np
+
+from utils.frame import mirror_face_results
+
+# Longer side of the face template matched between detections, and how far
+# around the last box it is searched, as a share of the box
+TEMPLATE_SIZE = 48
+SEARCH_MARGIN = 0.25
+
+
+class FaceAnchorTracker(object):
+    # Schedules the face detector. Only the nose tip of the face ends up in
+    # the features, so the last detection is tracked instead of detected
+    # again on every frame: a grey template of the face box is matched
+    # around its last position, and the detection's keypoints and box are
+    # moved by the offset found. The detector runs again when
+    #
+    #   - interval frames have passed since it last ran,
+    #   - the face drifted: where the template matches best it still differs
+    #     by more than drift (mean absolute difference of grey values,
+    #     0-255), e.g. as the head turns, or the face left the image, or
+    #   - process() is called with force, for frames whose features are
+    #     logged to the dataset: those always use a fresh detection.
+    #
+    # Frames without hands are not classified, so they skip detection
+    # entirely; the first frame with hands after them detects again.
+    #
+    # interval=1 runs the detector on every frame, like before. With mirror,
+    # detections are mirrored once made (FramePreprocessor's
+    # mirror_landmarks); box stays in the coordinates of the searched image.
+    def __init__(self, face, interval=5, drift=12.0, timers=None, mirror=False):
+        self.face = face
+        self.interval = interval
+        self.drift = drift
+        self.mirror = mirror
+        # Optional StageTimers: 'face' for detections, 'face_track' for
+        # tracking between them
+        self.timers = timers
+        self.detections = 0
+        self.frames = 0
+        self.reset()
+
+    def reset(self):
+        self._results = None
+        self._box = None
+        self._detected_box = None
+        self._template = None
+        self._scale = 1.0
+        self._origin = None
+        self._age = 0
+
+    def process(self, image, hands_present=True, force=False):
+        # image: the RGB frame the hands were detected in. Returns face
+        # results as FaceDetection.process does, or None.
+        self.frames += 1
+        if self.interval <= 1:
+            return self._detect(image)
+        if not hands_present:
+            self.reset()
+            return None
+
+        self._age += 1
+        if force or self._results is None or self._age >= self.interval:
+            return self._detect(image)
+        if self._template is not None:
+            if self.timers is None:
+                tracked = self._track(image)
+            else:
+                with self.timers.time('face_track'):
+                    tracked = self._track(image)
+            if not tracked:
+                return self._detect(image)
+        return self._results
+
+    @property
+    def box(self):
+        # The face as (x1, y1, x2, y2) in pixels, where it was last detected
+        # or tracked to, or None
+        return self._box
+
+    @property
+    def detection_rate(self):
+        # Share of the frames seen that ran the detector
+        return self.detections / self.frames if self.frames else 0.0
+
+    def _detect(self, image):
+        self.detections += 1
+        if self.timers is None:
+            results = self.face.process(image)
+        else:
+            with self.timers.time('face'):
+                results = self.face.process(image)
+
+        self._results = results
+        self._age = 0
+        self._box = None
+        self._detected_box = None
+        self._template = None
+        self._origin = None
+        if results.detections:
+            box = results.detections[0].location_data.relative_bounding_box
+            self._box = _pixel_box(image, box)
+        if self.mirror:
+            mirror_face_results(results)
+        if self._box is not None and self.interval > 1:
+            self._start_tracking(image, results)
+        return results
+
+    def _start_tracking(self, image, results):
+        # results as returned, i.e. already mirrored
+        x1, y1, x2, y2 = self._box
+        self._detected_box = self._box
+        self._scale = TEMPLATE_SIZE / max(x2 - x1, y2 - y1)
+        self._template = _grey(image[y1:y2, x1:x2], self._scale)
+        self._origin = _face_positions(results)
+
+    def _track(self, image):
+        # Moves the box and the results to where the template matches best
+        # around the current box; False if the face is to be detected again
+        height, width = image.shape[:2]
+        x1, y1, x2, y2 = self._box
+        margin_x = int((x2 - x1) * SEARCH_MARGIN) + 1
+        margin_y = int((y2 - y1) * SEARCH_MARGIN) + 1
+        sx1, sy1 = max(x1 - margin_x, 0), max(y1 - margin_y, 0)
+        sx2, sy2 = min(x2 + margin_x, width), min(y2 + margin_y, height)
+
+        region = _grey(image[sy1:sy2, sx1:sx2], self._scale)
+        template_height, template_width = self._template.shape
+        if region.shape[0] < template_height or region.shape[1] < template_width:
+            return False
+        scores = cv.matchTemplate(region, self._template, cv.TM_SQDIFF)
+        _, _, (column, row), _ = cv.minMaxLoc(scores)
+        window = region[row:row + template_height, column:column + template_width]
+        if np.mean(cv.absdiff(window, self._template)) > self.drift:
+            return False
+        match_x = column + _refine(scores[row, :], column)
+        match_y = row + _refine(scores[:, column], row)
+
+        # In whole pixels of image, from the box at detection: a face that
+        # did not move keeps exactly the detected positions
+        dx1, dy1, _, _ = self._detected_box
+        offset_x = round(sx1 + match_x / self._scale - dx1)
+        offset_y = round(sy1 + match_y / self._scale - dy1)
+        box = _shift_box(self._detected_box, offset_x, offset_y, width, height)
+        if box is None:
+            return False
+
+        self._box = box
+        _move_face_results(self._results, self._origin,
+                           (-offset_x if self.mirror else offset_x) / width, offset_y / height)
+        return True
+
+
+def _pixel_box(image, box):
+    # relative_bounding_box clipped to the image, or None if it is empty
+    height, width = image.shape[:2]
+    x1 = min(max(int(box.xmin * width), 0), width)
+    y1 = min(max(int(box.ymin * height), 0), height)
+    x2 = min(max(int((box.xmin + box.width) * width), 0), width)
+    y2 = min(max(int((box.ymin + box.height) * height), 0), height)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def _shift_box(box, offset_x, offset_y, width, height):
+    # box moved by the offset, or None once any of it leaves the image
+    x1, y1, x2, y2 = box
+    if x1 + offset_x < 0 or y1 + offset_y < 0 or x2 + offset_x > width or y2 + offset_y > height:
+        return None
+    return x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y
+
+
+def _grey(image, scale):
+    grey = cv.cvtColor(image, cv.COLOR_RGB2GRAY)
+    return cv.resize(grey, None, fx=scale, fy=scale, interpolation=cv.INTER_LINEAR)
+
+
+def _refine(scores, index):
+    # Sub-pixel position of the minimum at index, from the parabola through
+    # it and its neighbours
+    if index == 0 or index == len(scores) - 1:
+        return 0.0
+    left, centre, right = scores[index - 1], scores[index], scores[index + 1]
+    curvature = left - 2 * centre + right
+    if curvature <= 0:
+        return 0.0
+    return 0.5 * (left - right) / curvature
+
+
+def _face_positions(results):
+    # The normalized box corner and keypoints of every detection, as made
+    return [((location_data.relative_bounding_box.xmin, location_data.relative_bounding_box.ymin),
+             [(keypoint.x, keypoint.y) for keypoint in location_data.relative_keypoints])
+            for location_data in (detection.location_data for detection in results.detections)]
+
+
+def _move_face_results(results, origin, offset_x, offset_y):
+    # Sets the results to their positions at detection plus the normalized
+    # offset
+    for detection, ((xmin, ymin), keypoints) in zip(results.detections, origin):
+        location_data = detection.location_data
+        location_data.relative_bounding_box.xmin = xmin + offset_x
+        location_data.relative_bounding_box.ymin = ymin + offset_y
+        for keypoint, (x, y) in zip(location_data.relative_keypoints, keypoints):
+            keypoint.x = x + offset_x
+            keypoint.y = y + offset_y
@@ -0,0 +1,95 @@
+import cv2 as cv
+import numpy as np
+
+
+class FramePreprocessor(object):
+    # Turns a captured BGR frame into the image drawn on (display) and the
+    # RGB image the detectors run on, without the flip / deepcopy /
+    # cvtColor copies the loops used to make:
+    #
+    #   mirror:            the frame is mirrored, as the live loops always
+    #                      did, so the view behaves like a mirror
+    #   mirror_landmarks:  the detectors run on the frame as captured and
+    #                      their landmarks are mirrored instead (see
+    #                      mirror_hand_results); the display is still
+    #                      mirrored unless display is False
+    #   in_place:          the display is the captured frame itself, flipped
+    #                      in place; otherwise a buffer is reused
+    #
+    # The RGB image is written into the same buffer every frame, so it is
+    # only valid until the next call.
+    def __init__(self, mirror=True, mirror_landmarks=False, display=True, in_place=True):
+        self.mirror = mirror
+        self.mirror_landmarks = mirror and mirror_landmarks
+        self.display = display
+        self.in_place = in_place
+        self._rgb = None
+        self._flipped = None
+
+    @property
+    def mirror_results(self):
+        # Whether detector results have to be mirrored into display space
+        return self.mirror_landmarks
+
+    def process(self, frame):
+        # Returns (display, rgb); display is None without display
+        if self.mirror and not self.mirror_landmarks:
+            frame = self._flip(frame)
+            return (frame if self.display else None), self._to_rgb(frame)
+
+        rgb = self._to_rgb(frame)
+        if not self.display:
+            return None, rgb
+        if self.mirror:
+            frame = self._flip(frame)
+        return frame, rgb
+
+    def _flip(self, frame):
+        if self.in_place:
+            return cv.flip(frame, 1, dst=frame)
+        self._flipped = _buffer(self._flipped, frame)
+        return cv.flip(frame, 1, dst=self._flipped)
+
+    def _to_rgb(self, frame):
+        self._rgb = _buffer(self._rgb, frame)
+        # MediaPipe is handed a read-only image so it does not copy it
+        self._rgb.flags.writeable = True
+        rgb = cv.cvtColor(frame, cv.COLOR_BGR2RGB, dst=self._rgb)
+        rgb.flags.writeable = False
+        return rgb
+
+
+def _buffer(buffer, like):
+    if buffer is None or buffer.shape != like.shape or buffer.dtype != like.dtype:
+        buffer = np.empty_like(like)
+    return buffer
+
+
+# Landmarks found on the frame as captured, moved to where they are on the
+# mirrored frame: x becomes 1 - x. MediaPipe names the hands assuming a
+# mirrored image, so their handedness is swapped too. Both work in place on
+# fresh results.
+SWAPPED_HANDEDNESS = {'Left': 'Right', 'Right': 'Left'}
+
+
+def mirror_hand_results(results):
+    if results.multi_hand_landmarks is None:
+        return results
+    for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+        for landmark in hand_landmarks.landmark:
+            landmark.x = 1.0 - landmark.x
+        for classification in handedness.classification:
+            classification.label = SWAPPED_HANDEDNESS.get(classification.label, classification.label)
+    return results
+
+
+def mirror_face_results(results):
+    if results is None or not results.detections:
+        return results
+    for detection in results.detections:
+        location_data = detection.location_data
+        box = location_data.relative_bounding_box
+        box.xmin = 1.0 - box.xmin - box.width
+        for keypoint in location_data.relative_keypoints:
+            keypoint.x = 1.0 - keypoint.x
+    return results
@@ -0,0 +1,169 @@
+import cv2 as cv
+import numpy as np
+
+from utils.frame import mirror_hand_results
+
+
+class HandRegionDetector(object):
+    # Runs the hands graph on part of the frame. The signer fills little of
+    # a wide camera frame, so when the previous frame had hands, only the
+    # region around them and the face anchor is searched:
+    #
+    #   region:  the box around the previous hands and the face, grown by
+    #            margin times its size on every side. It is kept while the
+    #            hands stay well inside it, so MediaPipe's tracking sees a
+    #            steady image.
+    #   scale:   with max_size, the searched image is downscaled so that its
+    #            longer side is at most max_size pixels.
+    #   lost:    when the region holds no hands, the frame is searched again
+    #            in full; so is every full_interval-th frame, for hands that
+    #            enter outside the region.
+    #
+    # MediaPipe tracks hands in coordinates normalized to the image it is
+    # given, so its tracking is reset whenever the searched region changes.
+    #
+    # Landmarks are normalized to the searched image by MediaPipe and mapped
+    # back into the full frame here, so everything downstream sees
+    # full-frame coordinates, as it would without a region. With mirror,
+    # they are mirrored last (FramePreprocessor's mirror_landmarks); regions
+    # stay in the coordinates of the searched image.
+    def __init__(self, hands, use_region=True, margin=0.5, max_size=None, full_interval=30,
+                 timers=None, mirror=False):
+        self.hands = hands
+        self.mirror = mirror
+        self.use_region = use_region
+        self.margin = margin
+        self.max_size = max_size
+        self.full_interval = full_interval
+        # Optional StageTimers: 'hand_region' for cropping and mapping back
+        self.timers = timers
+        self.searches = 0
+        self.full_searches = 0
+        self.reset()
+
+    def reset(self):
+        self._region = None
+        self._searched = None
+        self._hand_boxes = []
+        self._since_full = 0
+
+    @property
+    def region(self):
+        # (x1, y1, x2, y2) in pixels of the region searched next, or None
+        # for the full frame
+        return self._region
+
+    def process(self, image, face_box=None):
+        # image: the RGB frame; face_box: the face anchor's (x1, y1, x2, y2)
+        # in pixels, or None. Returns results as Hands.process does, in
+        # full-frame coordinates.
+        height, width = image.shape[:2]
+        region = None
+        if self.use_region and self._hand_boxes and self._since_full < self.full_interval:
+            region = self._next_region(width, height, face_box)
+        self._region = region
+
+        results = self._search(image, region)
+        if region is not None and results.multi_hand_landmarks is None:
+            # Tracking lost: look at the whole frame before giving up
+            results = self._search(image, None)
+            self._region = None
+
+        if self.use_region:
+            self._hand_boxes = _hand_boxes(results, width, height)
+        if self.mirror:
+            mirror_hand_results(results)
+        return results
+
+    def _next_region(self, width, height, face_box):
+        boxes = list(self._hand_boxes)
+        if face_box is not None:
+            boxes.append(face_box)
+        x1 = min(box[0] for box in boxes)
+        y1 = min(box[1] for box in boxes)
+        x2 = max(box[2] for box in boxes)
+        y2 = max(box[3] for box in boxes)
+
+        # Keep the current region while every hand is inside it with half a
+        # margin to spare
+        region = self._region
+        if region is not None:
+            spare_x = (region[2] - region[0]) * self.margin / (1 + 2 * self.margin) / 2
+            spare_y = (region[3] - region[1]) * self.margin / (1 + 2 * self.margin) / 2
+            if all(box[0] >= region[0] + spare_x and box[1] >= region[1] + spare_y
+                   and box[2] <= region[2] - spare_x and box[3] <= region[3] - spare_y
+                   for box in self._hand_boxes):
+                return region
+
+        grow_x = (x2 - x1) * self.margin
+        grow_y = (y2 - y1) * self.margin
+        region = (max(int(x1 - grow_x), 0), max(int(y1 - grow_y), 0),
+                  min(int(x2 + grow_x) + 1, width), min(int(y2 + grow_y) + 1, height))
+        if region == (0, 0, width, height):
+            return None
+        return region
+
+    def _search(self, image, region):
+        self.searches += 1
+        if region is None:
+            self.full_searches += 1
+            self._since_full = 0
+        else:
+            self._since_full += 1
+        if region != self._searched:
+            self.hands.reset()
+            self._searched = region
+
+        if self.timers is None:
+            searched = self._prepare(image, region)
+        else:
+            with self.timers.time('hand_region'):
+                searched = self._prepare(image, region)
+
+        results = self.hands.process(searched)
+
+        if region is not None and results.multi_hand_landmarks is not None:
+            if self.timers is None:
+                _to_frame(results, region, image.shape[1], image.shape[0])
+            else:
+                with self.timers.time('hand_region'):
+                    _to_frame(results, region, image.shape[1], image.shape[0])
+        return results
+
+    def _prepare(self, image, region):
+        if region is not None:
+            x1, y1, x2, y2 = region
+            image = image[y1:y2, x1:x2]
+        height, width = image.shape[:2]
+        if self.max_size is not None and max(width, height) > self.max_size:
+            # Normalized coordinates do not depend on the scale, only the
+            # region needs mapping back
+            scale = self.max_size / max(width, height)
+            size = (max(int(width * scale), 1), max(int(height * scale), 1))
+            image = cv.resize(image, size, interpolation=cv.INTER_LINEAR)
+        return np.ascontiguousarray(image)
+
+
+def _to_frame(results, region, width, height):
+    # Landmarks normalized to the region -> normalized to the full frame
+    x1, y1, x2, y2 = region
+    scale_x = (x2 - x1) / width
+    scale_y = (y2 - y1) / height
+    offset_x = x1 / width
+    offset_y = y1 / height
+    for hand_landmarks in results.multi_hand_landmarks:
+        for landmark in hand_landmarks.landmark:
+            landmark.x = offset_x + landmark.x * scale_x
+            landmark.y = offset_y + landmark.y * scale_y
+
+
+def _hand_boxes(results, width, height):
+    # (x1, y1, x2, y2) in pixels of every detected hand
+    boxes = []
+    if results.multi_hand_landmarks is None:
+        return boxes
+    for hand_landmarks in results.multi_hand_landmarks:
+        xs = [landmark.x for landmark in hand_landmarks.landmark]
+        ys = [landmark.y for landmark in hand_landmarks.landmark]
+        boxes.append((min(xs) * width, min(ys) * height, max(xs) * width, max(ys) * height))
+    return boxes
@@ -0,0 +1,203 @@
+import itertools
+
+import numpy as np
+
+# Layout of one frame as fed to the classifier: the nose tip followed by the
+# left and the right hand. Parts that are not detected stay at (0, 0).
+FRAME_POINTS = 43
+FACE_SLICE = slice(0, 1)
+HAND_SLICES = {
+    'Left': slice(1, 22),
+    'Right': slice(22, 43),
+}
+NOSE_TIP = 2
+
+# Raw results of one frame, as calc_raw_landmarks stores them: up to
+# MAX_HANDS hands of HAND_LANDMARKS points, handedness as an index into
+# HANDEDNESS, and the FACE_KEYPOINTS of the first face detection
+MAX_HANDS = 2
+HAND_LANDMARKS = 21
+HANDEDNESS = ('Left', 'Right')
+FACE_KEYPOINTS = 6
+
+
+def calc_landmark_array(image, landmarks, out=None):
+    # landmarks is any sequence of points with normalized .x / .y, e.g.
+    # hand_landmarks.landmark or location_data.relative_keypoints
+    image_width, image_height = image.shape[1], image.shape[0]
+
+    if out is None:
+        out = np.empty((len(landmarks), 2), dtype=np.int32)
+
+    # Single pass over the protobuf, everything after that is vectorized
+    normalized = np.fromiter(
+        itertools.chain.from_iterable((landmark.x, landmark.y)
+                                      for landmark in landmarks),
+        dtype=np.float64, count=2 * len(out)).reshape(-1, 2)
+    normalized *= (image_width, image_height)
+
+    # Same as min(int(v), size - 1): assigning to an integer array truncates
+    out[...] = np.minimum(normalized, (image_width - 1, image_height - 1))
+
+    return out
+
+
+def calc_bounding_rect(landmark_array):
+    # Matches cv.boundingRect on a point set (width is max - min + 1)
+    x1, y1 = landmark_array.min(axis=0).tolist()
+    x2, y2 = landmark_array.max(axis=0).tolist()
+
+    return [x1, y1, x2 + 1, y2 + 1]
+
+
+def calc_bounding_rect_face(image, landmarks):
+    image_width, image_height = image.shape[1], image.shape[0]
+    landmark_array = []
+
+    for _, landmark in enumerate(landmarks):
+        landmark_x = min(int(landmark.xmin * image_width), image_width - 1)
+        landmark_y = min(int(landmark.ymin * image_height), image_height - 1)
+        landmark_width = min(int(landmark.width * image_width), image_width - 1)
+        landmark_height = min(int(landmark.height * image_height), image_height - 1)
+
+        landmark_array = [landmark_x, landmark_y, landmark_x + landmark_width,  landmark_y + landmark_height]
+    return landmark_array
+
+
+def calc_frame_landmarks(image, hand_results, face_results, out=None):
+    # Fills the FRAME_POINTS layout straight from the MediaPipe results.
+    # Returns the frame array, the face rectangle (or None) and one
+    # (handedness, points, brect) entry per detected hand, where points is a
+    # view into the frame array. When two hands carry the same label the
+    # later one takes the slot and the earlier keeps a copy of its points.
+    if out is None:
+        out = np.zeros((FRAME_POINTS, 2), dtype=np.int32)
+    else:
+        out.fill(0)
+
+    face_rect = None
+    if face_results is not None and face_results.detections is not None:
+        location_data = face_results.detections[0].location_data
+        face_rect = calc_bounding_rect_face(image, [location_data.relative_bounding_box])
+        calc_landmark_array(image,
+                            location_data.relative_keypoints[NOSE_TIP:NOSE_TIP + 1],
+                            out=out[FACE_SLICE])
+
+    hands = []
+    slot_owners = {}
+    if hand_results.multi_hand_landmarks is not None:
+        for hand_landmarks, handedness in zip(hand_results.multi_hand_landmarks,
+                                              hand_results.multi_handedness):
+            label = handedness.classification[0].label
+            if label in slot_owners:
+                owner = slot_owners[label]
+                owner_handedness, owner_points, owner_brect = hands[owner]
+                hands[owner] = (owner_handedness, owner_points.copy(), owner_brect)
+            slot_owners[label] = len(hands)
+            points = calc_landmark_array(image, hand_landmarks.landmark,
+                                         out=out[HAND_SLICES[label]])
+            hands.append((handedness, points, calc_bounding_rect(points)))
+
+    return out, face_rect, hands
+
+
+def calc_raw_landmarks(image, hand_results, face_results):
+    # The MediaPipe results of one frame as fixed-size arrays, normalized as
+    # MediaPipe reports them, so that anything derived from them (the
+    # FRAME_POINTS pixels, depth, scores) can be recomputed without running
+    # the detectors again:
+    #
+    #   hand_landmarks  (MAX_HANDS, HAND_LANDMARKS, 3) x, y, z
+    #   handedness      (MAX_HANDS,) index into HANDEDNESS, -1 for no hand
+    #   hand_scores     (MAX_HANDS,) score of the handedness
+    #   face_keypoints  (FACE_KEYPOINTS, 2) x, y
+    #   face_box        (4,) xmin, ymin, width, height
+    #   face_score      score of the face detection, 0 without a face
+    #   frame_size      (2,) width and height of image
+    #
+    # Slots that were not detected are zeros. Hands are kept in the order
+    # MediaPipe reported them, which calc_frame_points relies on.
+    raw = {
+        'hand_landmarks': np.zeros((MAX_HANDS, HAND_LANDMARKS, 3), dtype=np.float32),
+        'handedness': np.full(MAX_HANDS, -1, dtype=np.int8),
+        'hand_scores': np.zeros(MAX_HANDS, dtype=np.float32),
+        'face_keypoints': np.zeros((FACE_KEYPOINTS, 2), dtype=np.float32),
+        'face_box': np.zeros(4, dtype=np.float32),
+        'face_score': np.float32(0),
+        'frame_size': np.array([image.shape[1], image.shape[0]], dtype=np.int32),
+    }
+
+    if hand_results.multi_hand_landmarks is not None:
+        for index, (hand_landmarks, handedness) in enumerate(zip(hand_results.multi_hand_landmarks,
+                                                                  hand_results.multi_handedness)):
+            if index == MAX_HANDS:
+                break
+            classification = handedness.classification[0]
+            raw['hand_landmarks'][index] = np.fromiter(
+                itertools.chain.from_iterable((landmark.x, landmark.y, landmark.z)
+                                              for landmark in hand_landmarks.landmark),
+                dtype=np.float32, count=3 * HAND_LANDMARKS).reshape(-1, 3)
+            raw['handedness'][index] = HANDEDNESS.index(classification.label)
+            raw['hand_scores'][index] = classification.score
+
+    if face_results is not None and face_results.detections:
+        detection = face_results.detections[0]
+        location_data = detection.location_data
+        keypoints = location_data.relative_keypoints[:FACE_KEYPOINTS]
+        raw['face_keypoints'][:len(keypoints)] = [(keypoint.x, keypoint.y) for keypoint in keypoints]
+        box = location_data.relative_bounding_box
+        raw['face_box'][:] = (box.xmin, box.ymin, box.width, box.height)
+        raw['face_score'] = np.float32(detection.score[0])
+
+    return raw
+
+
+def calc_frame_points(raw):
+    # FRAME_POINTS arrays (frames, FRAME_POINTS, 2) of stacked
+    # calc_raw_landmarks arrays: the pixels calc_frame_landmarks computes
+    # from the same results. A frame has a face if its face_score is set.
+    frames = len(raw['frame_size'])
+    out = np.zeros((frames, FRAME_POINTS, 2), dtype=np.int32)
+    # Per frame, as in calc_landmark_array: scaled in float64, clamped to
+    # the last pixel and truncated
+    sizes = raw['frame_size'][:, None, :]
+
+    def to_pixels(normalized, mask):
+        scaled = normalized.astype(np.float64) * sizes[mask]
+        return np.minimum(scaled, sizes[mask] - 1)
+
+    faces = raw['face_score'] > 0
+    out[faces, FACE_SLICE] = to_pixels(raw['face_keypoints'][faces, NOSE_TIP:NOSE_TIP + 1], faces)
+
+    # A later hand with the same label takes the slot, as in
+    # calc_frame_landmarks
+    for hand in range(raw['handedness'].shape[1]):
+        for label_index, label in enumerate(HANDEDNESS):
+            mask = raw['handedness'][:, hand] == label_index
+            out[mask, HAND_SLICES[label]] = to_pixels(raw['hand_landmarks'][mask, hand, :, :2], mask)
+
+    return out
+
+
+def pre_process_landmark(landmark_array):
+    # Accepts one frame of pixel coordinates (N, 2) or a batch (B, N, 2) and
+    # returns the flattened, normalized features as a float64 ndarray, (2N,)
+    # or (B, 2N), where the old function returned a list.
+    # Pixel coordinates are integers, so float32 inputs hold them exactly;
+    # the arithmetic itself runs in float64 so the output matches the rows
+    # already written to keypoint.csv bit for bit (tests/test_landmark.py).
+    # A frame whose points all coincide, e.g. all zeros, gives zeros where
+    # the old function raised ZeroDivisionError.
+    points = np.asarray(landmark_array, dtype=np.float64)
+
+    # Convert to relative coordinates
+    relative = points - points[..., :1, :]
+
+    # Convert to a one-dimensional list
+    features = relative.reshape(relative.shape[:-2] + (-1,))
+
+    # Normalization
+    max_value = np.abs(features).max(axis=-1, keepdims=True)
+    max_value[max_value == 0] = 1
+
+    return features / max_value
@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cv2 as cv
+
+# Histogram resolution: values below 2 ** SUB_BITS ns are exact, larger ones
+# share a bucket with values within 1 / 2 ** (SUB_BITS - 1) of them (< 1%)
+SUB_BITS = 8
+HALF = 1 << (SUB_BITS - 1)
+# Anything above 2 ** 40 ns (~18 minutes) lands in the last bucket
+MAX_SHIFT = 40 - SUB_BITS + 1
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram(object):
+    # Log-linear (HdrHistogram style) histogram of durations in nanoseconds:
+    # constant memory and O(1) record, percentiles within the bucket
+    # precision above.
+    def __init__(self):
+        self.counts = [0] * (HALF * (MAX_SHIFT + 2))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(value):
+        if value < 2 * HALF:
+            return value
+        shift = min(value.bit_length() - SUB_BITS, MAX_SHIFT)
+        return min(HALF * shift + (value >> shift), HALF * (MAX_SHIFT + 2) - 1)
+
+    @staticmethod
+    def bucket_value(index):
+        # Highest value that falls into the bucket
+        if index < 2 * HALF:
+            return index
+        shift = index // HALF - 1
+        return ((index - HALF * shift + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(int(value), 0)
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        return self.percentiles([q])[0]
+
+    def percentiles(self, qs):
+        # qs in increasing order, all found in one pass over the buckets
+        if self.count == 0:
+            return [0] * len(qs)
+        ranks = [max(int(q * self.count + 0.5), 1) for q in qs]
+        values = []
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            seen += count
+            while len(values) < len(ranks) and seen >= ranks[len(values)]:
+                values.append(min(self.bucket_value(index), self.max))
+            if len(values) == len(ranks):
+                break
+        return values + [self.max] * (len(ranks) - len(values))
+
+    def summary(self):
+        # Milliseconds, as shown on the overlay and written to JSON
+        result = {'count': self.count,
+                  'mean': self.total / self.count / 1e6 if self.count else 0.0}
+        for q, value in zip(QUANTILES, self.percentiles(QUANTILES)):
+            result['p{:g}'.format(q * 100)] = value / 1e6
+        result['max'] = self.max / 1e6
+        return result
+
+
+class StageTimers(object):
+    # Named latency histograms, one per pipeline stage. Stages are recorded
+    # from the processing threads and read from the UI thread.
+    #
+    #   with timers.time('hands'):
+    #       results = hands.process(image)
+    #
+    # tick(name) records the time since the previous tick of the same name,
+    # i.e. the frame interval, and returns the frame rate averaged over the
+    # last fps_window intervals (what CvFpsCalc used to report).
+    def __init__(self, fps_window=10):
+        self.histograms = {}
+        self.fps_window = fps_window
+        self._last_tick = {}
+        self._intervals = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._snapshot = None
+
+    @contextmanager
+    def time(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def record(self, name, nanoseconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(nanoseconds)
+
+    def tick(self, name='frame'):
+        now = time.perf_counter_ns()
+        last = self._last_tick.get(name)
+        self._last_tick[name] = now
+        if last is not None:
+            self.record(name, now - last)
+            intervals = self._intervals.get(name)
+            if intervals is None:
+                intervals = self._intervals[name] = deque(maxlen=self.fps_window)
+            intervals.append(now - last)
+        return self.fps(name)
+
+    def fps(self, name='frame'):
+        intervals = self._intervals.get(name)
+        if not intervals:
+            return 0.0
+        return round(1e9 * len(intervals) / max(sum(intervals), 1), 2)
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: histogram.summary() for name, histogram in self.histograms.items()}
+        return {'time': time.time(), 'started': self.started, 'stages': stages}
+
+    def recent_snapshot(self, max_age=0.5):
+        # For per-frame readers such as the overlay: a snapshot costs a pass
+        # over every histogram, so reuse one for up to max_age seconds
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot['time'] > max_age:
+            snapshot = self._snapshot = self.snapshot()
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self._last_tick = {}
+            self._intervals = {}
+            self.started = time.time()
+            self._snapshot = None
+
+
+def format_prometheus(snapshot, prefix='sign_speech'):
+    # Prometheus text exposition format: a summary per stage in seconds
+    lines = [
+        '# HELP {}_stage_latency_seconds Per-stage latency'.format(prefix),
+        '# TYPE {}_stage_latency_seconds summary'.format(prefix),
+    ]
+    for name, stage in snapshot['stages'].items():
+        for q in QUANTILES:
+            lines.append('{}_stage_latency_seconds{{stage="{}",quantile="{:g}"}} {:.9f}'.format(
+                prefix, name, q, stage['p{:g}'.format(q * 100)] / 1e3))
+        lines.append('{}_stage_latency_seconds_sum{{stage="{}"}} {:.9f}'.format(
+            prefix, name, stage['mean'] * stage['count'] / 1e3))
+        lines.append('{}_stage_latency_seconds_count{{stage="{}"}} {}'.format(prefix, name, stage['count']))
+    lines.append('# TYPE {}_stage_latency_max_seconds gauge'.format(prefix))
+    for name, stage in snapshot['stages'].items():
+        lines.append('{}_stage_latency_max_seconds{{stage="{}"}} {:.9f}'.format(prefix, name, stage['max'] / 1e3))
+    return '\n'.join(lines) + '\n'
+
+
+class LatencyExporter(object):
+    # Writes a snapshot of the timers every interval seconds on a daemon
+    # thread, as JSON or, for a .prom / .txt path, as Prometheus text (e.g.
+    # for the node exporter's textfile collector). Files are replaced
+    # atomically so a scraper never reads half a snapshot.
+    def __init__(self, timers, path, interval=5.0):
+        self.timers = timers
+        self.path = path
+        self.interval = interval
+        self.prometheus = path.endswith(('.prom', '.txt'))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='LatencyExporter', daemon=True)
+        self._thread.start()
+
+    def write(self):
+        snapshot = self.timers.snapshot()
+        temp_path = '{}.{}.tmp'.format(self.path, threading.get_ident())
+        with open(temp_path, 'w') as f:
+            if self.prometheus:
+                f.write(format_prometheus(snapshot))
+            else:
+                json.dump(snapshot, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+
+def draw_latency_overlay(image, snapshot, origin=(10, 80)):
+    # One line per stage: p50 / p95 / p99 / max in milliseconds
+    x, y = origin
+    lines = ['{:<9}{:>7}{:>7}{:>7}{:>7}'.format('ms', 'p50', 'p95', 'p99', 'max')]
+    for name, stage in snapshot['stages'].items():
+        lines.append('{:<9}{:>7.1f}{:>7.1f}{:>7.1f}{:>7.1f}'.format(
+            name[:9], stage['p50'], stage['p95'], stage['p99'], stage['max']))
+
+    (text_width, _), _ = cv.getTextSize(lines[0], cv.FONT_HERSHEY_PLAIN, 0.8, 1)
+    cv.rectangle(image, (x - 5, y - 13), (x + text_width + 5, y + 14 * len(lines) - 8),
+                 (255, 255, 255), -1)
+    for index, line in enumerate(lines):
+        cv.putText(image, line, (x, y + 14 * index), cv.FONT_HERSHEY_PLAIN, 0.8,
+                   (0, 0, 0), 1, cv.LINE_AA)
+    return image
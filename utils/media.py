@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+
+import cv2 as cv
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+class ImageFolderCapture(object):
+    # cv.VideoCapture look-alike over the images of a directory, read in
+    # name order
+    def __init__(self, path):
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self._index = 0
+
+    def read(self):
+        while self._index < len(self.files):
+            image = cv.imread(self.files[self._index])
+            self._index += 1
+            if image is not None:
+                return True, image
+        return False, None
+
+    def release(self):
+        self._index = len(self.files)
+
+
+def open_media(path):
+    # A directory is read as an image sequence, anything else goes to OpenCV
+    if os.path.isdir(path):
+        return ImageFolderCapture(path)
+
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError('cannot open ' + path)
+    return cap
+
+
+def list_media(path):
+    # Video files and image folders under path, each one a separate input
+    if os.path.isfile(path):
+        return [path]
+
+    names = sorted(os.listdir(path))
+    if any(name.lower().endswith(IMAGE_EXTENSIONS) for name in names):
+        return [path]
+
+    media = []
+    for name in names:
+        child = os.path.join(path, name)
+        if os.path.isdir(child) or name.lower().endswith(VIDEO_EXTENSIONS):
+            media.extend(list_media(child))
+    return media
+
+
+class PrefetchReader(object):
+    # Decodes frames on a background thread into a bounded queue. Unlike the
+    # live Pipeline nothing is dropped: every frame of the file is returned.
+    def __init__(self, cap, max_frames=8):
+        self.cap = cap
+        self._frames = queue.Queue(maxsize=max_frames)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='PrefetchReader', daemon=True)
+        self._thread.start()
+
+    def __iter__(self):
+        while True:
+            frame = self._frames.get()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        self._stop.set()
+        # Unblock the reader if it is waiting on a full queue
+        while self._thread.is_alive():
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join(timeout=0.01)
+        self.cap.release()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._frames.put(frame)
+        finally:
+            self._frames.put(None)
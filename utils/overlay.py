@@ -0,0 +1,192 @@
+import cv2 as cv
+import numpy as np
+
+# Bones of a hand as pairs of landmark indexes, the segments draw_landmarks
+# drew one cv.line at a time
+HAND_CONNECTIONS = np.array([
+    (2, 3), (3, 4),                                                # thumb
+    (5, 6), (6, 7), (7, 8),                                        # index finger
+    (9, 10), (10, 11), (11, 12),                                   # middle finger
+    (13, 14), (14, 15), (15, 16),                                  # ring finger
+    (17, 18), (18, 19), (19, 20),                                  # little finger
+    (0, 1), (1, 2), (2, 5), (5, 9), (9, 13), (13, 17), (17, 0),    # palm
+], dtype=np.intp)
+
+# Fingertips are drawn larger than the other joints
+FINGERTIPS = (4, 8, 12, 16, 20)
+JOINT_RADIUS = 5
+FINGERTIP_RADIUS = 8
+FACE_RADIUS = 3
+
+# A polyline of thickness 2r drawn over a zero-length segment is a filled
+# disc of radius r, so every joint of a radius is one segment of one pass
+JOINT_SEGMENTS = np.repeat([index for index in range(21) if index not in FINGERTIPS], 2).reshape(-1, 2)
+FINGERTIP_SEGMENTS = np.repeat(FINGERTIPS, 2).reshape(-1, 2)
+FACE_SEGMENTS = np.zeros((1, 2), dtype=np.intp)
+
+# The hand label sits on top of its box; the panel is the white box in the
+# top left corner, one line of text at each of PANEL_ROWS
+LABEL_HEIGHT = 22
+PANEL_SIZE = (150, 60)
+PANEL_ROWS = (20, 50)
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+RED = (0, 0, 255)
+
+
+class OverlayRenderer(object):
+    # Draws data_collector's overlays. Shapes are collected with add_face /
+    # add_hand and drawn by render in batched passes, so a frame takes the
+    # same few OpenCV calls whatever the number of hands:
+    #
+    #   boxes:   one closed polyline pass over every hand and face box
+    #   bones:   a black and a green polyline pass over HAND_CONNECTIONS
+    #   joints:  an outline and a fill pass per radius, as zero-length
+    #            segments
+    #   text:    hand labels and the panel are rendered once per text and
+    #            copied into the frame (blended with panel_alpha < 1)
+    #
+    # flash whites out the frame instead, as the collector does when the
+    # decoder emits. With enabled=False (--no_draw) nothing is drawn and
+    # nothing timed; otherwise render records its own cost under the 'draw'
+    # timer.
+    def __init__(self, enabled=True, panel_alpha=1.0, timers=None):
+        self.enabled = enabled
+        self.panel_alpha = panel_alpha
+        self.timers = timers
+        self._labels = {}
+        self._panel_lines = None
+        self._panel = None
+        self._clear()
+
+    def add_face(self, brect, points):
+        # brect: (x1, y1, x2, y2); points: the face landmarks, (N, 2) pixels
+        if self.enabled:
+            self._boxes.append(brect)
+            self._face_points.append(points)
+
+    def add_hand(self, points, brect, label):
+        # points: the 21 hand landmarks, (21, 2) pixels; label: drawn above
+        # brect. points is read at render, views into a frame array are fine
+        if self.enabled:
+            self._boxes.append(brect)
+            self._hands.append(points)
+            self._hand_labels.append((brect, label))
+
+    def flash(self):
+        if self.enabled:
+            self._flash = True
+
+    def render(self, image, panel_lines=(), progress=None):
+        # Draws what was added since the last render, the panel lines (one
+        # string per PANEL_ROWS, '' for none) and, with progress in [0, 1],
+        # the red progress bar at the bottom. Draws on image and returns it.
+        if self.enabled:
+            if self.timers is None:
+                self._render(image, panel_lines, progress)
+            else:
+                with self.timers.time('draw'):
+                    self._render(image, panel_lines, progress)
+        self._clear()
+        return image
+
+    def _clear(self):
+        self._boxes = []
+        self._face_points = []
+        self._hands = []
+        self._hand_labels = []
+        self._flash = False
+
+    def _render(self, image, panel_lines, progress):
+        if self._flash:
+            image[...] = 255
+        else:
+            self._draw_shapes(image)
+
+        if panel_lines:
+            _paste(image, self._panel_image(tuple(panel_lines)), 0, 0, self.panel_alpha)
+
+        if progress is not None:
+            height, width = image.shape[:2]
+            cv.rectangle(image, (0, height - 20), (int(progress * width), height), RED, -1)
+
+    def _draw_shapes(self, image):
+        if self._boxes:
+            corners = np.array([[(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+                                for x1, y1, x2, y2 in self._boxes], dtype=np.int32)
+            cv.polylines(image, corners, True, BLACK, 1)
+
+        if self._face_points:
+            cv.polylines(image, _segments(self._face_points, FACE_SEGMENTS), False, WHITE, 2 * FACE_RADIUS)
+
+        if self._hands:
+            bones = _segments(self._hands, HAND_CONNECTIONS)
+            cv.polylines(image, bones, False, BLACK, 6)
+            cv.polylines(image, bones, False, GREEN, 2)
+            for segments, radius in ((JOINT_SEGMENTS, JOINT_RADIUS), (FINGERTIP_SEGMENTS, FINGERTIP_RADIUS)):
+                joints = _segments(self._hands, segments)
+                cv.polylines(image, joints, False, BLACK, 2 * radius)
+                cv.polylines(image, joints, False, WHITE, 2 * radius - 2)
+
+        for brect, label in self._hand_labels:
+            x1, y1, x2 = brect[0], brect[1], brect[2]
+            _fill(image, x1, y1 - LABEL_HEIGHT, x2 + 1, y1 + 1, BLACK)
+            _paste(image, self._label_image(label), x1, y1 - LABEL_HEIGHT)
+
+    def _label_image(self, text):
+        # White text on the black label, as many as there are labels
+        label = self._labels.get(text)
+        if label is None:
+            (text_width, _), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+            label = np.zeros((LABEL_HEIGHT + 1, text_width + 10, 3), dtype=np.uint8)
+            cv.putText(label, text, (5, LABEL_HEIGHT - 4),
+                       cv.FONT_HERSHEY_SIMPLEX, 0.6, WHITE, 1, cv.LINE_AA)
+            self._labels[text] = label
+        return label
+
+    def _panel_image(self, lines):
+        # Rendered again only when its text changes
+        if lines != self._panel_lines:
+            width, height = PANEL_SIZE
+            panel = np.full((height + 1, width + 1, 3), 255, dtype=np.uint8)
+            for line, y in zip(lines, PANEL_ROWS):
+                if line:
+                    cv.putText(panel, line, (10, y), cv.FONT_HERSHEY_SIMPLEX, 0.6, BLACK, 1, cv.LINE_AA)
+            self._panel_lines = lines
+            self._panel = panel
+        return self._panel
+
+
+def _segments(point_sets, connections):
+    # (N * len(connections), 2, 2) int32 segments over every point set
+    if len(point_sets) == 1:
+        return np.ascontiguousarray(point_sets[0][connections], dtype=np.int32)
+    return np.concatenate([points[connections] for points in point_sets]).astype(np.int32, copy=False)
+
+
+def _clip(image, x1, y1, x2, y2):
+    height, width = image.shape[:2]
+    return max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+
+
+def _fill(image, x1, y1, x2, y2, color):
+    x1, y1, x2, y2 = _clip(image, x1, y1, x2, y2)
+    if x2 > x1 and y2 > y1:
+        image[y1:y2, x1:x2] = color
+
+
+def _paste(image, patch, x, y, alpha=1.0):
+    # patch over image with its top left corner at (x, y), clipped to the
+    # image; blended when alpha < 1
+    height, width = patch.shape[:2]
+    x1, y1, x2, y2 = _clip(image, x, y, x + width, y + height)
+    if x2 <= x1 or y2 <= y1:
+        return
+    patch = patch[y1 - y:y2 - y, x1 - x:x2 - x]
+    region = image[y1:y2, x1:x2]
+    if alpha >= 1.0:
+        region[...] = patch
+    else:
+        region[...] = cv.addWeighted(region, 1.0 - alpha, patch, alpha, 0)
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+
+
+class LatestFrame(object):
+    # Single-slot hand-off between two threads: put() replaces whatever has
+    # not been taken yet, so the consumer always gets the newest frame.
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        # Returns None on timeout or once closed and empty
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._closed,
+                                     timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class Pipeline(object):
+    # Runs capture and processing on their own threads:
+    #
+    #   capture thread:  cap.read() -> LatestFrame (stale frames are dropped)
+    #   process thread:  process(frame) -> bounded output queue
+    #   caller:          get() -> render at display rate
+    #
+    # process is called with each frame and returns whatever the render stage
+    # needs (usually the debug image). When the output queue is full the
+    # oldest result is dropped, so rendering never lags behind recognition.
+    #
+    # Commands from other threads (key presses) are queued with send() and
+    # passed to handle(command) on the process thread before the next frame,
+    # so handle can change whatever process reads without locks.
+    #
+    # With timers (a StageTimers) the capture and process stages are timed.
+    def __init__(self, cap, process, max_outputs=2, timers=None, handle=None):
+        self.cap = cap
+        self.process = process
+        self.handle = handle
+        self.timers = timers
+
+        self._frames = LatestFrame()
+        self._outputs = queue.Queue(maxsize=max_outputs)
+        self._commands = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._error = None
+
+        self._capture_thread = threading.Thread(target=self._capture, name='Capture', daemon=True)
+        self._process_thread = threading.Thread(target=self._process, name='Process', daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def dropped_frames(self):
+        return self._frames.dropped
+
+    @property
+    def running(self):
+        # False once the source is exhausted (or stopped) and every output
+        # has been taken. Stays True after a failure so get() can raise it.
+        return not (self._done.is_set() and self._outputs.empty()
+                    and self._error is None)
+
+    def start(self):
+        self._capture_thread.start()
+        self._process_thread.start()
+
+    def get(self, timeout=None):
+        # Next processed output, or None if nothing arrived within timeout.
+        # An exception raised by process() is re-raised here.
+        try:
+            return self._outputs.get(timeout=timeout)
+        except queue.Empty:
+            if self._error is not None:
+                raise self._error
+            return None
+
+    def send(self, command):
+        self._commands.put(command)
+
+    def stop(self):
+        self._stop.set()
+        self._frames.close()
+        for thread in (self._capture_thread, self._process_thread):
+            if thread.is_alive():
+                thread.join()
+
+    def _capture(self):
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter_ns()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if self.timers is not None:
+                    self.timers.record('capture', time.perf_counter_ns() - start)
+                self._frames.put(frame)
+        finally:
+            self._frames.close()
+
+    def _process(self):
+        try:
+            while not self._stop.is_set():
+                frame = self._frames.get()
+                if frame is None:
+                    break
+                self._handle_commands()
+                start = time.perf_counter_ns()
+                output = self.process(frame)
+                if self.timers is not None:
+                    self.timers.record('process', time.perf_counter_ns() - start)
+
+                if self._outputs.full():
+                    try:
+                        self._outputs.get_nowait()
+                    except queue.Empty:
+                        pass
+                self._outputs.put(output)
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._stop.set()
+            self._done.set()
+
+    def _handle_commands(self):
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if self.handle is not None:
+                self.handle(command)
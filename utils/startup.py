@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+def process_age():
+    # Seconds since this process was started, from /proc (Linux); None
+    # where that is not available
+    try:
+        with open('/proc/self/stat') as f:
+            stat = f.read()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except OSError:
+        return None
+    # starttime, field 22, in clock ticks since boot; the command name
+    # (field 2) may hold spaces, so fields are counted after it
+    started = int(stat.rsplit(')', 1)[1].split()[19]) / os.sysconf('SC_CLK_TCK')
+    return max(uptime - started, 0.0)
+
+
+class StartupProfile(object):
+    # Where start-up time goes, in seconds since the process started (or,
+    # without /proc, since the profile was created):
+    #
+    #   time(name):  a step, e.g. loading a model; records when it started
+    #                and how long it took
+    #   mark(name):  a milestone, e.g. the first recognized frame; only the
+    #                first call counts, so it can be called on every frame
+    #
+    # 'main' is marked on creation: everything before it is interpreter
+    # start-up and module imports. With verbose, steps and milestones are
+    # printed as they complete. Steps may run on several threads.
+    def __init__(self, verbose=False):
+        age = process_age()
+        self.start = time.perf_counter() - (age or 0.0)
+        self.verbose = verbose
+        self.steps = {}
+        self.marks = {}
+        self._lock = threading.Lock()
+        self.mark('main')
+
+    @contextmanager
+    def time(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            took = time.perf_counter() - started
+            with self._lock:
+                self.steps[name] = (started - self.start, took)
+            if self.verbose:
+                print('startup {:>8.3f}s  {} ({:.3f}s)'.format(started - self.start + took, name, took))
+
+    def mark(self, name):
+        # True the first time name is marked
+        with self._lock:
+            if name in self.marks:
+                return False
+            at = time.perf_counter() - self.start
+            self.marks[name] = at
+        if self.verbose:
+            print('startup {:>8.3f}s  {}'.format(at, name))
+        return True
+
+    def summary(self):
+        # Steps and milestones in the order they completed
+        events = [(at + took, '{:<28}{:>9.3f}{:>9.3f}'.format(name, at, took))
+                  for name, (at, took) in self.steps.items()]
+        events += [(at, '{:<28}{:>9.3f}'.format(name, at)) for name, at in self.marks.items()]
+        lines = ['{:<28}{:>9}{:>9}'.format('startup', 'at s', 'took s')]
+        lines += [line for _, line in sorted(events)]
+        return '\n'.join(lines)
+
+
+def load_parallel(loaders, profile=None):
+    # loaders: name -> function returning what it loads. Runs each on a
+    # thread of its own, as model files, MediaPipe graphs and cameras
+    # mostly wait on native code, and returns name -> result. A loader's
+    # exception is raised here.
+    def run(name, loader):
+        if profile is None:
+            return loader()
+        with profile.time(name):
+            return loader()
+
+    with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix='Load') as executor:
+        futures = {name: executor.submit(run, name, loader) for name, loader in loaders.items()}
+        return {name: future.result() for name, future in futures.items()}
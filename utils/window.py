@@ -0,0 +1,41 @@
+import time
+from collections import namedtuple
+
+import cv2 as cv
+
+# What a key press asks the pipeline to do: name, and e.g. the digit typed
+Command = namedtuple('Command', ['name', 'value'], defaults=[None])
+
+ESC = 27
+
+
+def run_window(pipeline, window_name, key_command, timers=None, frame_timeout=0.03):
+    # The UI loop, on the calling thread (HighGUI wants the main one): shows
+    # the pipeline's outputs as they arrive and turns key presses into
+    # commands for it. Recognition runs on the pipeline's threads and never
+    # waits for this loop.
+    #
+    # key_command(key) returns the Command to send, or None; ESC stops. It
+    # runs here, so whatever takes longer than a key press (say, reading the
+    # dataset) belongs on another thread. Waits at most frame_timeout for an
+    # output; cv.waitKey(1) only pumps the window events in between, instead
+    # of idling 10ms every frame. Returns the frames shown.
+    shown = 0
+    while pipeline.running:
+        output = pipeline.get(timeout=frame_timeout)
+        if output is not None:
+            start = time.perf_counter_ns()
+            cv.imshow(window_name, output)
+            if timers is not None:
+                timers.record('display', time.perf_counter_ns() - start)
+            shown += 1
+
+        key = cv.waitKey(1)
+        if key == -1:
+            continue
+        if key == ESC:
+            break
+        command = key_command(key)
+        if command is not None:
+            pipeline.send(command)
+    return shown